@@ -0,0 +1,36 @@
+"""
+One-off migration for databases created before delta sync.
+
+Notifications created before then have no updated_at, so delta sync never
+returns them; this starts each one's updated_at at its created_at. It scans
+the whole notifications collection, so run it once after upgrading rather
+than on every start:
+
+    python backfill_sync_fields.py
+
+Running it again only touches notifications still missing the field.
+"""
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from utils.database import create_client
+
+
+async def run():
+    client = create_client()
+    db = client[os.environ['DB_NAME']]
+    try:
+        result = await db.notifications.update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": "$created_at"}}]
+        )
+        print(f"Backfilled updated_at on {result.modified_count} notifications")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+    asyncio.run(run())
@@ -0,0 +1,109 @@
+"""
+Branch locator query latency at scale.
+
+Spreads synthetic branches across Bangladesh for a set of MFIs, then times
+nearest-branch queries from random points, with and without a loan-amount
+style MFI filter. Runs against the in-memory backend by default; with
+--mongo it uses MONGO_URL and a separate benchmark database, which it drops
+afterwards.
+
+Usage:
+    python benchmark_branches.py --branches 50000 --queries 500
+    python benchmark_branches.py --branches 50000 --mongo
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from utils.geo import point
+
+# Rough bounding box of Bangladesh
+MIN_LATITUDE, MAX_LATITUDE = 20.7, 26.6
+MIN_LONGITUDE, MAX_LONGITUDE = 88.0, 92.7
+
+
+def make_branch(rng, mfi_id, now):
+    return {
+        "id": str(uuid.uuid4()),
+        "mfi_id": mfi_id,
+        "name": f"Branch {rng.randint(1, 999999)}",
+        "location": point(rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE), rng.uniform(MIN_LATITUDE, MAX_LATITUDE)),
+        "created_at": now
+    }
+
+
+async def open_backend(use_mongo, db_name):
+    if not use_mongo:
+        from repositories.memory import MemoryRepositories
+        return MemoryRepositories(), None
+    from repositories.mongo import MongoRepositories
+    from utils.database import create_client
+    client = create_client()
+    repos = MongoRepositories(client, client[db_name])
+    await client[db_name].branches.create_index([("location", "2dsphere")])
+    return repos, client
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    pick = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+    return pick(0.5), pick(0.95), pick(0.99)
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    repos, client = await open_backend(args.mongo, args.db)
+    try:
+        mfi_ids = [str(uuid.uuid4()) for _ in range(args.mfis)]
+        now = datetime.now(timezone.utc).isoformat()
+        started = time.perf_counter()
+        for offset in range(0, args.branches, 5000):
+            batch = [make_branch(rng, rng.choice(mfi_ids), now) for _ in range(min(5000, args.branches - offset))]
+            await repos.branches.create_many(batch)
+        print(f"Inserted {args.branches:,} branches for {args.mfis} MFIs in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'query':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'avg hits':>9}")
+        cases = {
+            "nearest branches": dict(mfi_ids=None, nearest_per_mfi=False),
+            "nearest per MFI": dict(mfi_ids=None, nearest_per_mfi=True),
+            "nearest per MFI, 1/4 eligible": dict(mfi_ids=mfi_ids[:max(1, len(mfi_ids) // 4)], nearest_per_mfi=True),
+        }
+        for label, options in cases.items():
+            timings, hits = [], 0
+            for _ in range(args.queries):
+                longitude = rng.uniform(MIN_LONGITUDE, MAX_LONGITUDE)
+                latitude = rng.uniform(MIN_LATITUDE, MAX_LATITUDE)
+                started = time.perf_counter()
+                results = await repos.branches.nearby(longitude, latitude, args.radius_km, limit=args.limit, **options)
+                timings.append(time.perf_counter() - started)
+                hits += len(results)
+            p50, p95, p99 = percentiles(timings)
+            print(f"{label:<32} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f} {hits / args.queries:>9.1f}")
+    finally:
+        if client:
+            await client.drop_database(args.db)
+            client.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the branch locator.")
+    parser.add_argument("--branches", type=int, default=50000)
+    parser.add_argument("--mfis", type=int, default=40)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--radius-km", type=float, default=25)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo", action="store_true", help="run against MONGO_URL instead of the memory backend")
+    parser.add_argument("--db", default="grameengo_branch_benchmark", help="database to use (and drop) with --mongo")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,131 @@
+"""
+Bytes-on-wire and encode CPU time for each response encoding.
+
+Builds list-endpoint payloads of the same shape and size the API returns and
+encodes them as JSON, columnar JSON and MessagePack, with and without gzip,
+then compares full documents with the ?fields=summary projection.
+
+Usage:
+    python benchmark_encoding.py --iterations 200
+"""
+import argparse
+import gzip
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from generate_load_data import make_application
+from models.application import APPLICATION_SUMMARY_FIELDS
+from models.mfi import LOAN_PRODUCT_SUMMARY_FIELDS, MFI_SUMMARY_FIELDS
+from models.notification import NOTIFICATION_SUMMARY_FIELDS
+from utils.encoding import COLUMNAR_JSON, COMPRESSION_LEVEL, JSON, MSGPACK, encode, msgpack
+
+
+def sample_mfi(rng, now):
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"MFI {rng.randint(1, 999)}",
+        "description": "Providing microfinance services to rural entrepreneurs across Bangladesh.",
+        "min_loan_amount": rng.choice([5000, 8000, 10000]),
+        "max_loan_amount": rng.choice([400000, 500000, 1000000]),
+        "interest_rate": round(rng.uniform(16, 22), 1),
+        "processing_time_days": rng.randint(5, 14),
+        "requirements": ["National ID", "Business Registration", "Bank Statement"],
+        "collateral_required": rng.random() < 0.2,
+        "website": "https://example.org",
+        "contact_email": "info@example.org",
+        "contact_phone": "+880-2-9000000",
+        "logo_url": "https://via.placeholder.com/150",
+        "created_at": now.isoformat()
+    }
+
+
+def sample_product(rng, now, mfi):
+    return {
+        "id": str(uuid.uuid4()),
+        "mfi_id": mfi['id'],
+        "name": "Micro Business Loan",
+        "description": "Small loans for starting or expanding micro businesses",
+        "min_amount": mfi['min_loan_amount'],
+        "max_amount": mfi['max_loan_amount'],
+        "interest_rate": mfi['interest_rate'],
+        "tenure_months": [6, 12, 18],
+        "eligibility_criteria": ["Must be 18+ years old", "Business operational for 6 months"],
+        "created_at": now.isoformat()
+    }
+
+
+SUMMARY_FIELDS = {
+    "/api/applications": APPLICATION_SUMMARY_FIELDS,
+    "/api/notifications": NOTIFICATION_SUMMARY_FIELDS,
+    "/api/mfis": MFI_SUMMARY_FIELDS,
+    "/api/loan-products": LOAN_PRODUCT_SUMMARY_FIELDS
+}
+
+
+def build_payloads(rng):
+    now = datetime.now(timezone.utc)
+    mfis = [sample_mfi(rng, now) for _ in range(100)]
+    products = [sample_product(rng, now, rng.choice(mfis)) for _ in range(100)]
+    applications, notifications = [], []
+    for _ in range(100):
+        app, notifs, _ = make_application(rng, now, 2, str(uuid.uuid4()), rng.choice(mfis), [str(uuid.uuid4())])
+        applications.append(app)
+        notifications.extend(notifs)
+    return {
+        "/api/applications": applications,
+        "/api/notifications": notifications[:50],
+        "/api/mfis": mfis,
+        "/api/loan-products": products
+    }
+
+
+def measure(data, media_type, compress, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        body = encode(data, media_type)
+        if compress:
+            body = gzip.compress(body, compresslevel=COMPRESSION_LEVEL)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return len(body), timings[len(timings) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark response encodings.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    media_types = [JSON, COLUMNAR_JSON] + ([MSGPACK] if msgpack else [])
+    if not msgpack:
+        print("msgpack is not installed; skipping MessagePack")
+
+    print(f"{'endpoint':<20} {'encoding':<42} {'bytes':>8} {'vs json':>8} {'encode ms':>10}")
+    for endpoint, data in build_payloads(random.Random(args.seed)).items():
+        baseline = None
+        for media_type in media_types:
+            for compress in (False, True):
+                size, ms = measure(data, media_type, compress, args.iterations)
+                baseline = baseline or size
+                label = media_type + (" + gzip" if compress else "")
+                print(f"{endpoint:<20} {label:<42} {size:>8} {size / baseline:>7.0%} {ms:>10.3f}")
+        print()
+
+    print(f"{'endpoint':<20} {'fields':<42} {'bytes':>8} {'vs full':>8} {'encode ms':>10}")
+    for endpoint, data in build_payloads(random.Random(args.seed)).items():
+        fields = SUMMARY_FIELDS[endpoint]
+        summary = [{field: doc[field] for field in fields if field in doc} for doc in data]
+        for compress in (False, True):
+            full_size, full_ms = measure(data, JSON, compress, args.iterations)
+            size, ms = measure(summary, JSON, compress, args.iterations)
+            suffix = " + gzip" if compress else ""
+            print(f"{endpoint:<20} {'all' + suffix:<42} {full_size:>8} {1:>7.0%} {full_ms:>10.3f}")
+            print(f"{endpoint:<20} {'summary' + suffix:<42} {size:>8} {size / full_size:>7.0%} {ms:>10.3f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Synthetic data generator for capacity testing.
+
+Produces users, sessions, loan applications, their status event log and
+notifications at production scale on top of the MFIs and loan products
+created by init_sample_data.py.
+
+Usage:
+    python generate_load_data.py --users 1000000 --applications 3000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+
+from utils.auth import hash_password
+from utils.database import MONGO_MAX_POOL_SIZE, create_client
+
+load_dotenv()
+
+# Probability of each final status by application age. Recent applications are
+# mostly still in the pipeline, older ones are mostly decided.
+STATUS_WEIGHTS_BY_AGE = [
+    (14, {"submitted": 55, "under_review": 35, "approved": 6, "rejected": 4, "disbursed": 0}),
+    (60, {"submitted": 10, "under_review": 25, "approved": 30, "rejected": 20, "disbursed": 15}),
+    (None, {"submitted": 1, "under_review": 2, "approved": 12, "rejected": 25, "disbursed": 60}),
+]
+
+STATUS_MESSAGES = {
+    "approved": "Your loan application has been approved!",
+    "rejected": "Your loan application has been rejected.",
+    "under_review": "Your loan application is under review.",
+    "disbursed": "Your loan has been disbursed successfully!"
+}
+
+BUSINESS_TYPES = [
+    "Retail", "Agriculture", "Poultry", "Fisheries", "Tailoring", "Handicrafts",
+    "Food Processing", "Livestock", "Transport", "Small Manufacturing", "Services"
+]
+LOAN_PURPOSES = [
+    "Working capital", "Buy livestock", "Purchase inventory", "Equipment purchase",
+    "Shop renovation", "Seeds and fertilizer", "Expansion", "Buy a rickshaw"
+]
+FIRST_NAMES = [
+    "Rahima", "Karim", "Fatema", "Abdul", "Nasrin", "Rafiq", "Shirin", "Jamal",
+    "Ayesha", "Habib", "Salma", "Mizanur", "Rokeya", "Anwar", "Taslima", "Kamal"
+]
+LAST_NAMES = [
+    "Begum", "Hossain", "Khatun", "Rahman", "Akter", "Islam", "Uddin", "Ahmed",
+    "Sultana", "Chowdhury", "Miah", "Sarkar"
+]
+DISTRICTS = [
+    "Dhaka", "Chattogram", "Rajshahi", "Khulna", "Sylhet", "Barishal", "Rangpur",
+    "Mymensingh", "Bogura", "Cumilla", "Jashore", "Tangail"
+]
+TENURES = [6, 12, 18, 24, 36]
+
+# Set on every generated document, so --drop deletes only generated data
+GENERATED = {"load_test": True}
+# Archived applications keep the marker
+GENERATED_COLLECTIONS = ("users", "user_sessions", "applications", "applications_archive", "application_events", "notifications")
+
+
+def iso(dt):
+    return dt.isoformat()
+
+
+def pick_status(age_days, rng):
+    for max_age, weights in STATUS_WEIGHTS_BY_AGE:
+        if max_age is None or age_days <= max_age:
+            return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def status_path(status):
+    """Statuses an application passes through to reach its final status."""
+    if status == "submitted":
+        return []
+    if status == "under_review":
+        return ["under_review"]
+    if status == "disbursed":
+        return ["under_review", "approved", "disbursed"]
+    return ["under_review", status]
+
+
+def make_user(rng, now, years, role, password_hash, mfi_id=None):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    user_id = str(uuid.uuid4())
+    created_at = now - timedelta(days=rng.uniform(0, years * 365))
+    return {
+        "id": user_id,
+        "email": f"{first.lower()}.{last.lower()}.{user_id[:8]}@example.com",
+        "name": f"{first} {last}",
+        "password_hash": password_hash,
+        "role": role,
+        "mfi_id": mfi_id,
+        "phone": f"+8801{rng.randint(300000000, 999999999)}",
+        "address": rng.choice(DISTRICTS),
+        "created_at": iso(created_at),
+        **GENERATED
+    }
+
+
+def make_session(rng, now, user_id):
+    # Most stored sessions are recent; a tail has already expired and is
+    # waiting to be cleaned up.
+    created_at = now - timedelta(days=rng.expovariate(1 / 5))
+    return {
+        "user_id": user_id,
+        "session_token": uuid.uuid4().hex,
+        "expires_at": created_at + timedelta(days=7),
+        "created_at": created_at,
+        **GENERATED
+    }
+
+
+def make_application(rng, now, years, borrower_id, mfi, officer_ids):
+    # Volume grows over time, so skew creation dates towards the present.
+    age_days = min(rng.expovariate(1 / (years * 365 / 3)), years * 365)
+    created_at = now - timedelta(days=age_days)
+    loan_amount = round(rng.lognormvariate(10.8, 0.8), -2)
+    loan_amount = max(mfi['min_loan_amount'], min(mfi['max_loan_amount'], loan_amount))
+    status = pick_status(age_days, rng)
+
+    app = {
+        "id": str(uuid.uuid4()),
+        "user_id": borrower_id,
+        "mfi_id": mfi['id'],
+        "business_name": f"{rng.choice(LAST_NAMES)} {rng.choice(BUSINESS_TYPES)}",
+        "business_type": rng.choice(BUSINESS_TYPES),
+        "business_age_years": rng.randint(0, 15),
+        "monthly_revenue": round(rng.lognormvariate(10.3, 0.7), -2),
+        "loan_amount": loan_amount,
+        "loan_purpose": rng.choice(LOAN_PURPOSES),
+        "tenure_months": rng.choice(TENURES),
+        "status": status,
+        "documents": [],
+        "created_at": iso(created_at),
+        **GENERATED
+    }
+
+    notifications = [{
+        "id": str(uuid.uuid4()),
+        "user_id": borrower_id,
+        "title": "Application Submitted",
+        "message": f"Your loan application for BDT {loan_amount} has been submitted successfully.",
+        "type": "success",
+        "read": rng.random() < 0.9,
+        "link": f"/applications/{app['id']}",
+        "created_at": iso(created_at),
+        "updated_at": iso(created_at),
+        **GENERATED
+    }]
+
+    officer_id = rng.choice(officer_ids)
+    events = [{
+        "id": str(uuid.uuid4()),
+        "application_id": app['id'],
+        "user_id": borrower_id,
+        "mfi_id": mfi['id'],
+        "from_status": None,
+        "to_status": "submitted",
+        "officer_id": None,
+        "notes": None,
+        "application_created_at": app['created_at'],
+        "created_at": app['created_at'],
+        **GENERATED
+    }]
+
+    updated_at = created_at
+    previous = "submitted"
+    for step in status_path(status):
+        updated_at = min(now, updated_at + timedelta(hours=rng.uniform(4, 24 * mfi['processing_time_days'])))
+        events.append({
+            **events[0],
+            "id": str(uuid.uuid4()),
+            "from_status": previous,
+            "to_status": step,
+            "officer_id": officer_id,
+            "created_at": iso(updated_at)
+        })
+        previous = step
+        notifications.append({
+            "id": str(uuid.uuid4()),
+            "user_id": borrower_id,
+            "title": "Application Status Update",
+            "message": STATUS_MESSAGES[step],
+            "type": "info" if step != "rejected" else "warning",
+            "read": (now - updated_at).days > 3 and rng.random() < 0.85,
+            "link": f"/applications/{app['id']}",
+            "created_at": iso(updated_at),
+            "updated_at": iso(updated_at),
+            **GENERATED
+        })
+
+    if status != "submitted":
+        app["officer_id"] = officer_id
+        app["officer_notes"] = "Reviewed by field officer"
+    if status == "rejected":
+        app["rejection_reason"] = rng.choice([
+            "Insufficient business history", "Loan amount exceeds repayment capacity",
+            "Incomplete documentation"
+        ])
+    app["updated_at"] = iso(updated_at)
+    return app, notifications, events
+
+
+class BatchWriter:
+    """Runs batched insert_many calls concurrently and reports progress."""
+
+    def __init__(self, db, batch_size, concurrency):
+        self.db = db
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.tasks = set()
+        self.buffers = {}
+        self.inserted = {}
+        self.started = time.monotonic()
+        self.last_report = 0.0
+
+    async def add(self, collection, doc):
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            self.buffers[collection] = []
+            await self._submit(collection, buffer)
+
+    async def _submit(self, collection, docs):
+        # Acquiring before creating the task bounds the number of batches held
+        # in memory as well as the number of in-flight writes.
+        await self.semaphore.acquire()
+        task = asyncio.create_task(self._insert(collection, docs))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _insert(self, collection, docs):
+        try:
+            try:
+                result = await self.db[collection].insert_many(docs, ordered=False)
+                count = len(result.inserted_ids)
+            except BulkWriteError as e:
+                count = e.details.get('nInserted', 0)
+                print(f"! {collection}: {len(e.details.get('writeErrors', []))} write errors in batch")
+            self.inserted[collection] = self.inserted.get(collection, 0) + count
+            self._report()
+        finally:
+            self.semaphore.release()
+
+    def _report(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_report < 2:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        total = sum(self.inserted.values())
+        counts = ", ".join(f"{name}={count:,}" for name, count in sorted(self.inserted.items()))
+        print(f"  [{elapsed:7.1f}s] {counts} ({total / max(elapsed, 1e-6):,.0f} docs/s)")
+
+    async def flush(self):
+        for collection, buffer in list(self.buffers.items()):
+            if buffer:
+                self.buffers[collection] = []
+                await self._submit(collection, buffer)
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
+        self._report(force=True)
+
+
+async def generate(args):
+    # Enough pooled connections for every concurrent batch
+    client = create_client(maxPoolSize=max(args.concurrency, MONGO_MAX_POOL_SIZE))
+    db = client[os.environ['DB_NAME']]
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+
+    mfis = await db.mfis.find({}, {"_id": 0}).to_list(None)
+    if not mfis:
+        print("No MFIs found. Run init_sample_data.py first.")
+        client.close()
+        return
+
+    if args.drop:
+        for name in GENERATED_COLLECTIONS:
+            result = await db[name].delete_many(GENERATED)
+            print(f"Deleted {result.deleted_count:,} generated {name}")
+
+    print(f"Generating {args.users:,} users and {args.applications:,} applications "
+          f"over {args.years} years across {len(mfis)} MFIs...")
+
+    # Hashing once keeps generation fast; every generated account shares the
+    # password "password123".
+    password_hash = hash_password("password123")
+    writer = BatchWriter(db, args.batch_size, args.concurrency)
+
+    # Officers work for one MFI each, assigned round robin
+    officer_count = max(1, int(args.users * args.officer_ratio))
+    officer_ids = []
+    officers_by_mfi = {}
+    borrower_ids = []
+    for i in range(args.users):
+        role = "officer" if i < officer_count else "borrower"
+        mfi_id = mfis[i % len(mfis)]['id'] if role == "officer" else None
+        user = make_user(rng, now, args.years, role, password_hash, mfi_id)
+        (officer_ids if role == "officer" else borrower_ids).append(user['id'])
+        if mfi_id:
+            officers_by_mfi.setdefault(mfi_id, []).append(user['id'])
+        await writer.add("users", user)
+        if rng.random() < args.session_ratio:
+            await writer.add("user_sessions", make_session(rng, now, user['id']))
+
+    if not borrower_ids:
+        borrower_ids = officer_ids
+
+    # Repeat customers: a tenth of borrowers submit a third of applications.
+    # Larger MFIs (earlier in the list) receive more applications.
+    repeat_borrowers = borrower_ids[:max(1, len(borrower_ids) // 10)]
+    mfi_weights = [1 / (rank + 1) for rank in range(len(mfis))]
+    for _ in range(args.applications):
+        borrower_id = rng.choice(repeat_borrowers if rng.random() < 0.3 else borrower_ids)
+        mfi = rng.choices(mfis, weights=mfi_weights)[0]
+        app, notifications, events = make_application(
+            rng, now, args.years, borrower_id, mfi, officers_by_mfi.get(mfi['id'], officer_ids)
+        )
+        await writer.add("applications", app)
+        for notif in notifications:
+            await writer.add("notifications", notif)
+        for event in events:
+            await writer.add("application_events", event)
+
+    await writer.flush()
+    print("✓ Load data generation complete!")
+    client.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic GrameenGo data for capacity testing.")
+    parser.add_argument("--users", type=int, default=100000, help="number of users to create")
+    parser.add_argument("--applications", type=int, default=300000, help="number of loan applications to create")
+    parser.add_argument("--years", type=float, default=3, help="span of history to spread applications over")
+    parser.add_argument("--officer-ratio", type=float, default=0.002, help="share of users that are loan officers")
+    parser.add_argument("--session-ratio", type=float, default=0.3, help="share of users with a stored session")
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many call")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel insert_many calls")
+    parser.add_argument("--seed", type=int, default=None, help="random seed for reproducible data")
+    parser.add_argument("--drop", action="store_true",
+                        help="first delete documents an earlier run generated (marked load_test), leaving other data alone")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(generate(parse_args()))
@@ -1,15 +1,15 @@
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timezone, timedelta
 import uuid
 import random
 
+from utils.database import create_client
+
 load_dotenv()
 
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = create_client()
 db = client[os.environ['DB_NAME']]
 
 async def init_sample_data():
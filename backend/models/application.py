@@ -2,6 +2,11 @@ from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime, timezone
 
+# Fields returned for ?fields=summary, enough for application lists
+APPLICATION_SUMMARY_FIELDS = [
+    "id", "user_id", "mfi_id", "business_name", "loan_amount", "tenure_months", "status", "created_at", "updated_at"
+]
+
 class LoanApplication(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -27,6 +32,9 @@ class LoanApplication(BaseModel):
     # Application Status
     status: str = "submitted"  # submitted, under_review, approved, rejected, disbursed
     officer_id: Optional[str] = None
+    priority: int = 0  # higher is reviewed first
+    claimed_by: Optional[str] = None  # officer holding the review lease
+    lease_expires_at: Optional[datetime] = None
     officer_notes: Optional[str] = None
     rejection_reason: Optional[str] = None
     
@@ -48,3 +56,22 @@ class ApplicationUpdate(BaseModel):
     status: Optional[str] = None
     officer_notes: Optional[str] = None
     rejection_reason: Optional[str] = None
+
+class ApplicationReportBatch(BaseModel):
+    """Applications to render into one ZIP of PDF reports."""
+    application_ids: List[str] = Field(min_length=1, max_length=500)
+
+class ApplicationEvent(BaseModel):
+    """Append-only record of an application status transition."""
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str
+    application_id: str
+    user_id: str
+    mfi_id: str
+    from_status: Optional[str] = None  # None for the initial submission
+    to_status: str
+    officer_id: Optional[str] = None
+    notes: Optional[str] = None
+    application_created_at: datetime
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
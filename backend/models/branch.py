@@ -0,0 +1,31 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List
+
+# Branches per POST /api/mfis/{mfi_id}/branches request
+MAX_BRANCH_IMPORT = 5000
+
+class BranchCreate(BaseModel):
+    name: str
+    address: Optional[str] = None
+    district: Optional[str] = None
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    contact_phone: Optional[str] = None
+    opening_hours: Optional[str] = None
+
+class BranchImport(BaseModel):
+    branches: List[BranchCreate] = Field(min_length=1, max_length=MAX_BRANCH_IMPORT)
+    replace: bool = False  # drop the MFI's existing branches first
+
+class Branch(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str
+    mfi_id: str
+    name: str
+    address: Optional[str] = None
+    district: Optional[str] = None
+    location: dict  # GeoJSON point: {"type": "Point", "coordinates": [longitude, latitude]}
+    contact_phone: Optional[str] = None
+    opening_hours: Optional[str] = None
+    created_at: str
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime, timezone
+
+class DocumentUploadCreate(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    content_type: str
+    length: int = Field(gt=0)  # total file size in bytes
+
+class ApplicationDocument(BaseModel):
+    """Entry in LoanApplication.documents for a stored file."""
+    model_config = ConfigDict(extra="ignore")
+    
+    file_id: str
+    filename: str
+    content_type: str
+    length: int
+    sha256: str
+    uploaded_by: str
+    uploaded_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
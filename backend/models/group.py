@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+
+Weekday = Literal["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+class CenterCreate(BaseModel):
+    """A village center whose borrower groups meet together every week."""
+    mfi_id: str
+    name: str
+    village: Optional[str] = None
+    district: Optional[str] = None
+    meeting_day: Weekday
+    meeting_time: Optional[str] = None  # e.g. "10:00"
+    officer_id: Optional[str] = None  # defaults to the officer creating the center
+
+class GroupCreate(BaseModel):
+    """A borrower group within a center; members are borrowers' user ids."""
+    name: str
+    member_ids: List[str] = Field(min_length=1, max_length=10)
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+class ApplicationExportCreate(BaseModel):
+    status: Optional[str] = None  # only export applications in this status
+
+class CollectionSheetsCreate(BaseModel):
+    week_of: Optional[date] = None  # any day in the week; defaults to the current week
+    mfi_id: Optional[str] = None  # only this MFI's centers
@@ -2,6 +2,10 @@ from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime, timezone
 
+# Fields returned for ?fields=summary
+MFI_SUMMARY_FIELDS = ["id", "name", "min_loan_amount", "max_loan_amount", "interest_rate", "processing_time_days", "logo_url"]
+LOAN_PRODUCT_SUMMARY_FIELDS = ["id", "mfi_id", "name", "min_amount", "max_amount", "interest_rate", "tenure_months"]
+
 class MFI(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -2,6 +2,9 @@ from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from datetime import datetime, timezone
 
+# Fields returned for ?fields=summary; leaves out the message body
+NOTIFICATION_SUMMARY_FIELDS = ["id", "title", "type", "read", "link", "created_at"]
+
 class Notification(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -0,0 +1,13 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+
+class SyncOperation(BaseModel):
+    """An operation a client queued while offline, replayed through POST /api/sync/ops."""
+    op_id: str = Field(min_length=1, max_length=255)  # client-generated, echoed back in the result
+    type: Literal["create_application", "update_application", "mark_notification_read"]
+    target_id: Optional[str] = None  # application or notification id for updates
+    base_updated_at: Optional[str] = None  # updated_at the client last saw, for update_application
+    data: dict = {}  # ApplicationCreate / ApplicationUpdate fields
+
+class SyncBatch(BaseModel):
+    ops: List[SyncOperation] = Field(min_length=1, max_length=200)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import Optional
+from typing import Optional, Literal
 from datetime import datetime
 
 class User(BaseModel):
@@ -10,6 +10,7 @@ class User(BaseModel):
     name: str
     password_hash: Optional[str] = None
     role: str = "borrower"  # borrower, officer, admin
+    mfi_id: Optional[str] = None  # the MFI an officer works for
     picture: Optional[str] = None
     phone: Optional[str] = None
     nid: Optional[str] = None
@@ -36,6 +37,10 @@ class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class UserRoleUpdate(BaseModel):
+    role: Literal["borrower", "officer", "admin"]
+    mfi_id: Optional[str] = None  # required for officers not yet assigned to an MFI
+
 class UserResponse(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -43,6 +48,7 @@ class UserResponse(BaseModel):
     email: str
     name: str
     role: str
+    mfi_id: Optional[str] = None
     picture: Optional[str] = None
     phone: Optional[str] = None
     business_name: Optional[str] = None
@@ -0,0 +1,62 @@
+"""
+Import-time breakdown of the API process.
+
+Imports `server` in a fresh interpreter with `python -X importtime` and
+reports the cumulative import time of each module it imports directly,
+largest first, so slow dependencies show up before they slow worker cold
+starts.
+
+Usage:
+    python profile_startup.py --top 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def import_times(module):
+    """(module name, nesting depth, self microseconds, cumulative microseconds) per import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).parent, capture_output=True, text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    )
+    if result.returncode != 0:
+        sys.exit(result.stderr)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API import time.")
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    end = max(i for i, row in enumerate(rows) if row[0] == args.module)
+    root = rows[end]
+    # -X importtime lists a module's imports just before the module itself, one level deeper
+    start = end
+    while start > 0 and rows[start - 1][1] > root[1]:
+        start -= 1
+    direct = [row for row in rows[start:end] if row[1] == root[1] + 1]
+
+    total_ms = root[3] / 1000
+    print(f"{'module':<40} {'cumulative ms':>14} {'share':>7}")
+    for name, _, _, cumulative_us in sorted(direct, key=lambda row: -row[3])[:args.top]:
+        print(f"{name:<40} {cumulative_us / 1000:>14.1f} {cumulative_us / 1000 / total_ms:>6.0%}")
+    print(f"{args.module + ' (own code)':<40} {root[2] / 1000:>14.1f} {root[2] / 1000 / total_ms:>6.0%}")
+    print(f"{'total':<40} {total_ms:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from utils.invalidation import InvalidationBus
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def get(self, user_id: str) -> Optional[dict]:
+        """Get a user by id."""
+
+    @abstractmethod
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        """Get a user by email address."""
+
+    @abstractmethod
+    async def create(self, user: dict) -> None:
+        """Store a new user."""
+
+    @abstractmethod
+    async def update(self, user_id: str, fields: dict) -> Optional[dict]:
+        """Set fields on a user and return the updated document."""
+
+
+class SessionRepository(ABC):
+    @abstractmethod
+    async def get_by_token(self, session_token: str) -> Optional[dict]:
+        """Get an Emergent session by its token."""
+
+    @abstractmethod
+    async def create(self, session: dict) -> None:
+        """Store a new session."""
+
+    @abstractmethod
+    async def delete_by_token(self, session_token: str) -> None:
+        """Delete a session by its token."""
+
+    @abstractmethod
+    async def delete_expired(self, now: datetime) -> int:
+        """Delete sessions that expired before `now`; returns how many."""
+
+
+class MFIRepository(ABC):
+    @abstractmethod
+    async def list(self, limit: int = 100, fields: Optional[List[str]] = None) -> List[dict]:
+        """List MFIs in insertion order, with only `fields` if given."""
+
+    @abstractmethod
+    async def get(self, mfi_id: str) -> Optional[dict]:
+        """Get an MFI by id."""
+
+    @abstractmethod
+    async def create(self, mfi: dict) -> None:
+        """Store a new MFI."""
+
+
+class LoanProductRepository(ABC):
+    @abstractmethod
+    async def list(self, mfi_id: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None) -> List[dict]:
+        """List loan products, optionally only those of one MFI, with only `fields` if given."""
+
+    @abstractmethod
+    async def get(self, product_id: str) -> Optional[dict]:
+        """Get a loan product by id."""
+
+    @abstractmethod
+    async def create(self, product: dict) -> None:
+        """Store a new loan product."""
+
+
+class BranchRepository(ABC):
+    @abstractmethod
+    async def list(self, mfi_id: str, limit: Optional[int] = 1000) -> List[dict]:
+        """List an MFI's branches by name."""
+
+    @abstractmethod
+    async def create_many(self, branches: List[dict]) -> None:
+        """Store new branches."""
+
+    @abstractmethod
+    async def delete_for_mfi(self, mfi_id: str) -> int:
+        """Delete all of an MFI's branches; returns how many there were."""
+
+    @abstractmethod
+    async def nearby(
+        self, longitude: float, latitude: float, max_distance_km: float,
+        mfi_ids: Optional[List[str]] = None, limit: int = 20, nearest_per_mfi: bool = False
+    ) -> List[dict]:
+        """Branches within `max_distance_km`, nearest first, each with `distance_km`.
+
+        mfi_ids: only branches of these MFIs.
+        nearest_per_mfi: only each MFI's nearest branch.
+        """
+
+
+class CenterRepository(ABC):
+    """Group-lending centers and the borrower groups that meet at them."""
+
+    @abstractmethod
+    async def create_center(self, center: dict) -> None:
+        """Store a new center."""
+
+    @abstractmethod
+    async def get_center(self, center_id: str) -> Optional[dict]:
+        """Get a center by id."""
+
+    @abstractmethod
+    async def list_centers(self, mfi_id: Optional[str] = None, limit: Optional[int] = 100) -> List[dict]:
+        """List centers by name, optionally only one MFI's."""
+
+    @abstractmethod
+    async def create_group(self, group: dict) -> None:
+        """Store a new group."""
+
+    @abstractmethod
+    async def list_groups(self, center_id: str) -> List[dict]:
+        """List a center's groups by name."""
+
+    @abstractmethod
+    async def find_group_for_member(self, user_id: str, mfi_id: str) -> Optional[dict]:
+        """The borrower's group at an MFI, if any."""
+
+    @abstractmethod
+    def stream_active_loans(self, mfi_id: Optional[str] = None) -> AsyncIterator[dict]:
+        """Iterate group members' disbursed loans from their group's MFI, ordered by center and group.
+
+        Includes disbursed loans already moved to the application archive.
+
+        Each item has center_id, group_id, group_name, user_id, borrower_name,
+        application_id, mfi_id, loan_amount, tenure_months and disbursed_at.
+        """
+
+
+class ApplicationRepository(ABC):
+    """Applications, partitioned by MFI.
+
+    Methods taking `mfi_id` only see that MFI's applications when it's given;
+    officers' queries always pass it, so on a sharded cluster they are routed
+    to the shard holding the MFI's data.
+    """
+
+    @abstractmethod
+    async def list(
+        self, user_id: Optional[str] = None, limit: int = 100, fields: Optional[List[str]] = None, mfi_id: Optional[str] = None
+    ) -> List[dict]:
+        """List applications newest first, optionally only those of one borrower, with only `fields` if given."""
+
+    @abstractmethod
+    async def get(self, app_id: str) -> Optional[dict]:
+        """Get an application by id."""
+
+    @abstractmethod
+    async def create(self, application: dict, event: Optional[dict] = None) -> None:
+        """Store a new application, with its submission event if `event` is given."""
+
+    @abstractmethod
+    async def create_many(self, applications: List[dict], events: List[Optional[dict]]) -> None:
+        """Store several new applications in one write; `events` pairs up with `applications`."""
+
+    @abstractmethod
+    async def update(
+        self, app_id: str, fields: dict, event: Optional[dict] = None, expected_updated_at: Optional[str] = None
+    ) -> Optional[dict]:
+        """Set fields on an application and return the updated document.
+
+        If `event` is given and the status changes, the transition is appended
+        to the event log in the same write. With `expected_updated_at`, the
+        update only applies if the stored updated_at still matches; otherwise
+        nothing is written and None is returned.
+        """
+
+    @abstractmethod
+    async def add_document(self, app_id: str, document: dict, updated_at: str) -> None:
+        """Append an uploaded document to an application."""
+
+    @abstractmethod
+    async def claim_next(self, officer_id: str, now: str, lease_expires_at: str, mfi_id: str) -> Optional[dict]:
+        """Lease the highest-priority, oldest submitted application of an MFI not leased at `now`.
+
+        `now` also becomes the application's updated_at.
+        """
+
+    @abstractmethod
+    async def release_claim(self, app_id: str, officer_id: str, updated_at: str) -> Optional[dict]:
+        """Give up an officer's lease on an application."""
+
+    @abstractmethod
+    async def list_updated_since(
+        self, after: Tuple[str, str], user_id: Optional[str] = None, limit: int = 500, mfi_id: Optional[str] = None
+    ) -> List[dict]:
+        """Applications ordered by (updated_at, id), starting after the cursor `after`."""
+
+    @abstractmethod
+    async def list_closed_before(self, statuses: List[str], cutoff: str, limit: int = 500) -> List[dict]:
+        """Applications in one of `statuses` last updated before `cutoff`."""
+
+    @abstractmethod
+    async def delete_many(self, app_ids: List[str]) -> None:
+        """Remove applications (after they have been archived)."""
+
+    @abstractmethod
+    async def count(self, statuses: Optional[List[str]] = None, mfi_id: Optional[str] = None) -> int:
+        """Count applications, optionally only those in the given statuses."""
+
+    @abstractmethod
+    async def total_loan_amount(self, status: str, mfi_id: Optional[str] = None) -> float:
+        """Sum of loan_amount over applications in a status."""
+
+    @abstractmethod
+    async def monthly_trends(self, limit: int = 12, mfi_id: Optional[str] = None) -> List[dict]:
+        """Application count and loan amount per month, oldest first."""
+
+
+class ApplicationEventRepository(ABC):
+    """Append-only log of application status transitions."""
+
+    @abstractmethod
+    async def list_for_application(self, app_id: str) -> List[dict]:
+        """All events of one application, oldest first."""
+
+    @abstractmethod
+    async def list_range(self, since: str, until: str, limit: int = 100, mfi_id: Optional[str] = None) -> List[dict]:
+        """Events with since <= created_at < until, oldest first, optionally of one MFI's applications."""
+
+    @abstractmethod
+    def stream(
+        self, since: str, until: str, to_statuses: Optional[List[str]] = None, mfi_id: Optional[str] = None
+    ) -> AsyncIterator[dict]:
+        """Iterate events in a time range oldest first without loading them all."""
+
+
+def make_status_event(before: Optional[dict], after: dict, event: Optional[dict]) -> Optional[dict]:
+    """Build the event log entry for an application write, or None if the status didn't change."""
+    if event is None:
+        return None
+    from_status = before.get('status') if before else None
+    to_status = after.get('status', from_status)
+    if to_status == from_status:
+        return None
+    app = before or after
+    return {
+        **event,
+        "application_id": app['id'],
+        "user_id": app['user_id'],
+        "mfi_id": app['mfi_id'],
+        "from_status": from_status,
+        "to_status": to_status,
+        "application_created_at": app['created_at']
+    }
+
+
+class DocumentStore(ABC):
+    """Chunked file storage with resumable upload sessions.
+
+    Upload sessions track how many bytes are durably stored: whole chunks plus
+    a `pending` tail shorter than one chunk. One request at a time appends to
+    an upload: it reserves the upload at its offset under a writer id before
+    writing chunks, and commits progress only while it still holds the
+    reservation, so concurrent requests can't overwrite each other's chunks.
+    A finished upload becomes a file
+    whose id is the upload id, unless it was deduplicated against an
+    identical existing file.
+    """
+
+    chunk_size: int
+
+    @abstractmethod
+    async def create_upload(self, upload: dict) -> None:
+        """Store a new upload session."""
+
+    @abstractmethod
+    async def get_upload(self, upload_id: str) -> Optional[dict]:
+        """Get an upload session by id."""
+
+    @abstractmethod
+    async def reserve_upload(
+        self, upload_id: str, writer: str, expected_offset: int, now: datetime, lease_expires_at: datetime
+    ) -> bool:
+        """Reserve an upload at expected_offset for `writer` until lease_expires_at, or renew the reservation.
+
+        Returns False if the offset moved, the upload is complete, or another
+        writer holds an unexpired reservation.
+        """
+
+    @abstractmethod
+    async def release_upload(self, upload_id: str, writer: str) -> None:
+        """Drop `writer`'s reservation, if it still holds it."""
+
+    @abstractmethod
+    async def write_chunk(self, upload_id: str, n: int, data: bytes) -> None:
+        """Write (or overwrite) chunk number n of an upload; only call while holding a reservation."""
+
+    @abstractmethod
+    async def commit_progress(
+        self, upload_id: str, writer: str, expected_offset: int, offset: int, next_n: int, pending: bytes
+    ) -> bool:
+        """Record upload progress if `writer` still holds the reservation at expected_offset; False on conflict."""
+
+    @abstractmethod
+    def iter_chunks(self, upload_id: str) -> AsyncIterator[bytes]:
+        """Iterate an upload's chunks in order."""
+
+    @abstractmethod
+    async def find_by_hash(self, sha256: str) -> Optional[dict]:
+        """Get a stored file by content hash."""
+
+    @abstractmethod
+    async def finalize(self, upload_id: str, file: Optional[dict]) -> None:
+        """Mark an upload complete, storing `file` as its file record unless None."""
+
+    @abstractmethod
+    async def discard_chunks(self, upload_id: str) -> None:
+        """Delete the chunks of an upload."""
+
+    @abstractmethod
+    async def get_file(self, file_id: str) -> Optional[dict]:
+        """Get a stored file record by id."""
+
+    @abstractmethod
+    def read_range(self, file_id: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Iterate the bytes of a file from start up to (not including) end."""
+
+
+class NotificationRepository(ABC):
+    @abstractmethod
+    async def list_for_user(self, user_id: str, limit: int = 50, fields: Optional[List[str]] = None) -> List[dict]:
+        """List a user's notifications newest first, with only `fields` if given."""
+
+    @abstractmethod
+    async def create(self, notification: dict) -> None:
+        """Store a new notification."""
+
+    @abstractmethod
+    async def create_many(self, notifications: List[dict]) -> None:
+        """Store several notifications in one write."""
+
+    @abstractmethod
+    async def mark_read(self, notif_id: str, user_id: str, updated_at: str) -> None:
+        """Mark one of a user's notifications as read."""
+
+    @abstractmethod
+    async def mark_read_many(self, notif_ids: List[str], user_id: str, updated_at: str) -> None:
+        """Mark several of a user's notifications as read in one write."""
+
+    @abstractmethod
+    async def list_updated_since(self, user_id: str, after: Tuple[str, str], limit: int = 500) -> List[dict]:
+        """A user's notifications ordered by (updated_at, id), starting after the cursor `after`."""
+
+    @abstractmethod
+    async def list_read_before(self, cutoff: str, limit: int = 1000) -> List[dict]:
+        """Read notifications created before `cutoff`."""
+
+    @abstractmethod
+    async def delete_many(self, notif_ids: List[str]) -> None:
+        """Remove notifications (after they have been written to the archive)."""
+
+
+class TombstoneRepository(ABC):
+    """Records of deleted documents, so delta sync clients can drop them."""
+
+    @abstractmethod
+    async def add_many(self, collection: str, tombstones: List[dict]) -> None:
+        """Record deletions in one write, each as {"id", "user_id", "deleted_at"}; applications also carry "mfi_id"."""
+
+    @abstractmethod
+    async def list_since(
+        self, collection: str, after: Tuple[str, str], user_id: Optional[str] = None, limit: int = 500,
+        mfi_id: Optional[str] = None
+    ) -> List[dict]:
+        """Deletions ordered by (deleted_at, id) after the cursor `after`, as {"id", "deleted_at"}."""
+
+
+class IdempotencyKeyRepository(ABC):
+    @abstractmethod
+    async def reserve(self, user_id: str, key: str, request_hash: str, expires_at: datetime) -> Optional[dict]:
+        """Atomically claim a key for a user.
+
+        Returns None if this caller claimed the key, otherwise the existing
+        record (whose `response` is None while the first request is running).
+        """
+
+    @abstractmethod
+    async def complete(self, user_id: str, key: str, response: dict) -> None:
+        """Store the response for a claimed key."""
+
+    @abstractmethod
+    async def release(self, user_id: str, key: str) -> None:
+        """Drop a claimed key so the request can be retried."""
+
+
+class RevokedTokenRepository(ABC):
+    @abstractmethod
+    async def add(self, jti: str, expires_at: datetime) -> None:
+        """Revoke a JWT by its id until `expires_at`, when the token expires anyway."""
+
+    @abstractmethod
+    async def is_revoked(self, jti: str) -> bool:
+        """Whether a JWT id has been revoked."""
+
+    @abstractmethod
+    async def list_active(self, now: datetime) -> List[str]:
+        """Ids of revoked tokens that haven't expired by `now`."""
+
+
+class ApplicationArchiveRepository(ABC):
+    """Cold storage for closed applications moved out of `applications`.
+
+    Running totals of what has been archived are kept alongside, so analytics
+    can include archived applications without scanning the archive.
+    """
+
+    @abstractmethod
+    async def archive(self, applications: List[dict]) -> None:
+        """Store copies of applications, replacing any already archived; the totals are left alone."""
+
+    @abstractmethod
+    async def add_to_totals(self, applications: List[dict]) -> None:
+        """Count archived applications in the totals, once they're gone from `applications`."""
+
+    @abstractmethod
+    async def rebuild_totals(self) -> int:
+        """Recompute the totals from the archived applications; returns how many were counted."""
+
+    @abstractmethod
+    async def get(self, app_id: str) -> Optional[dict]:
+        """Get an archived application by id."""
+
+    @abstractmethod
+    async def totals(self, mfi_id: Optional[str] = None) -> dict:
+        """{"statuses": {status: {"count", "loan_amount"}}, "months": {(year, month): {"count", "total_amount"}}}.
+
+        With `mfi_id`, only that MFI's applications count.
+        """
+
+
+class JobRepository(ABC):
+    """Background jobs, leased to one worker at a time.
+
+    A job is `scheduled` until its run_at, `running` while leased, and then
+    either scheduled again (periodic jobs and retries) or `succeeded`/`failed`.
+    """
+
+    @abstractmethod
+    async def ensure(self, job: dict) -> None:
+        """Store a job unless one with the same id exists (used for periodic jobs)."""
+
+    @abstractmethod
+    async def enqueue(self, job: dict) -> None:
+        """Store a new one-shot job."""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[dict]:
+        """Get a job by id."""
+
+    @abstractmethod
+    async def claim_due(self, names: List[str], worker_id: str, now: str, lease_expires_at: str) -> Optional[dict]:
+        """Lease the earliest due job with one of `names` to a worker.
+
+        Due means scheduled with run_at <= now, or running under a lease that
+        expired before `now` because its worker died. Claiming increments the
+        job's `attempts`.
+        """
+
+    @abstractmethod
+    async def extend_lease(self, job_id: str, worker_id: str, lease_expires_at: str) -> bool:
+        """Keep a running job's lease; False if the worker no longer holds it."""
+
+    @abstractmethod
+    async def finish(self, job_id: str, worker_id: str, fields: dict) -> bool:
+        """Release a job's lease, setting `fields`; False if the worker no longer held it."""
+
+    @abstractmethod
+    async def list(self, limit: int = 100) -> List[dict]:
+        """Jobs, most recently updated first."""
+
+
+class Repositories:
+    """Bundle of repositories handed to request handlers."""
+
+    users: UserRepository
+    sessions: SessionRepository
+    mfis: MFIRepository
+    loan_products: LoanProductRepository
+    branches: BranchRepository
+    centers: CenterRepository
+    applications: ApplicationRepository
+    application_events: ApplicationEventRepository
+    notifications: NotificationRepository
+    documents: DocumentStore
+    tombstones: TombstoneRepository
+    idempotency_keys: IdempotencyKeyRepository
+    revoked_tokens: RevokedTokenRepository
+    jobs: JobRepository
+    application_archive: ApplicationArchiveRepository
+
+    async def ensure_indexes(self) -> None:
+        """Create any indexes the backend needs. No-op by default."""
+
+    async def ping(self) -> None:
+        """One round trip to the backend, for latency monitoring. No-op by default."""
+
+    async def warm_up(self) -> None:
+        """Open connections ahead of the first requests. No-op by default."""
+
+    def invalidation_bus(self) -> InvalidationBus:
+        """Bus for cache invalidations; only reaches this process by default."""
+        return InvalidationBus()
+
+    def with_read_preference(self, read_preference) -> "Repositories":
+        """Repositories whose reads are routed by a pymongo read preference.
+
+        Backends without replicas return themselves.
+        """
+        return self
+
+    def close(self) -> None:
+        """Release backend resources. No-op by default."""
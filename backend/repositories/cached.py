@@ -0,0 +1,185 @@
+"""
+Per-worker caching in front of another backend's repositories.
+
+Users and sessions are read on every authenticated request, so lookups are
+served from VersionedCaches, and JWT revocation checks from an in-memory
+denylist. Every write through these wrappers publishes an invalidation, so
+other workers drop their copies (and re-index the changed MFI or loan
+product) without waiting for entries to expire.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+
+from repositories.base import UserRepository, SessionRepository, MFIRepository, LoanProductRepository, RevokedTokenRepository
+from utils.invalidation import VersionedCache
+from utils.revocation import REVOCATION_REFRESH_SECONDS, TokenDenylist
+
+AUTH_CACHE_SECONDS = int(os.environ.get('AUTH_CACHE_SECONDS', 60))
+
+USERS = "users"
+SESSIONS = "sessions"
+MFIS = "mfis"
+LOAN_PRODUCTS = "loan_products"
+REVOKED_TOKENS = "revoked_tokens"
+
+logger = logging.getLogger(__name__)
+
+
+class CachedUserRepository(UserRepository):
+    def __init__(self, inner, bus):
+        self.inner = inner
+        self.bus = bus
+        self.cache = VersionedCache(bus, USERS, AUTH_CACHE_SECONDS)
+
+    async def get(self, user_id):
+        return await self.cache.get(user_id, lambda: self.inner.get(user_id))
+
+    async def get_by_email(self, email):
+        return await self.inner.get_by_email(email)
+
+    async def create(self, user):
+        await self.inner.create(user)
+
+    async def update(self, user_id, fields):
+        user = await self.inner.update(user_id, fields)
+        await self.bus.publish(USERS, user_id)
+        return user
+
+
+class CachedSessionRepository(SessionRepository):
+    def __init__(self, inner, bus):
+        self.inner = inner
+        self.bus = bus
+        self.cache = VersionedCache(bus, SESSIONS, AUTH_CACHE_SECONDS)
+
+    async def get_by_token(self, session_token):
+        return await self.cache.get(session_token, lambda: self.inner.get_by_token(session_token))
+
+    async def create(self, session):
+        await self.inner.create(session)
+
+    async def delete_by_token(self, session_token):
+        await self.inner.delete_by_token(session_token)
+        await self.bus.publish(SESSIONS, session_token)
+
+    async def delete_expired(self, now):
+        # Cached copies carry expires_at, so callers already reject them
+        return await self.inner.delete_expired(now)
+
+
+class PublishingMFIRepository(MFIRepository):
+    def __init__(self, inner, bus):
+        self.inner = inner
+        self.bus = bus
+
+    async def list(self, limit=100, fields=None):
+        return await self.inner.list(limit, fields)
+
+    async def get(self, mfi_id):
+        return await self.inner.get(mfi_id)
+
+    async def create(self, mfi):
+        await self.inner.create(mfi)
+        await self.bus.publish(MFIS, mfi['id'])
+
+
+class PublishingLoanProductRepository(LoanProductRepository):
+    def __init__(self, inner, bus):
+        self.inner = inner
+        self.bus = bus
+
+    async def list(self, mfi_id=None, limit=100, fields=None):
+        return await self.inner.list(mfi_id, limit, fields)
+
+    async def get(self, product_id):
+        return await self.inner.get(product_id)
+
+    async def create(self, product):
+        await self.inner.create(product)
+        await self.bus.publish(LOAN_PRODUCTS, product['id'])
+
+
+class CachedRevokedTokenRepository(RevokedTokenRepository):
+    """Answers revocation checks from a TokenDenylist of every unexpired revoked token.
+
+    Revocations from other workers arrive as invalidations keyed by jti. Until
+    start() has loaded the denylist, checks fall through to the database.
+    """
+
+    def __init__(self, inner, bus):
+        self.inner = inner
+        self.bus = bus
+        self.denylist = None
+        self.delivered = set()  # jtis delivered while the denylist is being reloaded
+        self.reload = asyncio.Event()
+        self.task = None
+        bus.subscribe(REVOKED_TOKENS, self._on_invalidation)
+
+    def _on_invalidation(self, jti):
+        if jti is None:
+            # Missed some; only a reload can tell which
+            self.reload.set()
+            return
+        self.delivered.add(jti)
+        if self.denylist is not None:
+            self.denylist.add(jti)
+            if self.denylist.full:
+                self.reload.set()
+
+    async def add(self, jti, expires_at):
+        await self.inner.add(jti, expires_at)
+        await self.bus.publish(REVOKED_TOKENS, jti)
+
+    async def is_revoked(self, jti):
+        if self.denylist is None:
+            return await self.inner.is_revoked(jti)
+        return jti in self.denylist
+
+    async def list_active(self, now):
+        return await self.inner.list_active(now)
+
+    async def _load(self):
+        self.delivered = set()
+        denylist = TokenDenylist(await self.inner.list_active(datetime.now(timezone.utc)))
+        # Revocations delivered during the read may not be in it
+        for jti in self.delivered:
+            denylist.add(jti)
+        self.denylist = denylist
+
+    async def start(self):
+        await self._load()
+        self.task = asyncio.create_task(self._refresh())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def _refresh(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.reload.wait(), REVOCATION_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.reload.clear()
+            try:
+                await self._load()
+            except Exception:
+                # The current denylist stays in use
+                logger.exception("Reloading revoked tokens failed")
+                await asyncio.sleep(1)
+
+
+def add_caches(repos, bus):
+    """Wrap `repos` in place so reads are cached and writes publish invalidations on `bus`."""
+    repos.users = CachedUserRepository(repos.users, bus)
+    repos.sessions = CachedSessionRepository(repos.sessions, bus)
+    repos.mfis = PublishingMFIRepository(repos.mfis, bus)
+    repos.loan_products = PublishingLoanProductRepository(repos.loan_products, bus)
+    repos.revoked_tokens = CachedRevokedTokenRepository(repos.revoked_tokens, bus)
+    return repos
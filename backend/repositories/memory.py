@@ -0,0 +1,779 @@
+"""
+In-memory repositories for tests and benchmarks.
+
+Documents live in dicts keyed by id, with sorted (created_at, id) lists as
+secondary indexes so list queries behave like the indexed Mongo queries
+without any network round-trips. Stored documents are deep-copied on write
+and shallow-copied on read.
+"""
+import copy
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from utils.geo import bounding_box, distance_km
+from repositories.base import (
+    UserRepository, SessionRepository, MFIRepository, LoanProductRepository, BranchRepository, CenterRepository,
+    ApplicationRepository, ApplicationEventRepository, NotificationRepository,
+    DocumentStore, TombstoneRepository, IdempotencyKeyRepository, JobRepository, ApplicationArchiveRepository,
+    RevokedTokenRepository, Repositories, make_status_event
+)
+
+
+def _pick(doc, fields=None):
+    """A copy of `doc` with only `fields` (all fields if None)."""
+    if fields is None:
+        return dict(doc)
+    return {field: doc[field] for field in fields if field in doc}
+
+
+def _newest_first(index, docs, limit, fields=None):
+    """Read up to `limit` documents from a sorted (created_at, id) index, newest first."""
+    result = []
+    for _, doc_id in reversed(index):
+        if limit is not None and len(result) >= limit:
+            break
+        result.append(_pick(docs[doc_id], fields))
+    return result
+
+
+class _UpdatedIndex:
+    """(updated_at, id) entries sorted globally, per user and per MFI, for delta sync."""
+
+    def __init__(self):
+        self.all = []
+        self.by_user = defaultdict(list)
+        self.by_mfi = defaultdict(list)
+
+    def _lists(self, doc):
+        lists = [self.all, self.by_user[doc['user_id']]]
+        if doc.get('mfi_id'):
+            lists.append(self.by_mfi[doc['mfi_id']])
+        return lists
+
+    def add(self, doc):
+        if doc.get('updated_at'):
+            key = (doc['updated_at'], doc['id'])
+            for entries in self._lists(doc):
+                insort(entries, key)
+
+    def remove(self, doc):
+        if doc.get('updated_at'):
+            key = (doc['updated_at'], doc['id'])
+            for entries in self._lists(doc):
+                i = bisect_left(entries, key)
+                if i < len(entries) and entries[i] == key:
+                    del entries[i]
+
+    def after(self, cursor, user_id=None, limit=500, mfi_id=None):
+        if user_id:
+            entries = self.by_user.get(user_id, [])
+        elif mfi_id:
+            entries = self.by_mfi.get(mfi_id, [])
+        else:
+            entries = self.all
+        start = bisect_right(entries, tuple(cursor))
+        end = start + limit if limit is not None else None
+        return [doc_id for _, doc_id in entries[start:end]]
+
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self):
+        self.by_id = {}
+        self.by_email = {}
+
+    async def get(self, user_id):
+        user = self.by_id.get(user_id)
+        return dict(user) if user else None
+
+    async def get_by_email(self, email):
+        user = self.by_email.get(email)
+        return dict(user) if user else None
+
+    async def create(self, user):
+        user = copy.deepcopy(user)
+        self.by_id[user['id']] = user
+        self.by_email[user['email']] = user
+
+    async def update(self, user_id, fields):
+        user = self.by_id.get(user_id)
+        if not user:
+            return None
+        user.update(copy.deepcopy(fields))
+        return dict(user)
+
+
+class MemorySessionRepository(SessionRepository):
+    def __init__(self):
+        self.by_token = {}
+
+    async def get_by_token(self, session_token):
+        session = self.by_token.get(session_token)
+        return dict(session) if session else None
+
+    async def create(self, session):
+        self.by_token[session['session_token']] = copy.deepcopy(session)
+
+    async def delete_by_token(self, session_token):
+        self.by_token.pop(session_token, None)
+
+    async def delete_expired(self, now):
+        expired = [token for token, session in self.by_token.items() if session['expires_at'] < now]
+        for token in expired:
+            del self.by_token[token]
+        return len(expired)
+
+
+class MemoryMFIRepository(MFIRepository):
+    def __init__(self):
+        self.by_id = {}
+
+    async def list(self, limit=100, fields=None):
+        return [_pick(mfi, fields) for mfi in list(self.by_id.values())[:limit]]
+
+    async def get(self, mfi_id):
+        mfi = self.by_id.get(mfi_id)
+        return dict(mfi) if mfi else None
+
+    async def create(self, mfi):
+        self.by_id[mfi['id']] = copy.deepcopy(mfi)
+
+
+class MemoryLoanProductRepository(LoanProductRepository):
+    def __init__(self):
+        self.by_id = {}
+        self.by_mfi = defaultdict(list)
+
+    async def list(self, mfi_id=None, limit=100, fields=None):
+        if mfi_id:
+            return [_pick(self.by_id[pid], fields) for pid in self.by_mfi.get(mfi_id, [])[:limit]]
+        return [_pick(product, fields) for product in list(self.by_id.values())[:limit]]
+
+    async def get(self, product_id):
+        product = self.by_id.get(product_id)
+        return dict(product) if product else None
+
+    async def create(self, product):
+        product = copy.deepcopy(product)
+        self.by_id[product['id']] = product
+        self.by_mfi[product['mfi_id']].append(product['id'])
+
+
+class MemoryBranchRepository(BranchRepository):
+    # Branches are bucketed into a grid of cells this many degrees wide, so a
+    # nearby query only measures distances to branches in the cells it overlaps
+    CELL_DEGREES = 0.25
+
+    def __init__(self):
+        self.by_id = {}
+        self.by_mfi = defaultdict(set)
+        self.cells = defaultdict(set)
+
+    def _cell(self, longitude, latitude):
+        return math.floor(longitude / self.CELL_DEGREES), math.floor(latitude / self.CELL_DEGREES)
+
+    async def list(self, mfi_id, limit=1000):
+        branches = sorted((self.by_id[branch_id] for branch_id in self.by_mfi.get(mfi_id, ())), key=lambda b: b['name'])
+        return [dict(branch) for branch in branches[:limit]]
+
+    async def create_many(self, branches):
+        for branch in branches:
+            branch = copy.deepcopy(branch)
+            self.by_id[branch['id']] = branch
+            self.by_mfi[branch['mfi_id']].add(branch['id'])
+            self.cells[self._cell(*branch['location']['coordinates'])].add(branch['id'])
+
+    async def delete_for_mfi(self, mfi_id):
+        branch_ids = self.by_mfi.pop(mfi_id, set())
+        for branch_id in branch_ids:
+            branch = self.by_id.pop(branch_id)
+            self.cells[self._cell(*branch['location']['coordinates'])].discard(branch_id)
+        return len(branch_ids)
+
+    async def nearby(self, longitude, latitude, max_distance_km, mfi_ids=None, limit=20, nearest_per_mfi=False):
+        min_lng, min_lat, max_lng, max_lat = bounding_box(longitude, latitude, max_distance_km)
+        (x0, y0), (x1, y1) = self._cell(min_lng, min_lat), self._cell(max_lng, max_lat)
+        allowed = set(mfi_ids) if mfi_ids is not None else None
+        found = []
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                for branch_id in self.cells.get((x, y), ()):
+                    branch = self.by_id[branch_id]
+                    if allowed is not None and branch['mfi_id'] not in allowed:
+                        continue
+                    distance = distance_km(longitude, latitude, *branch['location']['coordinates'])
+                    if distance <= max_distance_km:
+                        found.append((distance, branch_id))
+        found.sort()
+
+        results, seen_mfis = [], set()
+        for distance, branch_id in found:
+            if len(results) >= limit:
+                break
+            branch = self.by_id[branch_id]
+            if nearest_per_mfi:
+                if branch['mfi_id'] in seen_mfis:
+                    continue
+                seen_mfis.add(branch['mfi_id'])
+            results.append({**branch, "distance_km": distance})
+        return results
+
+
+class MemoryCenterRepository(CenterRepository):
+    def __init__(self, applications, archive):
+        self.applications = applications
+        self.archive = archive
+        self.centers = {}
+        self.groups = {}
+        self.groups_by_center = defaultdict(list)
+
+    async def create_center(self, center):
+        self.centers[center['id']] = copy.deepcopy(center)
+
+    async def get_center(self, center_id):
+        center = self.centers.get(center_id)
+        return dict(center) if center else None
+
+    async def list_centers(self, mfi_id=None, limit=100):
+        centers = sorted(
+            (center for center in self.centers.values() if not mfi_id or center['mfi_id'] == mfi_id),
+            key=lambda center: center['name']
+        )
+        return [dict(center) for center in centers[:limit]]
+
+    async def create_group(self, group):
+        self.groups[group['id']] = copy.deepcopy(group)
+        self.groups_by_center[group['center_id']].append(group['id'])
+
+    async def list_groups(self, center_id):
+        groups = sorted((self.groups[group_id] for group_id in self.groups_by_center.get(center_id, ())), key=lambda g: g['name'])
+        return [copy.deepcopy(group) for group in groups]
+
+    async def find_group_for_member(self, user_id, mfi_id):
+        for group in self.groups.values():
+            if group['mfi_id'] == mfi_id and any(member['user_id'] == user_id for member in group['members']):
+                return copy.deepcopy(group)
+        return None
+
+    async def stream_active_loans(self, mfi_id=None):
+        groups = sorted(self.groups.values(), key=lambda group: (group['center_id'], group['id']))
+        for group in groups:
+            if mfi_id and group['mfi_id'] != mfi_id:
+                continue
+            for member in group['members']:
+                user_id = member['user_id']
+                apps = [self.applications.by_id[app_id] for _, app_id in self.applications.by_user.get(user_id, ())]
+                # Skipping ids still in applications, left there by an interrupted archive run
+                apps += [
+                    self.archive.by_id[app_id] for app_id in self.archive.by_user.get(user_id, ())
+                    if app_id not in self.applications.by_id
+                ]
+                for app in apps:
+                    if app.get('status') != 'disbursed' or app['mfi_id'] != group['mfi_id']:
+                        continue
+                    yield {
+                        "center_id": group['center_id'],
+                        "group_id": group['id'],
+                        "group_name": group['name'],
+                        "user_id": member['user_id'],
+                        "borrower_name": member['name'],
+                        "application_id": app['id'],
+                        "mfi_id": group['mfi_id'],
+                        "loan_amount": app['loan_amount'],
+                        "tenure_months": app['tenure_months'],
+                        "disbursed_at": app.get('disbursed_at') or app['updated_at']
+                    }
+
+
+class MemoryApplicationRepository(ApplicationRepository):
+    def __init__(self, events):
+        self.events = events
+        self.by_id = {}
+        self.by_created = []
+        self.by_user = defaultdict(list)
+        self.by_mfi = defaultdict(list)
+        self.by_status = defaultdict(set)
+        self.by_mfi_status = defaultdict(set)  # (mfi_id, status) -> ids
+        # Submitted applications in review order per MFI: (-priority, created_at, id)
+        self.mfi_queues = defaultdict(list)
+        self.by_updated = _UpdatedIndex()
+
+    def _queue_key(self, app):
+        return (-app.get('priority', 0), app['created_at'], app['id'])
+
+    def _queue_add(self, app):
+        insort(self.mfi_queues[app['mfi_id']], self._queue_key(app))
+
+    def _queue_remove(self, app):
+        key = self._queue_key(app)
+        queue = self.mfi_queues[app['mfi_id']]
+        i = bisect_left(queue, key)
+        if i < len(queue) and queue[i] == key:
+            del queue[i]
+
+    def _status_ids(self, status, mfi_id=None):
+        return self.by_mfi_status.get((mfi_id, status), ()) if mfi_id else self.by_status.get(status, ())
+
+    async def list(self, user_id=None, limit=100, fields=None, mfi_id=None):
+        if user_id and mfi_id:
+            apps = _newest_first(self.by_user.get(user_id, []), self.by_id, None, fields + ['mfi_id'] if fields else None)
+            return [_pick(app, fields) for app in apps if app['mfi_id'] == mfi_id][:limit]
+        if user_id:
+            return _newest_first(self.by_user.get(user_id, []), self.by_id, limit, fields)
+        if mfi_id:
+            return _newest_first(self.by_mfi.get(mfi_id, []), self.by_id, limit, fields)
+        return _newest_first(self.by_created, self.by_id, limit, fields)
+
+    async def get(self, app_id):
+        app = self.by_id.get(app_id)
+        return dict(app) if app else None
+
+    async def create(self, application, event=None):
+        app = copy.deepcopy(application)
+        key = (app['created_at'], app['id'])
+        self.by_id[app['id']] = app
+        insort(self.by_created, key)
+        insort(self.by_user[app['user_id']], key)
+        insort(self.by_mfi[app['mfi_id']], key)
+        self.by_status[app.get('status')].add(app['id'])
+        self.by_mfi_status[(app['mfi_id'], app.get('status'))].add(app['id'])
+        if app.get('status') == 'submitted':
+            self._queue_add(app)
+        self.by_updated.add(app)
+        self.events.append(make_status_event(None, app, event))
+
+    async def create_many(self, applications, events):
+        for application, event in zip(applications, events):
+            await self.create(application, event)
+
+    def _set(self, app, fields):
+        """Apply fields to a stored application, keeping the updated_at index current."""
+        self.by_updated.remove(app)
+        app.update(copy.deepcopy(fields))
+        self.by_updated.add(app)
+
+    async def update(self, app_id, fields, event=None, expected_updated_at=None):
+        app = self.by_id.get(app_id)
+        if not app:
+            return None
+        if expected_updated_at is not None and app.get('updated_at') != expected_updated_at:
+            return None
+        self.events.append(make_status_event(app, fields, event))
+        if app.get('status') == 'submitted':
+            self._queue_remove(app)
+        if 'status' in fields and fields['status'] != app.get('status'):
+            self.by_status[app.get('status')].discard(app_id)
+            self.by_status[fields['status']].add(app_id)
+            self.by_mfi_status[(app['mfi_id'], app.get('status'))].discard(app_id)
+            self.by_mfi_status[(app['mfi_id'], fields['status'])].add(app_id)
+        self._set(app, fields)
+        if app.get('status') == 'submitted':
+            self._queue_add(app)
+        return dict(app)
+
+    async def add_document(self, app_id, document, updated_at):
+        app = self.by_id.get(app_id)
+        if app:
+            documents = app.get('documents', []) + [document]
+            self._set(app, {"documents": documents, "updated_at": updated_at})
+
+    async def claim_next(self, officer_id, now, lease_expires_at, mfi_id):
+        for _, _, app_id in self.mfi_queues.get(mfi_id, []):
+            app = self.by_id[app_id]
+            if not app.get('lease_expires_at') or app['lease_expires_at'] <= now:
+                self._set(app, {"claimed_by": officer_id, "lease_expires_at": lease_expires_at, "updated_at": now})
+                return dict(app)
+        return None
+
+    async def release_claim(self, app_id, officer_id, updated_at):
+        app = self.by_id.get(app_id)
+        if not app or app.get('claimed_by') != officer_id:
+            return None
+        self._set(app, {"claimed_by": None, "lease_expires_at": None, "updated_at": updated_at})
+        return dict(app)
+
+    async def list_updated_since(self, after, user_id=None, limit=500, mfi_id=None):
+        if user_id and mfi_id:
+            apps = [self.by_id[app_id] for app_id in self.by_updated.after(after, user_id, None)]
+            return [dict(app) for app in apps if app['mfi_id'] == mfi_id][:limit]
+        return [dict(self.by_id[app_id]) for app_id in self.by_updated.after(after, user_id, limit, mfi_id)]
+
+    async def count(self, statuses=None, mfi_id=None):
+        if not statuses:
+            return len(self.by_mfi.get(mfi_id, ())) if mfi_id else len(self.by_id)
+        return sum(len(self._status_ids(status, mfi_id)) for status in statuses)
+
+    async def total_loan_amount(self, status, mfi_id=None):
+        return sum(self.by_id[app_id]['loan_amount'] for app_id in self._status_ids(status, mfi_id))
+
+    async def list_closed_before(self, statuses, cutoff, limit=500):
+        closed = []
+        for status in statuses:
+            for app_id in self.by_status.get(status, ()):
+                if self.by_id[app_id]['updated_at'] < cutoff:
+                    closed.append(dict(self.by_id[app_id]))
+        return closed[:limit]
+
+    async def delete_many(self, app_ids):
+        for app_id in app_ids:
+            app = self.by_id.pop(app_id, None)
+            if not app:
+                continue
+            key = (app['created_at'], app_id)
+            self.by_created.remove(key)
+            self.by_user[app['user_id']].remove(key)
+            self.by_mfi[app['mfi_id']].remove(key)
+            self.by_status[app.get('status')].discard(app_id)
+            self.by_mfi_status[(app['mfi_id'], app.get('status'))].discard(app_id)
+            if app.get('status') == 'submitted':
+                self._queue_remove(app)
+            self.by_updated.remove(app)
+
+    async def monthly_trends(self, limit=12, mfi_id=None):
+        months = {}
+        for created_at, app_id in (self.by_mfi.get(mfi_id, []) if mfi_id else self.by_created):
+            created = datetime.fromisoformat(created_at)
+            bucket = months.setdefault((created.year, created.month), [0, 0])
+            bucket[0] += 1
+            bucket[1] += self.by_id[app_id]['loan_amount']
+        return [
+            {"_id": {"year": year, "month": month}, "count": count, "total_amount": total}
+            for (year, month), (count, total) in sorted(months.items())[:limit]
+        ]
+
+
+class MemoryApplicationEventRepository(ApplicationEventRepository):
+    def __init__(self):
+        # (created_at, sequence, event), so ties keep insertion order
+        self.log = []
+        self.by_application = defaultdict(list)
+
+    def append(self, event):
+        if not event:
+            return
+        event = copy.deepcopy(event)
+        insort(self.log, (event['created_at'], len(self.log), event))
+        self.by_application[event['application_id']].append(event)
+
+    def _range(self, since, until):
+        return self.log[bisect_left(self.log, (since,)):bisect_left(self.log, (until,))]
+
+    async def list_for_application(self, app_id):
+        return [dict(event) for event in self.by_application.get(app_id, [])]
+
+    async def list_range(self, since, until, limit=100, mfi_id=None):
+        events = [event for _, _, event in self._range(since, until) if not mfi_id or event['mfi_id'] == mfi_id]
+        return [dict(event) for event in events[:limit]]
+
+    async def stream(self, since, until, to_statuses=None, mfi_id=None):
+        for _, _, event in self._range(since, until):
+            if (not to_statuses or event['to_status'] in to_statuses) and (not mfi_id or event['mfi_id'] == mfi_id):
+                yield dict(event)
+
+
+class MemoryDocumentStore(DocumentStore):
+    chunk_size = 255 * 1024
+
+    def __init__(self):
+        self.uploads = {}
+        self.files = {}
+        self.chunks = defaultdict(dict)  # upload/file id -> {n: bytes}
+
+    async def create_upload(self, upload):
+        self.uploads[upload['id']] = copy.deepcopy(upload)
+
+    async def get_upload(self, upload_id):
+        upload = self.uploads.get(upload_id)
+        return dict(upload) if upload else None
+
+    async def reserve_upload(self, upload_id, writer, expected_offset, now, lease_expires_at):
+        upload = self.uploads.get(upload_id)
+        if not upload or upload['offset'] != expected_offset or upload['status'] != 'uploading':
+            return False
+        if upload.get('writer') not in (None, writer) and upload['writer_lease_expires_at'] > now:
+            return False
+        upload.update(writer=writer, writer_lease_expires_at=lease_expires_at)
+        return True
+
+    async def release_upload(self, upload_id, writer):
+        upload = self.uploads.get(upload_id)
+        if upload and upload.get('writer') == writer:
+            upload.update(writer=None, writer_lease_expires_at=None)
+
+    async def write_chunk(self, upload_id, n, data):
+        self.chunks[upload_id][n] = bytes(data)
+
+    async def commit_progress(self, upload_id, writer, expected_offset, offset, next_n, pending):
+        upload = self.uploads.get(upload_id)
+        if not upload or upload.get('writer') != writer:
+            return False
+        if upload['offset'] != expected_offset or upload['status'] != 'uploading':
+            return False
+        upload.update(offset=offset, next_n=next_n, pending=bytes(pending))
+        return True
+
+    async def iter_chunks(self, upload_id):
+        chunks = self.chunks.get(upload_id, {})
+        for n in sorted(chunks):
+            yield chunks[n]
+
+    async def find_by_hash(self, sha256):
+        for file in self.files.values():
+            if file['metadata']['sha256'] == sha256:
+                return dict(file)
+        return None
+
+    async def finalize(self, upload_id, file):
+        if file:
+            self.files[file['_id']] = copy.deepcopy(file)
+        self.uploads[upload_id].update(status="complete", pending=b"", file_id=file['_id'] if file else None)
+
+    async def discard_chunks(self, upload_id):
+        self.chunks.pop(upload_id, None)
+
+    async def get_file(self, file_id):
+        file = self.files.get(file_id)
+        return dict(file) if file else None
+
+    async def read_range(self, file_id, start, end):
+        chunks = self.chunks.get(file_id, {})
+        for n in range(start // self.chunk_size, (end - 1) // self.chunk_size + 1):
+            chunk_start = n * self.chunk_size
+            yield chunks[n][max(start - chunk_start, 0):end - chunk_start]
+
+
+class MemoryNotificationRepository(NotificationRepository):
+    def __init__(self):
+        self.by_id = {}
+        self.by_user = defaultdict(list)
+        self.by_updated = _UpdatedIndex()
+
+    async def list_for_user(self, user_id, limit=50, fields=None):
+        return _newest_first(self.by_user.get(user_id, []), self.by_id, limit, fields)
+
+    async def create(self, notification):
+        notif = copy.deepcopy(notification)
+        self.by_id[notif['id']] = notif
+        insort(self.by_user[notif['user_id']], (notif['created_at'], notif['id']))
+        self.by_updated.add(notif)
+
+    async def create_many(self, notifications):
+        for notification in notifications:
+            await self.create(notification)
+
+    async def mark_read(self, notif_id, user_id, updated_at):
+        notif = self.by_id.get(notif_id)
+        if notif and notif['user_id'] == user_id:
+            self.by_updated.remove(notif)
+            notif['read'] = True
+            notif['updated_at'] = updated_at
+            self.by_updated.add(notif)
+
+    async def mark_read_many(self, notif_ids, user_id, updated_at):
+        for notif_id in notif_ids:
+            await self.mark_read(notif_id, user_id, updated_at)
+
+    async def list_updated_since(self, user_id, after, limit=500):
+        return [dict(self.by_id[notif_id]) for notif_id in self.by_updated.after(after, user_id, limit)]
+
+    async def list_read_before(self, cutoff, limit=1000):
+        old = [dict(notif) for notif in self.by_id.values() if notif.get('read') and notif['created_at'] < cutoff]
+        return old[:limit]
+
+    async def delete_many(self, notif_ids):
+        for notif_id in notif_ids:
+            notif = self.by_id.pop(notif_id, None)
+            if notif:
+                self.by_user[notif['user_id']].remove((notif['created_at'], notif_id))
+                self.by_updated.remove(notif)
+
+
+class MemoryTombstoneRepository(TombstoneRepository):
+    def __init__(self):
+        self.log = defaultdict(list)  # collection -> sorted (deleted_at, id, user_id, mfi_id)
+
+    async def add_many(self, collection, tombstones):
+        for tombstone in tombstones:
+            entry = (tombstone['deleted_at'], tombstone['id'], tombstone['user_id'], tombstone.get('mfi_id'))
+            insort(self.log[collection], entry, key=lambda entry: entry[:2])
+
+    async def list_since(self, collection, after, user_id=None, limit=500, mfi_id=None):
+        entries = self.log.get(collection, [])
+        start = bisect_right(entries, tuple(after), key=lambda entry: entry[:2])
+        return [
+            {"id": doc_id, "deleted_at": deleted_at}
+            for deleted_at, doc_id, owner, doc_mfi_id in entries[start:]
+            if (not user_id or owner == user_id) and (not mfi_id or doc_mfi_id == mfi_id)
+        ][:limit]
+
+
+class MemoryIdempotencyKeyRepository(IdempotencyKeyRepository):
+    def __init__(self):
+        self.by_key = {}
+
+    async def reserve(self, user_id, key, request_hash, expires_at):
+        # No await between the lookup and the insert, so this is atomic on the
+        # event loop.
+        existing = self.by_key.get((user_id, key))
+        if existing and existing['expires_at'] > datetime.now(timezone.utc):
+            return dict(existing)
+        self.by_key[(user_id, key)] = {
+            "user_id": user_id,
+            "key": key,
+            "request_hash": request_hash,
+            "response": None,
+            "expires_at": expires_at
+        }
+        return None
+
+    async def complete(self, user_id, key, response):
+        record = self.by_key.get((user_id, key))
+        if record:
+            record['response'] = copy.deepcopy(response)
+
+    async def release(self, user_id, key):
+        record = self.by_key.get((user_id, key))
+        if record and record['response'] is None:
+            del self.by_key[(user_id, key)]
+
+
+class MemoryRevokedTokenRepository(RevokedTokenRepository):
+    def __init__(self):
+        self.expires = {}  # jti -> when its token expires
+
+    async def add(self, jti, expires_at):
+        self.expires[jti] = expires_at
+
+    async def is_revoked(self, jti):
+        return jti in self.expires
+
+    async def list_active(self, now):
+        # Stands in for Mongo's TTL index
+        self.expires = {jti: expires_at for jti, expires_at in self.expires.items() if expires_at > now}
+        return list(self.expires)
+
+
+class MemoryApplicationArchiveRepository(ApplicationArchiveRepository):
+    def __init__(self):
+        self.by_id = {}
+        self.by_user = defaultdict(list)
+        # Keyed by (mfi_id, status) and (mfi_id, (year, month))
+        self.statuses = defaultdict(lambda: {"count": 0, "loan_amount": 0})
+        self.months = defaultdict(lambda: {"count": 0, "total_amount": 0})
+
+    async def archive(self, applications):
+        for app in applications:
+            if app['id'] not in self.by_id:
+                self.by_user[app['user_id']].append(app['id'])
+            self.by_id[app['id']] = copy.deepcopy(app)
+
+    async def add_to_totals(self, applications):
+        for app in applications:
+            created = datetime.fromisoformat(app['created_at'])
+            status = self.statuses[(app['mfi_id'], app['status'])]
+            status["count"] += 1
+            status["loan_amount"] += app['loan_amount']
+            month = self.months[(app['mfi_id'], (created.year, created.month))]
+            month["count"] += 1
+            month["total_amount"] += app['loan_amount']
+
+    async def get(self, app_id):
+        app = self.by_id.get(app_id)
+        return dict(app) if app else None
+
+    async def rebuild_totals(self):
+        self.statuses.clear()
+        self.months.clear()
+        await self.add_to_totals(list(self.by_id.values()))
+        return len(self.by_id)
+
+    async def totals(self, mfi_id=None):
+        totals = {"statuses": {}, "months": {}}
+        for kind, entries, amount in (("statuses", self.statuses, "loan_amount"), ("months", self.months, "total_amount")):
+            for (app_mfi_id, name), total in entries.items():
+                if mfi_id and app_mfi_id != mfi_id:
+                    continue
+                summed = totals[kind].setdefault(name, {"count": 0, amount: 0})
+                summed["count"] += total["count"]
+                summed[amount] += total[amount]
+        return totals
+
+
+class MemoryJobRepository(JobRepository):
+    def __init__(self):
+        self.by_id = {}
+
+    async def ensure(self, job):
+        if job['id'] not in self.by_id:
+            self.by_id[job['id']] = copy.deepcopy(job)
+
+    async def enqueue(self, job):
+        self.by_id[job['id']] = copy.deepcopy(job)
+
+    async def get(self, job_id):
+        job = self.by_id.get(job_id)
+        return dict(job) if job else None
+
+    async def claim_due(self, names, worker_id, now, lease_expires_at):
+        due = [
+            job for job in self.by_id.values()
+            if job['name'] in names and (
+                (job['status'] == 'scheduled' and job['run_at'] <= now)
+                or (job['status'] == 'running' and job['lease_expires_at'] < now)
+            )
+        ]
+        if not due:
+            return None
+        job = min(due, key=lambda job: job['run_at'])
+        job.update({
+            "status": "running",
+            "lease_owner": worker_id,
+            "lease_expires_at": lease_expires_at,
+            "started_at": now,
+            "updated_at": now,
+            "attempts": job.get('attempts', 0) + 1
+        })
+        return dict(job)
+
+    def _held(self, job_id, worker_id):
+        job = self.by_id.get(job_id)
+        if job and job['status'] == 'running' and job['lease_owner'] == worker_id:
+            return job
+        return None
+
+    async def extend_lease(self, job_id, worker_id, lease_expires_at):
+        job = self._held(job_id, worker_id)
+        if job:
+            job['lease_expires_at'] = lease_expires_at
+        return job is not None
+
+    async def finish(self, job_id, worker_id, fields):
+        job = self._held(job_id, worker_id)
+        if job:
+            job.update(copy.deepcopy(fields))
+            job.update({"lease_owner": None, "lease_expires_at": None})
+        return job is not None
+
+    async def list(self, limit=100):
+        jobs = sorted(self.by_id.values(), key=lambda job: job['updated_at'], reverse=True)
+        return [dict(job) for job in jobs[:limit]]
+
+
+class MemoryRepositories(Repositories):
+    def __init__(self):
+        self.users = MemoryUserRepository()
+        self.sessions = MemorySessionRepository()
+        self.mfis = MemoryMFIRepository()
+        self.loan_products = MemoryLoanProductRepository()
+        self.branches = MemoryBranchRepository()
+        self.application_events = MemoryApplicationEventRepository()
+        self.applications = MemoryApplicationRepository(self.application_events)
+        self.application_archive = MemoryApplicationArchiveRepository()
+        self.centers = MemoryCenterRepository(self.applications, self.application_archive)
+        self.notifications = MemoryNotificationRepository()
+        self.documents = MemoryDocumentStore()
+        self.tombstones = MemoryTombstoneRepository()
+        self.idempotency_keys = MemoryIdempotencyKeyRepository()
+        self.revoked_tokens = MemoryRevokedTokenRepository()
+        self.jobs = MemoryJobRepository()
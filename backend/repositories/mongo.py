@@ -0,0 +1,872 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
+
+from utils.database import MONGO_WARMUP_CONNECTIONS
+from utils.geo import point
+from utils.invalidation import MongoInvalidationBus
+from utils.sync import TOMBSTONE_RETENTION_DAYS
+from repositories.base import (
+    UserRepository, SessionRepository, MFIRepository, LoanProductRepository, BranchRepository, CenterRepository,
+    ApplicationRepository, ApplicationEventRepository, NotificationRepository,
+    DocumentStore, TombstoneRepository, IdempotencyKeyRepository, JobRepository, ApplicationArchiveRepository,
+    RevokedTokenRepository, Repositories, make_status_event
+)
+
+logger = logging.getLogger(__name__)
+
+# Shard keys for a sharded cluster (see shard_collections.py). Applications
+# are partitioned by MFI, so each MFI's officer queries and analytics go to
+# the shard holding its range; notifications are only ever read per user.
+SHARD_KEYS = {
+    "applications": {"mfi_id": 1, "id": 1},
+    "notifications": {"user_id": "hashed"}
+}
+# Application id -> MFI routes remembered per worker, for targeting writes by id
+MAX_APPLICATION_ROUTES = 100000
+
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, db):
+        self.collection = db.users
+
+    async def get(self, user_id):
+        return await self.collection.find_one({"id": user_id}, {"_id": 0})
+
+    async def get_by_email(self, email):
+        return await self.collection.find_one({"email": email}, {"_id": 0})
+
+    async def create(self, user):
+        await self.collection.insert_one(user.copy())
+
+    async def update(self, user_id, fields):
+        return await self.collection.find_one_and_update(
+            {"id": user_id},
+            {"$set": fields},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+
+class MongoSessionRepository(SessionRepository):
+    def __init__(self, db):
+        self.collection = db.user_sessions
+
+    async def get_by_token(self, session_token):
+        return await self.collection.find_one({"session_token": session_token}, {"_id": 0})
+
+    async def create(self, session):
+        await self.collection.insert_one(session.copy())
+
+    async def delete_by_token(self, session_token):
+        await self.collection.delete_one({"session_token": session_token})
+
+    async def delete_expired(self, now):
+        result = await self.collection.delete_many({"expires_at": {"$lt": now}})
+        return result.deleted_count
+
+
+def _projection(fields=None):
+    """Projection returning only `fields` (all fields if None), without Mongo's _id."""
+    projection = {"_id": 0}
+    for field in fields or ():
+        projection[field] = 1
+    return projection
+
+
+def _after(field, cursor):
+    """Filter for documents sorting after a (field value, id) cursor in (field, id) order."""
+    value, last_id = cursor
+    return {field: {"$gte": value}, "$or": [{field: {"$gt": value}}, {"id": {"$gt": last_id}}]}
+
+
+class MongoMFIRepository(MFIRepository):
+    def __init__(self, db):
+        self.collection = db.mfis
+
+    async def list(self, limit=100, fields=None):
+        return await self.collection.find({}, _projection(fields)).to_list(limit)
+
+    async def get(self, mfi_id):
+        return await self.collection.find_one({"id": mfi_id}, {"_id": 0})
+
+    async def create(self, mfi):
+        await self.collection.insert_one(mfi.copy())
+
+
+class MongoLoanProductRepository(LoanProductRepository):
+    def __init__(self, db):
+        self.collection = db.loan_products
+
+    async def list(self, mfi_id=None, limit=100, fields=None):
+        query = {}
+        if mfi_id:
+            query['mfi_id'] = mfi_id
+        return await self.collection.find(query, _projection(fields)).to_list(limit)
+
+    async def get(self, product_id):
+        return await self.collection.find_one({"id": product_id}, {"_id": 0})
+
+    async def create(self, product):
+        await self.collection.insert_one(product.copy())
+
+
+class MongoBranchRepository(BranchRepository):
+    def __init__(self, db):
+        self.collection = db.branches
+
+    async def list(self, mfi_id, limit=1000):
+        return await self.collection.find({"mfi_id": mfi_id}, {"_id": 0}).sort("name", 1).to_list(limit)
+
+    async def create_many(self, branches):
+        if branches:
+            await self.collection.insert_many([branch.copy() for branch in branches], ordered=False)
+
+    async def delete_for_mfi(self, mfi_id):
+        result = await self.collection.delete_many({"mfi_id": mfi_id})
+        return result.deleted_count
+
+    async def nearby(self, longitude, latitude, max_distance_km, mfi_ids=None, limit=20, nearest_per_mfi=False):
+        geo_near = {
+            "near": point(longitude, latitude),
+            "distanceField": "distance_km",
+            # Distances in meters for GeoJSON points; multiplied into km on the way out
+            "distanceMultiplier": 0.001,
+            "maxDistance": max_distance_km * 1000,
+            "spherical": True
+        }
+        if mfi_ids is not None:
+            geo_near["query"] = {"mfi_id": {"$in": mfi_ids}}
+        pipeline = [{"$geoNear": geo_near}]
+        if nearest_per_mfi:
+            # $geoNear output is nearest first, so $first is each MFI's nearest branch
+            pipeline += [
+                {"$group": {"_id": "$mfi_id", "branch": {"$first": "$$ROOT"}}},
+                {"$replaceRoot": {"newRoot": "$branch"}},
+                {"$sort": {"distance_km": 1}}
+            ]
+        pipeline += [{"$limit": limit}, {"$project": {"_id": 0}}]
+        return await self.collection.aggregate(pipeline).to_list(limit)
+
+
+class MongoCenterRepository(CenterRepository):
+    def __init__(self, db):
+        self.centers = db.centers
+        self.groups = db.lending_groups
+
+    async def create_center(self, center):
+        await self.centers.insert_one(center.copy())
+
+    async def get_center(self, center_id):
+        return await self.centers.find_one({"id": center_id}, {"_id": 0})
+
+    async def list_centers(self, mfi_id=None, limit=100):
+        query = {"mfi_id": mfi_id} if mfi_id else {}
+        return await self.centers.find(query, {"_id": 0}).sort("name", 1).to_list(limit)
+
+    async def create_group(self, group):
+        await self.groups.insert_one(group.copy())
+
+    async def list_groups(self, center_id):
+        return await self.groups.find({"center_id": center_id}, {"_id": 0}).sort("name", 1).to_list(None)
+
+    async def find_group_for_member(self, user_id, mfi_id):
+        return await self.groups.find_one({"members.user_id": user_id, "mfi_id": mfi_id}, {"_id": 0})
+
+    async def stream_active_loans(self, mfi_id=None):
+        pipeline = [
+            {"$match": {"mfi_id": mfi_id} if mfi_id else {}},
+            {"$sort": {"center_id": 1, "id": 1}},
+            {"$unwind": "$members"},
+            # Uses the (user_id, status) index on applications once per member
+            {"$lookup": {
+                "from": "applications",
+                "localField": "members.user_id",
+                "foreignField": "user_id",
+                "let": {"mfi_id": "$mfi_id"},
+                "pipeline": [
+                    {"$match": {"status": "disbursed", "$expr": {"$eq": ["$mfi_id", "$$mfi_id"]}}},
+                    {"$project": {"_id": 0, "id": 1, "loan_amount": 1, "tenure_months": 1, "disbursed_at": 1, "updated_at": 1}}
+                ],
+                "as": "loans"
+            }},
+            # Loans outlast APPLICATION_ARCHIVE_MONTHS without updates, so disbursed
+            # ones may already be in the archive while they're still being repaid
+            {"$lookup": {
+                "from": "applications_archive",
+                "localField": "members.user_id",
+                "foreignField": "user_id",
+                "let": {"mfi_id": "$mfi_id"},
+                "pipeline": [
+                    {"$match": {"status": "disbursed", "$expr": {"$eq": ["$mfi_id", "$$mfi_id"]}}},
+                    {"$project": {"_id": 0, "id": 1, "loan_amount": 1, "tenure_months": 1, "disbursed_at": 1, "updated_at": 1}}
+                ],
+                "as": "archived_loans"
+            }},
+            # A set union, so a loan caught between archiving and deletion is listed once
+            {"$set": {"loans": {"$setUnion": ["$loans", "$archived_loans"]}}},
+            {"$unwind": "$loans"},
+            {"$project": {
+                "_id": 0,
+                "center_id": 1,
+                "group_id": "$id",
+                "group_name": "$name",
+                "user_id": "$members.user_id",
+                "borrower_name": "$members.name",
+                "application_id": "$loans.id",
+                "mfi_id": 1,
+                "loan_amount": "$loans.loan_amount",
+                "tenure_months": "$loans.tenure_months",
+                # Applications disbursed before disbursed_at was recorded
+                "disbursed_at": {"$ifNull": ["$loans.disbursed_at", "$loans.updated_at"]}
+            }}
+        ]
+        async for loan in self.groups.aggregate(pipeline, allowDiskUse=True, batchSize=1000):
+            yield loan
+
+
+class MongoApplicationRepository(ApplicationRepository):
+    def __init__(self, db, client):
+        self.collection = db.applications
+        self.events = db.application_events
+        self.client = client
+        # Set by MongoRepositories.ensure_indexes once the topology is known;
+        # standalone servers don't support multi-document transactions.
+        self.transactions = False
+        # Also set there: whether applications are sharded by MFI, in which
+        # case queries by id carry the application's mfi_id so mongos sends
+        # them to one shard. An application never changes MFI, so the
+        # remembered routes can't go stale.
+        self.sharded = False
+        self.routes = {}
+
+    def _remember(self, app):
+        if self.sharded and app:
+            if len(self.routes) >= MAX_APPLICATION_ROUTES:
+                self.routes.pop(next(iter(self.routes)))
+            self.routes[app['id']] = app['mfi_id']
+        return app
+
+    async def _by_id(self, app_id):
+        """Filter for one application, including its shard key when sharded."""
+        if not self.sharded:
+            return {"id": app_id}
+        if app_id not in self.routes:
+            # Broadcast once; later queries for this application are targeted
+            self._remember(await self.collection.find_one({"id": app_id}, {"_id": 0, "id": 1, "mfi_id": 1}))
+        if app_id not in self.routes:
+            return {"id": app_id}
+        return {"mfi_id": self.routes[app_id], "id": app_id}
+
+    async def _write(self, ops):
+        """Run ops(session) in a transaction when the deployment supports one."""
+        if not self.transactions:
+            return await ops(None)
+        async with await self.client.start_session() as session:
+            async with session.start_transaction():
+                return await ops(session)
+
+    async def list(self, user_id=None, limit=100, fields=None, mfi_id=None):
+        query = {}
+        if mfi_id:
+            query['mfi_id'] = mfi_id
+        if user_id:
+            query['user_id'] = user_id
+        return await self.collection.find(query, _projection(fields)).sort("created_at", -1).to_list(limit)
+
+    async def get(self, app_id):
+        query = {"mfi_id": self.routes[app_id], "id": app_id} if app_id in self.routes else {"id": app_id}
+        return self._remember(await self.collection.find_one(query, {"_id": 0}))
+
+    async def create(self, application, event=None):
+        self._remember(application)
+        async def ops(session):
+            await self.collection.insert_one(application.copy(), session=session)
+            status_event = make_status_event(None, application, event)
+            if status_event:
+                await self.events.insert_one(status_event, session=session)
+        await self._write(ops)
+
+    async def create_many(self, applications, events):
+        if not applications:
+            return
+        status_events = [make_status_event(None, app, event) for app, event in zip(applications, events)]
+        status_events = [status_event for status_event in status_events if status_event]
+        async def ops(session):
+            await self.collection.insert_many([app.copy() for app in applications], session=session)
+            if status_events:
+                await self.events.insert_many(status_events, session=session)
+        await self._write(ops)
+
+    async def update(self, app_id, fields, event=None, expected_updated_at=None):
+        query = await self._by_id(app_id)
+        if expected_updated_at is not None:
+            query['updated_at'] = expected_updated_at
+        async def ops(session):
+            before = await self.collection.find_one_and_update(
+                query,
+                {"$set": fields},
+                projection={"_id": 0},
+                return_document=ReturnDocument.BEFORE,
+                session=session
+            )
+            if not before:
+                return None
+            status_event = make_status_event(before, fields, event)
+            if status_event:
+                await self.events.insert_one(status_event, session=session)
+            return {**before, **fields}
+        return await self._write(ops)
+
+    async def add_document(self, app_id, document, updated_at):
+        await self.collection.update_one(
+            await self._by_id(app_id),
+            {"$push": {"documents": document}, "$set": {"updated_at": updated_at}}
+        )
+
+    async def claim_next(self, officer_id, now, lease_expires_at, mfi_id):
+        # Always carries the shard key: findAndModify without it fails on a
+        # sharded collection before MongoDB 7.1, and is broadcast after
+        return await self.collection.find_one_and_update(
+            {"mfi_id": mfi_id, "status": "submitted", "lease_expires_at": {"$not": {"$gt": now}}},
+            {"$set": {"claimed_by": officer_id, "lease_expires_at": lease_expires_at, "updated_at": now}},
+            sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def release_claim(self, app_id, officer_id, updated_at):
+        return await self.collection.find_one_and_update(
+            {**await self._by_id(app_id), "claimed_by": officer_id},
+            {"$set": {"claimed_by": None, "lease_expires_at": None, "updated_at": updated_at}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def list_updated_since(self, after, user_id=None, limit=500, mfi_id=None):
+        query = _after("updated_at", after)
+        if mfi_id:
+            query['mfi_id'] = mfi_id
+        if user_id:
+            query['user_id'] = user_id
+        return await self.collection.find(query, {"_id": 0}).sort([("updated_at", 1), ("id", 1)]).to_list(limit)
+
+    async def count(self, statuses=None, mfi_id=None):
+        query = {}
+        if mfi_id:
+            query['mfi_id'] = mfi_id
+        if statuses:
+            query['status'] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+        return await self.collection.count_documents(query)
+
+    async def total_loan_amount(self, status, mfi_id=None):
+        match = {"mfi_id": mfi_id, "status": status} if mfi_id else {"status": status}
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": None, "total": {"$sum": "$loan_amount"}}}
+        ]
+        result = await self.collection.aggregate(pipeline).to_list(1)
+        return result[0]['total'] if result else 0
+
+    async def list_closed_before(self, statuses, cutoff, limit=500):
+        return await self.collection.find(
+            {"status": {"$in": statuses}, "updated_at": {"$lt": cutoff}},
+            {"_id": 0}
+        ).limit(limit).to_list(limit)
+
+    async def delete_many(self, app_ids):
+        if app_ids:
+            await self.collection.delete_many({"id": {"$in": app_ids}})
+
+    async def monthly_trends(self, limit=12, mfi_id=None):
+        pipeline = [{"$match": {"mfi_id": mfi_id}}] if mfi_id else []
+        pipeline += [
+            {
+                "$group": {
+                    "_id": {
+                        "year": {"$year": {"$toDate": "$created_at"}},
+                        "month": {"$month": {"$toDate": "$created_at"}}
+                    },
+                    "count": {"$sum": 1},
+                    "total_amount": {"$sum": "$loan_amount"}
+                }
+            },
+            {"$sort": {"_id.year": 1, "_id.month": 1}},
+            {"$limit": limit}
+        ]
+        return await self.collection.aggregate(pipeline).to_list(limit)
+
+
+class MongoApplicationEventRepository(ApplicationEventRepository):
+    def __init__(self, db):
+        self.collection = db.application_events
+
+    async def list_for_application(self, app_id):
+        return await self.collection.find(
+            {"application_id": app_id}, {"_id": 0}
+        ).sort("created_at", 1).to_list(None)
+
+    async def list_range(self, since, until, limit=100, mfi_id=None):
+        query = {"created_at": {"$gte": since, "$lt": until}}
+        if mfi_id:
+            query['mfi_id'] = mfi_id
+        return await self.collection.find(query, {"_id": 0}).sort("created_at", 1).to_list(limit)
+
+    async def stream(self, since, until, to_statuses=None, mfi_id=None):
+        query = {"created_at": {"$gte": since, "$lt": until}}
+        if mfi_id:
+            query['mfi_id'] = mfi_id
+        if to_statuses:
+            query['to_status'] = {"$in": to_statuses}
+        async for event in self.collection.find(query, {"_id": 0}).sort("created_at", 1):
+            yield event
+
+
+class MongoDocumentStore(DocumentStore):
+    """Stores files in the GridFS layout of the `documents` bucket.
+
+    Chunks are written as they arrive rather than through GridIn, so an
+    upload can span many requests; the files record is only inserted once
+    all chunks are present, at which point the file is readable by any
+    GridFS client.
+    """
+
+    chunk_size = 255 * 1024  # GridFS default
+
+    def __init__(self, db):
+        self.uploads = db.document_uploads
+        self.files = db["documents.files"]
+        self.chunks = db["documents.chunks"]
+
+    async def create_upload(self, upload):
+        await self.uploads.insert_one(upload.copy())
+
+    async def get_upload(self, upload_id):
+        return await self.uploads.find_one({"id": upload_id}, {"_id": 0})
+
+    async def reserve_upload(self, upload_id, writer, expected_offset, now, lease_expires_at):
+        result = await self.uploads.update_one(
+            {
+                "id": upload_id,
+                "offset": expected_offset,
+                "status": "uploading",
+                "$or": [{"writer": writer}, {"writer": None}, {"writer_lease_expires_at": {"$lte": now}}]
+            },
+            {"$set": {"writer": writer, "writer_lease_expires_at": lease_expires_at}}
+        )
+        return result.matched_count == 1
+
+    async def release_upload(self, upload_id, writer):
+        await self.uploads.update_one(
+            {"id": upload_id, "writer": writer},
+            {"$set": {"writer": None, "writer_lease_expires_at": None}}
+        )
+
+    async def write_chunk(self, upload_id, n, data):
+        await self.chunks.replace_one(
+            {"files_id": upload_id, "n": n},
+            {"files_id": upload_id, "n": n, "data": data},
+            upsert=True
+        )
+
+    async def commit_progress(self, upload_id, writer, expected_offset, offset, next_n, pending):
+        result = await self.uploads.update_one(
+            {"id": upload_id, "writer": writer, "offset": expected_offset, "status": "uploading"},
+            {"$set": {"offset": offset, "next_n": next_n, "pending": pending}}
+        )
+        return result.modified_count == 1
+
+    async def iter_chunks(self, upload_id):
+        async for chunk in self.chunks.find({"files_id": upload_id}).sort("n", ASCENDING):
+            yield chunk['data']
+
+    async def find_by_hash(self, sha256):
+        return await self.files.find_one({"metadata.sha256": sha256})
+
+    async def finalize(self, upload_id, file):
+        if file:
+            await self.files.insert_one(file)
+        await self.uploads.update_one(
+            {"id": upload_id},
+            {"$set": {"status": "complete", "pending": b"", "file_id": file['_id'] if file else None}}
+        )
+
+    async def discard_chunks(self, upload_id):
+        await self.chunks.delete_many({"files_id": upload_id})
+
+    async def get_file(self, file_id):
+        return await self.files.find_one({"_id": file_id})
+
+    async def read_range(self, file_id, start, end):
+        first, last = start // self.chunk_size, (end - 1) // self.chunk_size
+        cursor = self.chunks.find({"files_id": file_id, "n": {"$gte": first, "$lte": last}}).sort("n", ASCENDING)
+        async for chunk in cursor:
+            chunk_start = chunk['n'] * self.chunk_size
+            yield chunk['data'][max(start - chunk_start, 0):end - chunk_start]
+
+
+class MongoNotificationRepository(NotificationRepository):
+    def __init__(self, db):
+        self.collection = db.notifications
+
+    async def list_for_user(self, user_id, limit=50, fields=None):
+        return await self.collection.find(
+            {"user_id": user_id},
+            _projection(fields)
+        ).sort("created_at", -1).limit(limit).to_list(limit)
+
+    async def create(self, notification):
+        await self.collection.insert_one(notification.copy())
+
+    async def create_many(self, notifications):
+        if notifications:
+            await self.collection.insert_many([notif.copy() for notif in notifications])
+
+    async def mark_read(self, notif_id, user_id, updated_at):
+        await self.collection.update_one(
+            {"id": notif_id, "user_id": user_id},
+            {"$set": {"read": True, "updated_at": updated_at}}
+        )
+
+    async def mark_read_many(self, notif_ids, user_id, updated_at):
+        if notif_ids:
+            await self.collection.update_many(
+                {"id": {"$in": notif_ids}, "user_id": user_id},
+                {"$set": {"read": True, "updated_at": updated_at}}
+            )
+
+    async def list_updated_since(self, user_id, after, limit=500):
+        return await self.collection.find(
+            {"user_id": user_id, **_after("updated_at", after)},
+            {"_id": 0}
+        ).sort([("updated_at", 1), ("id", 1)]).to_list(limit)
+
+    async def list_read_before(self, cutoff, limit=1000):
+        return await self.collection.find(
+            {"read": True, "created_at": {"$lt": cutoff}},
+            {"_id": 0}
+        ).limit(limit).to_list(limit)
+
+    async def delete_many(self, notif_ids):
+        if notif_ids:
+            await self.collection.delete_many({"id": {"$in": notif_ids}})
+
+
+class MongoTombstoneRepository(TombstoneRepository):
+    def __init__(self, db):
+        self.collection = db.tombstones
+
+    async def add_many(self, collection, tombstones):
+        if not tombstones:
+            return
+        await self.collection.insert_many([{
+            "collection": collection,
+            "id": tombstone['id'],
+            "user_id": tombstone['user_id'],
+            "mfi_id": tombstone.get('mfi_id'),
+            "deleted_at": tombstone['deleted_at'],
+            "expires_at": datetime.fromisoformat(tombstone['deleted_at']) + timedelta(days=TOMBSTONE_RETENTION_DAYS)
+        } for tombstone in tombstones], ordered=False)
+
+    async def list_since(self, collection, after, user_id=None, limit=500, mfi_id=None):
+        query = {"collection": collection, **_after("deleted_at", after)}
+        if user_id:
+            query['user_id'] = user_id
+        if mfi_id:
+            query['mfi_id'] = mfi_id
+        return await self.collection.find(
+            query, {"_id": 0, "id": 1, "deleted_at": 1}
+        ).sort([("deleted_at", 1), ("id", 1)]).to_list(limit)
+
+
+class MongoIdempotencyKeyRepository(IdempotencyKeyRepository):
+    def __init__(self, db):
+        self.collection = db.idempotency_keys
+
+    async def reserve(self, user_id, key, request_hash, expires_at):
+        # The unique (user_id, key) index makes the insert the single point of
+        # arbitration between concurrent duplicates.
+        try:
+            await self.collection.insert_one({
+                "user_id": user_id,
+                "key": key,
+                "request_hash": request_hash,
+                "response": None,
+                "expires_at": expires_at
+            })
+            return None
+        except DuplicateKeyError:
+            return await self.collection.find_one({"user_id": user_id, "key": key}, {"_id": 0})
+
+    async def complete(self, user_id, key, response):
+        await self.collection.update_one(
+            {"user_id": user_id, "key": key},
+            {"$set": {"response": response}}
+        )
+
+    async def release(self, user_id, key):
+        await self.collection.delete_one({"user_id": user_id, "key": key, "response": None})
+
+
+class MongoRevokedTokenRepository(RevokedTokenRepository):
+    def __init__(self, db):
+        self.collection = db.revoked_tokens
+
+    async def add(self, jti, expires_at):
+        # Upserted, so revoking the same token twice is harmless
+        await self.collection.update_one({"jti": jti}, {"$set": {"expires_at": expires_at}}, upsert=True)
+
+    async def is_revoked(self, jti):
+        return await self.collection.find_one({"jti": jti}, {"_id": 1}) is not None
+
+    async def list_active(self, now):
+        return [doc['jti'] async for doc in self.collection.find({"expires_at": {"$gt": now}}, {"_id": 0, "jti": 1})]
+
+
+class MongoApplicationArchiveRepository(ApplicationArchiveRepository):
+    def __init__(self, db):
+        self.collection = db.applications_archive
+        self.totals_collection = db.applications_archive_totals
+
+    async def archive(self, applications):
+        if applications:
+            # Upserts make a retried batch harmless
+            await self.collection.bulk_write(
+                [ReplaceOne({"id": app['id']}, app, upsert=True) for app in applications],
+                ordered=False
+            )
+
+    async def add_to_totals(self, applications):
+        # Totals are kept per MFI; documents without an mfi_id are global
+        # totals from before that, and only count towards the overall totals
+        increments = {}
+        for app in applications:
+            created = datetime.fromisoformat(app['created_at'])
+            status = increments.setdefault((app['mfi_id'], f"status:{app['status']}"), {"count": 0, "loan_amount": 0})
+            status["count"] += 1
+            status["loan_amount"] += app['loan_amount']
+            month = increments.setdefault((app['mfi_id'], f"month:{created.year}-{created.month:02d}"), {"count": 0, "total_amount": 0})
+            month["count"] += 1
+            month["total_amount"] += app['loan_amount']
+        if increments:
+            await self.totals_collection.bulk_write([
+                UpdateOne({"_id": f"{mfi_id}/{key}"}, {"$inc": inc, "$set": {"mfi_id": mfi_id, "key": key}}, upsert=True)
+                for (mfi_id, key), inc in increments.items()
+            ])
+
+    async def get(self, app_id):
+        return await self.collection.find_one({"id": app_id}, {"_id": 0})
+
+    async def rebuild_totals(self):
+        # Both groupings are small (MFIs x statuses, MFIs x months), so they're
+        # built here and written back in one bulk write
+        totals = {}
+        groupings = [
+            ("status:", "$status", {"loan_amount": {"$sum": "$loan_amount"}}),
+            # created_at is ISO 8601, so its first 7 characters are the year and month
+            ("month:", {"$substrCP": ["$created_at", 0, 7]}, {"total_amount": {"$sum": "$loan_amount"}})
+        ]
+        for prefix, name, sums in groupings:
+            async for row in self.collection.aggregate([
+                {"$group": {"_id": {"mfi_id": "$mfi_id", "name": name}, "count": {"$sum": 1}, **sums}}
+            ]):
+                mfi_id, key = row['_id'].get('mfi_id'), prefix + row['_id']['name']
+                totals[f"{mfi_id}/{key}"] = {"mfi_id": mfi_id, "key": key, **{field: row[field] for field in ["count", *sums]}}
+        if totals:
+            await self.totals_collection.bulk_write(
+                [ReplaceOne({"_id": total_id}, total, upsert=True) for total_id, total in totals.items()],
+                ordered=False
+            )
+        # Drops keys nothing archived backs any more, such as the global totals kept before per-MFI ones
+        await self.totals_collection.delete_many({"_id": {"$nin": list(totals)}})
+        return sum(total['count'] for total in totals.values() if total['key'].startswith("status:"))
+
+    async def totals(self, mfi_id=None):
+        totals = {"statuses": {}, "months": {}}
+        async for doc in self.totals_collection.find({"mfi_id": mfi_id} if mfi_id else {}):
+            kind, _, name = doc.get('key', doc['_id']).partition(':')
+            if kind == "status":
+                total = totals["statuses"].setdefault(name, {"count": 0, "loan_amount": 0})
+                total["count"] += doc['count']
+                total["loan_amount"] += doc.get('loan_amount', 0)
+            else:
+                year, month = name.split('-')
+                total = totals["months"].setdefault((int(year), int(month)), {"count": 0, "total_amount": 0})
+                total["count"] += doc['count']
+                total["total_amount"] += doc.get('total_amount', 0)
+        return totals
+
+
+class MongoJobRepository(JobRepository):
+    def __init__(self, db):
+        self.collection = db.jobs
+
+    async def ensure(self, job):
+        await self.collection.update_one({"id": job['id']}, {"$setOnInsert": job}, upsert=True)
+
+    async def enqueue(self, job):
+        await self.collection.insert_one(job.copy())
+
+    async def get(self, job_id):
+        return await self.collection.find_one({"id": job_id}, {"_id": 0})
+
+    async def claim_due(self, names, worker_id, now, lease_expires_at):
+        return await self.collection.find_one_and_update(
+            {
+                "name": {"$in": names},
+                "$or": [
+                    {"status": "scheduled", "run_at": {"$lte": now}},
+                    {"status": "running", "lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {"$set": {
+                "status": "running",
+                "lease_owner": worker_id,
+                "lease_expires_at": lease_expires_at,
+                "started_at": now,
+                "updated_at": now
+            }, "$inc": {"attempts": 1}},
+            sort=[("run_at", ASCENDING)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def extend_lease(self, job_id, worker_id, lease_expires_at):
+        result = await self.collection.update_one(
+            {"id": job_id, "status": "running", "lease_owner": worker_id},
+            {"$set": {"lease_expires_at": lease_expires_at}}
+        )
+        return result.matched_count == 1
+
+    async def finish(self, job_id, worker_id, fields):
+        result = await self.collection.update_one(
+            {"id": job_id, "status": "running", "lease_owner": worker_id},
+            {"$set": {**fields, "lease_owner": None, "lease_expires_at": None}}
+        )
+        return result.matched_count == 1
+
+    async def list(self, limit=100):
+        return await self.collection.find({}, {"_id": 0}).sort("updated_at", -1).to_list(limit)
+
+
+class MongoRepositories(Repositories):
+    def __init__(self, client, db):
+        self.client = client
+        self.db = db
+        self.users = MongoUserRepository(db)
+        self.sessions = MongoSessionRepository(db)
+        self.mfis = MongoMFIRepository(db)
+        self.loan_products = MongoLoanProductRepository(db)
+        self.branches = MongoBranchRepository(db)
+        self.centers = MongoCenterRepository(db)
+        self.applications = MongoApplicationRepository(db, client)
+        self.application_events = MongoApplicationEventRepository(db)
+        self.notifications = MongoNotificationRepository(db)
+        self.documents = MongoDocumentStore(db)
+        self.tombstones = MongoTombstoneRepository(db)
+        self.idempotency_keys = MongoIdempotencyKeyRepository(db)
+        self.revoked_tokens = MongoRevokedTokenRepository(db)
+        self.jobs = MongoJobRepository(db)
+        self.application_archive = MongoApplicationArchiveRepository(db)
+        self._routed = {}
+
+    def with_read_preference(self, read_preference):
+        # Read preferences aren't hashable, but their repr covers mode, tags and staleness
+        key = repr(read_preference)
+        if key not in self._routed:
+            self._routed[key] = MongoRepositories(self.client, self.db.with_options(read_preference=read_preference))
+        return self._routed[key]
+
+    def invalidation_bus(self):
+        return MongoInvalidationBus(self.db)
+
+    async def ping(self):
+        await self.db.command("ping")
+
+    async def warm_up(self):
+        # Concurrent pings each need their own pooled connection
+        await asyncio.gather(*(self.ping() for _ in range(MONGO_WARMUP_CONNECTIONS)))
+
+    async def ensure_indexes(self):
+        hello = await self.db.command("hello")
+        self.applications.transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        if hello.get("msg") == "isdbgrid":
+            sharding = await self.client.config.collections.find_one({"_id": f"{self.db.name}.applications"})
+            self.applications.sharded = bool(sharding and sharding.get("key") == SHARD_KEYS["applications"])
+        if not self.applications.transactions:
+            logger.warning("MongoDB is standalone; application events are written without a transaction")
+
+        await self.db.users.create_index("id")
+        await self.db.users.create_index("email")
+        await self.db.user_sessions.create_index("session_token")
+        await self.db.mfis.create_index("id")
+        await self.db.loan_products.create_index("mfi_id")
+        await self.db.loan_products.create_index("id")
+        await self.db.branches.create_index([("location", "2dsphere")])
+        await self.db.branches.create_index([("mfi_id", ASCENDING), ("name", ASCENDING)])
+        await self.db.centers.create_index("id", unique=True)
+        await self.db.centers.create_index([("mfi_id", ASCENDING), ("name", ASCENDING)])
+        await self.db.lending_groups.create_index([("center_id", ASCENDING), ("id", ASCENDING)])
+        await self.db.lending_groups.create_index([("members.user_id", ASCENDING), ("mfi_id", ASCENDING)])
+        await self.db.applications.create_index([("user_id", ASCENDING), ("status", ASCENDING)])
+        await self.db.applications.create_index("id")
+        await self.db.applications.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        await self.db.applications.create_index([("created_at", DESCENDING)])
+        await self.db.applications.create_index("status")
+        await self.db.applications.create_index(
+            [("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)]
+        )
+        await self.db.application_events.create_index([("application_id", ASCENDING), ("created_at", ASCENDING)])
+        await self.db.application_events.create_index([("created_at", ASCENDING), ("to_status", ASCENDING)])
+        # Officer queries and analytics are scoped to one MFI, so their indexes lead on mfi_id
+        await self.db.applications.create_index([("mfi_id", ASCENDING), ("id", ASCENDING)])
+        await self.db.applications.create_index([("mfi_id", ASCENDING), ("created_at", DESCENDING)])
+        await self.db.applications.create_index([("mfi_id", ASCENDING), ("updated_at", ASCENDING), ("id", ASCENDING)])
+        await self.db.applications.create_index(
+            [("mfi_id", ASCENDING), ("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)]
+        )
+        await self.db.application_events.create_index([("mfi_id", ASCENDING), ("created_at", ASCENDING)])
+        await self.db.applications_archive_totals.create_index("mfi_id")
+        # Delta sync pages by (updated_at, id), so documents sharing a timestamp aren't split and lost
+        await self.db.applications.create_index([("updated_at", ASCENDING), ("id", ASCENDING)])
+        await self.db.applications.create_index([("user_id", ASCENDING), ("updated_at", ASCENDING), ("id", ASCENDING)])
+        await self.db.notifications.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        await self.db.notifications.create_index([("user_id", ASCENDING), ("updated_at", ASCENDING), ("id", ASCENDING)])
+        await self.db.tombstones.create_index(
+            [("collection", ASCENDING), ("user_id", ASCENDING), ("deleted_at", ASCENDING), ("id", ASCENDING)]
+        )
+        await self.db.tombstones.create_index(
+            [("collection", ASCENDING), ("mfi_id", ASCENDING), ("deleted_at", ASCENDING), ("id", ASCENDING)]
+        )
+        await self.db.tombstones.create_index([("collection", ASCENDING), ("deleted_at", ASCENDING), ("id", ASCENDING)])
+        await self.db.tombstones.create_index("expires_at", expireAfterSeconds=0)
+        await self.db["documents.chunks"].create_index([("files_id", ASCENDING), ("n", ASCENDING)], unique=True)
+        await self.db["documents.files"].create_index("metadata.sha256")
+        await self.db.document_uploads.create_index("id")
+        await self.db.document_uploads.create_index("expires_at", expireAfterSeconds=0)
+        await self.db.idempotency_keys.create_index([("user_id", ASCENDING), ("key", ASCENDING)], unique=True)
+        await self.db.idempotency_keys.create_index("expires_at", expireAfterSeconds=0)
+        await self.db.revoked_tokens.create_index("jti", unique=True)
+        await self.db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0)
+        await self.db.user_sessions.create_index("expires_at")
+        await self.db.notifications.create_index([("read", ASCENDING), ("created_at", ASCENDING)])
+        await self.db.applications.create_index([("status", ASCENDING), ("updated_at", ASCENDING)])
+        try:
+            # The archive is rarely read, so trade CPU for disk with zstd block compression
+            await self.db.create_collection(
+                "applications_archive",
+                storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}}
+            )
+        except CollectionInvalid:
+            pass
+        await self.db.applications_archive.create_index("id", unique=True)
+        await self.db.applications_archive.create_index([("user_id", ASCENDING), ("status", ASCENDING)])
+        await self.db.jobs.create_index("id", unique=True)
+        await self.db.jobs.create_index([("name", ASCENDING), ("status", ASCENDING), ("run_at", ASCENDING)])
+        await self.db.jobs.create_index([("updated_at", DESCENDING)])
+
+    def close(self):
+        self.client.close()
@@ -1,40 +1,197 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Header, Cookie
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
+import asyncio
 import uuid
-import httpx
 
 # Import models
-from models.user import User, UserCreate, UserLogin, UserResponse, UserSession
-from models.mfi import MFI, LoanProduct
-from models.application import LoanApplication, ApplicationCreate, ApplicationUpdate
-from models.notification import Notification
-from utils.auth import hash_password, verify_password, create_access_token, get_current_user
+from models.user import User, UserCreate, UserLogin, UserResponse, UserRoleUpdate, UserSession
+from models.mfi import MFI, LoanProduct, MFI_SUMMARY_FIELDS, LOAN_PRODUCT_SUMMARY_FIELDS
+from models.branch import BranchImport
+from models.application import LoanApplication, ApplicationCreate, ApplicationUpdate, ApplicationReportBatch, APPLICATION_SUMMARY_FIELDS
+from models.notification import Notification, NOTIFICATION_SUMMARY_FIELDS
+from models.document import DocumentUploadCreate
+from models.sync import SyncBatch, SyncOperation
+from models.job import ApplicationExportCreate, CollectionSheetsCreate
+from models.group import CenterCreate, GroupCreate
+from utils.auth import hash_password, verify_password, create_access_token, decode_token, get_current_user, revoke_token
+from utils.admission import AdmissionController, AdmissionMiddleware
+from utils.startup import StartupProfile
+from utils.profiling import MAX_PROFILE_SECONDS, MIN_PROFILE_INTERVAL_MS, PROFILE_INTERVAL_MS, LoopWatchdog, SamplingProfiler
+from utils.reports import ReportRenderer, stream_zip
+from utils.idempotency import MAX_IDEMPOTENCY_KEY_LENGTH, request_fingerprint, key_expiry
+from utils.search import SearchIndex
+from utils.encoding import negotiated_response
+from utils.fields import parse_fields
+from utils.sync import SYNC_PAGE_SIZE, etag_for, format_watermark, next_watermark, parse_watermark, watermark_expired
+from utils.uploads import (
+    ALLOWED_CONTENT_TYPES, MAX_DOCUMENT_BYTES, UPLOAD_SESSION_HOURS, UploadConflict, UploadTooLarge,
+    content_disposition, finalize_upload, parse_range, receive_upload, transfer_slots
+)
+from utils.jobs import JobScheduler
+from utils.maintenance import EXPORT_DIR, register_jobs
+from utils.singleflight import coalesce, coalescing_stats
+from utils.analytics import DECISION_STATUSES, event_window, time_to_decision_by_mfi
+from utils.database import analytics_read_preference, create_client
+from utils.geo import point
+from repositories.base import Repositories
+from repositories.cached import LOAN_PRODUCTS, MFIS, add_caches
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+def open_repositories() -> Repositories:
+    # Data access: MongoDB by default, or the in-memory backend for tests and
+    # benchmarks (REPOSITORY_BACKEND=memory)
+    if os.environ.get('REPOSITORY_BACKEND', 'mongo') == 'memory':
+        from repositories.memory import MemoryRepositories
+        return MemoryRepositories()
+    from repositories.mongo import MongoRepositories
+    client = create_client()
+    return MongoRepositories(client, client[os.environ['DB_NAME']])
+
+# Largest search radius for the branch locator
+MAX_NEARBY_RADIUS_KM = 200
+
+# Officer work queue
+QUEUE_LEASE_MINUTES = int(os.environ.get('QUEUE_LEASE_MINUTES', 15))
+MAX_QUEUE_CLAIM = 50
+
+# Concurrent identical dashboard aggregations share one query; results are
+# also reused for this long after they finish
+ANALYTICS_STALE_SECONDS = float(os.environ.get('ANALYTICS_STALE_SECONDS', 2))
+
+# PDF reports are rendered in a process pool, started on first use
+renderer = ReportRenderer()
+
+# Jobs whose result file can be downloaded: name -> (media type, roles allowed)
+DOWNLOADABLE_JOBS = {
+    "export_applications": ("application/gzip", ["admin"]),
+    "collection_sheets": ("application/zip", ["officer", "admin"]),
+    # Covers every MFI, so only admins
+    "weekly_collection_sheets": ("application/zip", ["admin"])
+}
+
+# Set BACKGROUND_JOBS=0 on workers that shouldn't run scheduled jobs
+BACKGROUND_JOBS_ENABLED = os.environ.get('BACKGROUND_JOBS', '1') != '0'
+
+# Per-client rate limits and load shedding, applied before routing
+admission = AdmissionController()
+
+# On-demand profiles and blocked event loop reports, per worker
+profiler = SamplingProfiler()
+watchdog = LoopWatchdog()
+
+def get_repos(request: Request) -> Repositories:
+    """Repositories dependency; override via app.dependency_overrides."""
+    return request.app.state.repositories
+
+# Analytics can tolerate slightly stale data, so it reads from secondaries
+# when there are any; everything else stays on the primary
+analytics_reads = analytics_read_preference()
+
+def get_analytics_repos(repos: Repositories = Depends(get_repos)) -> Repositories:
+    return repos.with_read_preference(analytics_reads)
+
+def sparse_fields(model, summary: List[str]):
+    """Dependency parsing a list endpoint's `fields` query parameter against `model`."""
+    def dependency(fields: Optional[str] = None) -> Optional[List[str]]:
+        try:
+            return parse_fields(fields, model, summary)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return dependency
+
+# Catalog search indexes, built from the repositories on first use
+mfi_index = SearchIndex(
+    text_fields={"name": 3.0, "requirements": 2.0, "description": 1.0},
+    numeric_fields=["interest_rate", "processing_time_days"],
+    amount_range=("min_loan_amount", "max_loan_amount")
+)
+product_index = SearchIndex(
+    text_fields={"name": 3.0, "eligibility_criteria": 2.0, "description": 1.0},
+    numeric_fields=["interest_rate"],
+    amount_range=("min_amount", "max_amount")
+)
+
+async def get_mfi_index(repos: Repositories = Depends(get_repos)) -> SearchIndex:
+    await mfi_index.ensure_built(lambda: repos.mfis.list(None))
+    return mfi_index
+
+async def get_product_index(repos: Repositories = Depends(get_repos)) -> SearchIndex:
+    await product_index.ensure_built(lambda: repos.loan_products.list(None, None))
+    return product_index
+
+# Start-up phase timings and readiness, reported by /api/ready
+startup = StartupProfile()
+
+async def warm_up(repositories: Repositories):
+    """Open pooled connections and build the catalog search indexes before reporting ready."""
+    with startup.phase("warm_up"):
+        try:
+            await repositories.warm_up()
+            await mfi_index.ensure_built(lambda: repositories.mfis.list(None))
+            await product_index.ensure_built(lambda: repositories.loan_products.list(None, None))
+        except Exception:
+            logger.exception("Warm-up failed; serving with cold caches")
+    startup.ready = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup.phase("open_repositories"):
+        repositories = open_repositories()
+        await repositories.ensure_indexes()
+    
+    # Other workers' writes reach this worker's caches through the bus
+    with startup.phase("invalidation_bus"):
+        bus = repositories.invalidation_bus()
+        bus.subscribe(MFIS, mfi_index.invalidation_handler(repositories.mfis.get))
+        bus.subscribe(LOAN_PRODUCTS, product_index.invalidation_handler(repositories.loan_products.get))
+        await bus.start()
+    app.state.repositories = add_caches(repositories, bus)
+    # Loaded before serving, so JWT checks never need the database
+    with startup.phase("revoked_tokens"):
+        await repositories.revoked_tokens.start()
+    
+    # Maintenance and batch jobs; leases keep each job to one worker at a time
+    with startup.phase("scheduler"):
+        scheduler = JobScheduler(repositories.jobs, app.state.repositories)
+        register_jobs(scheduler)
+        app.state.scheduler = scheduler
+        if BACKGROUND_JOBS_ENABLED:
+            await scheduler.start()
+    await admission.start(repositories.ping)
+    await watchdog.start()
+    
+    # Warm up while already accepting requests; /api/ready says when it's done
+    warming = asyncio.create_task(warm_up(app.state.repositories))
+    yield
+    warming.cancel()
+    await admission.stop()
+    await watchdog.stop()
+    renderer.shutdown()
+    await scheduler.stop()
+    await repositories.revoked_tokens.stop()
+    await bus.stop()
+    repositories.close()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # Dependency to get current user from cookie or header
-async def get_auth_user(request: Request, authorization: Optional[str] = Header(None)):
+async def get_auth_user(request: Request, authorization: Optional[str] = Header(None), repos: Repositories = Depends(get_repos)):
     # Try to get session token from cookie
     session_token = request.cookies.get('session_token')
     
@@ -43,11 +200,29 @@ async def get_auth_user(request: Request, authorization: Optional[str] = Header(
     if authorization and authorization.startswith('Bearer '):
         jwt_token = authorization.split(' ')[1]
     
-    user = await get_current_user(db, token=jwt_token, session_token=session_token)
+    user = await get_current_user(repos, token=jwt_token, session_token=session_token)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return user
 
+def officer_mfi(user: dict) -> Optional[str]:
+    """The MFI an officer's queries are scoped to; None for admins, who see every MFI."""
+    if user['role'] == 'admin':
+        return None
+    if user['role'] != 'officer':
+        raise HTTPException(status_code=403, detail="Access denied")
+    if not user.get('mfi_id'):
+        raise HTTPException(status_code=403, detail="Officer is not assigned to an MFI")
+    return user['mfi_id']
+
+def can_access(user: dict, app: dict) -> bool:
+    """Borrowers see their own applications, officers their MFI's, admins all."""
+    if user['role'] == 'borrower':
+        return app['user_id'] == user['id']
+    if user['role'] == 'officer':
+        return app['mfi_id'] == user.get('mfi_id')
+    return True
+
 # ========== HEALTH CHECK ==========
 
 @api_router.get("/")
@@ -58,12 +233,17 @@ async def health_check():
 async def health():
     return {"status": "healthy"}
 
+@api_router.get("/ready")
+async def ready():
+    """503 until this worker has finished warming up; start-up phase timings either way."""
+    return JSONResponse(startup.report(), status_code=200 if startup.ready else 503)
+
 # ========== AUTH ROUTES ==========
 
 @api_router.post("/auth/register")
-async def register(user_data: UserCreate, response: Response):
+async def register(user_data: UserCreate, response: Response, repos: Repositories = Depends(get_repos)):
     # Check if user exists
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await repos.users.get_by_email(user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -77,7 +257,7 @@ async def register(user_data: UserCreate, response: Response):
         "role": user_data.role,
         "created_at": datetime.now(timezone.utc).isoformat()
     }
-    await db.users.insert_one(user_dict)
+    await repos.users.create(user_dict)
     
     # Create JWT token
     token = create_access_token({"user_id": user_id})
@@ -101,8 +281,8 @@ async def register(user_data: UserCreate, response: Response):
     }
 
 @api_router.post("/auth/login")
-async def login(credentials: UserLogin, response: Response):
-    user = await db.users.find_one({"email": credentials.email})
+async def login(credentials: UserLogin, response: Response, repos: Repositories = Depends(get_repos)):
+    user = await repos.users.get_by_email(credentials.email)
     if not user or not verify_password(credentials.password, user['password_hash']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -129,8 +309,10 @@ async def login(credentials: UserLogin, response: Response):
     }
 
 @api_router.post("/auth/session")
-async def create_session_from_emergent(x_session_id: str = Header(...), response: Response = None):
+async def create_session_from_emergent(x_session_id: str = Header(...), response: Response = None, repos: Repositories = Depends(get_repos)):
     """Exchange Emergent session_id for user data and store session."""
+    # Imported on first use: few users sign in this way, and it slows worker start
+    import httpx
     try:
         async with httpx.AsyncClient() as client:
             resp = await client.get(
@@ -144,7 +326,7 @@ async def create_session_from_emergent(x_session_id: str = Header(...), response
             data = resp.json()
             
             # Check if user exists
-            user = await db.users.find_one({"email": data['email']})
+            user = await repos.users.get_by_email(data['email'])
             
             if not user:
                 # Create new user
@@ -157,7 +339,7 @@ async def create_session_from_emergent(x_session_id: str = Header(...), response
                     "role": "borrower",
                     "created_at": datetime.now(timezone.utc).isoformat()
                 }
-                await db.users.insert_one(user_dict)
+                await repos.users.create(user_dict)
                 user = user_dict
             
             # Store session token
@@ -168,7 +350,7 @@ async def create_session_from_emergent(x_session_id: str = Header(...), response
                 "expires_at": datetime.now(timezone.utc) + timedelta(days=7),
                 "created_at": datetime.now(timezone.utc)
             }
-            await db.user_sessions.insert_one(session_doc)
+            await repos.sessions.create(session_doc)
             
             # Set cookie
             if response:
@@ -198,78 +380,399 @@ async def get_me(user: dict = Depends(get_auth_user)):
     return user
 
 @api_router.post("/auth/logout")
-async def logout(request: Request, response: Response):
+async def logout(request: Request, response: Response, authorization: Optional[str] = Header(None), repos: Repositories = Depends(get_repos)):
     session_token = request.cookies.get('session_token')
     if session_token:
-        await db.user_sessions.delete_one({"session_token": session_token})
+        await repos.sessions.delete_by_token(session_token)
+    
+    # JWTs stay valid until they expire unless revoked
+    tokens = {request.cookies.get('auth_token')}
+    if authorization and authorization.startswith('Bearer '):
+        tokens.add(authorization.split(' ')[1])
+    for token in tokens - {None}:
+        await revoke_token(repos, token)
     
     response.delete_cookie("session_token")
     response.delete_cookie("auth_token")
     return {"message": "Logged out"}
 
+# ========== USER ROUTES ==========
+
+@api_router.patch("/users/{user_id}/role", response_model=UserResponse)
+async def update_user_role(
+    user_id: str,
+    role_data: UserRoleUpdate,
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Only admins can change roles")
+    
+    target = await repos.users.get(user_id)
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Officers work for exactly one MFI; other roles aren't tied to one
+    fields = {"role": role_data.role, "mfi_id": None}
+    if role_data.role == 'officer':
+        fields['mfi_id'] = role_data.mfi_id or target.get('mfi_id')
+        if not fields['mfi_id']:
+            raise HTTPException(status_code=400, detail="Officers must be assigned to an MFI")
+        if not await repos.mfis.get(fields['mfi_id']):
+            raise HTTPException(status_code=404, detail="MFI not found")
+    
+    # Publishes an invalidation, so no worker keeps authorizing the old role
+    updated_user = await repos.users.update(user_id, fields)
+    if not updated_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return updated_user
+
 # ========== MFI ROUTES ==========
 
 @api_router.get("/mfis", response_model=List[dict])
-async def get_mfis():
-    mfis = await db.mfis.find({}, {"_id": 0}).to_list(100)
-    return mfis
+async def get_mfis(
+    request: Request,
+    fields: Optional[List[str]] = Depends(sparse_fields(MFI, MFI_SUMMARY_FIELDS)),
+    repos: Repositories = Depends(get_repos)
+):
+    mfis = await repos.mfis.list(100, fields)
+    return negotiated_response(request, mfis)
+
+@api_router.get("/mfis/search")
+async def search_mfis(
+    q: Optional[str] = None,
+    loan_amount: Optional[float] = None,
+    max_interest_rate: Optional[float] = None,
+    max_processing_days: Optional[int] = None,
+    collateral_required: Optional[bool] = None,
+    sort: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20,
+    index: SearchIndex = Depends(get_mfi_index)
+):
+    """Search MFIs by text (with prefix and typo matching) and loan terms."""
+    if sort and sort.lstrip('-') not in index.numeric_fields:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(index.numeric_fields)}")
+    page, page_size = max(page, 1), min(max(page_size, 1), 100)
+    
+    total, results = index.search(
+        query=q,
+        ranges={
+            "interest_rate": (None, max_interest_rate),
+            "processing_time_days": (None, max_processing_days)
+        },
+        amount=loan_amount,
+        equals={"collateral_required": collateral_required},
+        sort=sort,
+        offset=(page - 1) * page_size,
+        limit=page_size
+    )
+    return {"total": total, "page": page, "page_size": page_size, "results": results}
+
+@api_router.get("/mfis/nearby")
+async def get_nearby_mfis(
+    latitude: float,
+    longitude: float,
+    radius_km: float = 25,
+    loan_amount: Optional[float] = None,
+    max_interest_rate: Optional[float] = None,
+    limit: int = 10,
+    repos: Repositories = Depends(get_repos),
+    index: SearchIndex = Depends(get_mfi_index)
+):
+    """MFIs with a branch within `radius_km`, nearest first, each with its nearest branch."""
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise HTTPException(status_code=400, detail="Invalid coordinates")
+    radius_km = min(max(radius_km, 0), MAX_NEARBY_RADIUS_KM)
+    limit = min(max(limit, 1), 50)
+    
+    mfi_ids = None
+    if loan_amount is not None or max_interest_rate is not None:
+        # Eligibility comes from the search index, so only matching MFIs' branches are scanned
+        _, eligible = index.search(
+            ranges={"interest_rate": (None, max_interest_rate)},
+            amount=loan_amount,
+            limit=len(index.docs)
+        )
+        mfi_ids = [mfi['id'] for mfi in eligible]
+        if not mfi_ids:
+            return {"results": []}
+    
+    branches = await repos.branches.nearby(longitude, latitude, radius_km, mfi_ids, limit, nearest_per_mfi=True)
+    results = []
+    for branch in branches:
+        mfi = index.docs.get(branch['mfi_id'])
+        if not mfi:
+            continue  # branch of an MFI the index doesn't know (yet)
+        branch['distance_km'] = round(branch['distance_km'], 2)
+        results.append({"mfi": mfi, "branch": branch})
+    return {"results": results}
 
 @api_router.get("/mfis/{mfi_id}")
-async def get_mfi(mfi_id: str):
-    mfi = await db.mfis.find_one({"id": mfi_id}, {"_id": 0})
+async def get_mfi(mfi_id: str, repos: Repositories = Depends(get_repos)):
+    mfi = await repos.mfis.get(mfi_id)
     if not mfi:
         raise HTTPException(status_code=404, detail="MFI not found")
     return mfi
 
 @api_router.post("/mfis")
-async def create_mfi(mfi_data: dict, user: dict = Depends(get_auth_user)):
+async def create_mfi(mfi_data: dict, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
     if user['role'] != 'admin':
         raise HTTPException(status_code=403, detail="Only admins can create MFIs")
     
     mfi_id = str(uuid.uuid4())
     mfi_data['id'] = mfi_id
     mfi_data['created_at'] = datetime.now(timezone.utc).isoformat()
-    await db.mfis.insert_one(mfi_data)
+    # Publishes an invalidation, so every worker adds it to its search index
+    await repos.mfis.create(mfi_data)
+    if mfi_index.built:
+        # Searchable here straight away, without waiting for the refresh
+        mfi_index.add(mfi_data)
     return mfi_data
 
+@api_router.get("/mfis/{mfi_id}/branches")
+async def get_mfi_branches(mfi_id: str, repos: Repositories = Depends(get_repos)):
+    return await repos.branches.list(mfi_id)
+
+@api_router.post("/mfis/{mfi_id}/branches", status_code=201)
+async def import_mfi_branches(mfi_id: str, body: BranchImport, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    """Add up to MAX_BRANCH_IMPORT branches at once, optionally replacing the existing ones."""
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Only admins can import branches")
+    if not await repos.mfis.get(mfi_id):
+        raise HTTPException(status_code=404, detail="MFI not found")
+    
+    current_time = datetime.now(timezone.utc).isoformat()
+    branches = []
+    for branch in body.branches:
+        fields = branch.model_dump(exclude={"latitude", "longitude"})
+        branches.append({
+            "id": str(uuid.uuid4()),
+            "mfi_id": mfi_id,
+            **fields,
+            "location": point(branch.longitude, branch.latitude),
+            "created_at": current_time
+        })
+    
+    deleted = await repos.branches.delete_for_mfi(mfi_id) if body.replace else 0
+    await repos.branches.create_many(branches)
+    return {"imported": len(branches), "deleted": deleted}
+
 # ========== LOAN PRODUCTS ROUTES ==========
 
 @api_router.get("/loan-products")
-async def get_loan_products(mfi_id: Optional[str] = None):
-    query = {}
-    if mfi_id:
-        query['mfi_id'] = mfi_id
-    products = await db.loan_products.find(query, {"_id": 0}).to_list(100)
-    return products
+async def get_loan_products(
+    request: Request,
+    mfi_id: Optional[str] = None,
+    fields: Optional[List[str]] = Depends(sparse_fields(LoanProduct, LOAN_PRODUCT_SUMMARY_FIELDS)),
+    repos: Repositories = Depends(get_repos)
+):
+    products = await repos.loan_products.list(mfi_id, 100, fields)
+    return negotiated_response(request, products)
+
+@api_router.get("/loan-products/search")
+async def search_loan_products(
+    q: Optional[str] = None,
+    mfi_id: Optional[str] = None,
+    loan_amount: Optional[float] = None,
+    max_interest_rate: Optional[float] = None,
+    sort: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20,
+    index: SearchIndex = Depends(get_product_index)
+):
+    """Search loan products by text, MFI and loan terms."""
+    if sort and sort.lstrip('-') not in index.numeric_fields:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(index.numeric_fields)}")
+    page, page_size = max(page, 1), min(max(page_size, 1), 100)
+    
+    total, results = index.search(
+        query=q,
+        ranges={"interest_rate": (None, max_interest_rate)},
+        amount=loan_amount,
+        equals={"mfi_id": mfi_id},
+        sort=sort,
+        offset=(page - 1) * page_size,
+        limit=page_size
+    )
+    return {"total": total, "page": page, "page_size": page_size, "results": results}
 
 # ========== APPLICATION ROUTES ==========
 
 @api_router.get("/applications")
-async def get_applications(user: dict = Depends(get_auth_user)):
-    query = {}
+async def get_applications(
+    request: Request,
+    fields: Optional[List[str]] = Depends(sparse_fields(LoanApplication, APPLICATION_SUMMARY_FIELDS)),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
     if user['role'] == 'borrower':
-        query['user_id'] = user['id']
-    
-    applications = await db.applications.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return applications
+        applications = await repos.applications.list(user['id'], 100, fields)
+    else:
+        applications = await repos.applications.list(None, 100, fields, mfi_id=officer_mfi(user))
+    return negotiated_response(request, applications)
+
+async def find_application(repos: Repositories, app_id: str) -> Optional[dict]:
+    """An application by id, falling back to the archive for old closed ones."""
+    app = await repos.applications.get(app_id)
+    if app:
+        return app
+    app = await repos.application_archive.get(app_id)
+    if app:
+        app['archived'] = True
+    return app
 
 @api_router.get("/applications/{app_id}")
-async def get_application(app_id: str, user: dict = Depends(get_auth_user)):
-    app = await db.applications.find_one({"id": app_id}, {"_id": 0})
+async def get_application(
+    app_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    app = await find_application(repos, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
     
     # Check permissions
-    if user['role'] == 'borrower' and app['user_id'] != user['id']:
+    if not can_access(user, app):
         raise HTTPException(status_code=403, detail="Access denied")
     
+    etag = etag_for(app)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers['ETag'] = etag
     return app
 
+@api_router.get("/applications/{app_id}/report")
+async def get_application_report(
+    app_id: str,
+    if_none_match: Optional[str] = Header(None),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos),
+    index: SearchIndex = Depends(get_mfi_index)
+):
+    """The application summary as a PDF."""
+    app = await find_application(repos, app_id)
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+    if not can_access(user, app):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    etag = etag_for(app)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+        return Response(status_code=304, headers={"ETag": etag})
+    mfi = index.docs.get(app['mfi_id'])
+    pdf = await renderer.application_pdf(app, mfi['name'] if mfi else None)
+    return Response(pdf, media_type="application/pdf", headers={
+        "ETag": etag,
+        "Content-Disposition": f'inline; filename="application-{app_id[:8]}.pdf"'
+    })
+
+@api_router.post("/reports/applications")
+async def export_application_reports(
+    batch: ApplicationReportBatch,
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos),
+    index: SearchIndex = Depends(get_mfi_index)
+):
+    """A ZIP of application PDFs, streamed as each one finishes rendering."""
+    officer_mfi(user)
+    
+    # Applications of other MFIs are reported missing, as if they didn't exist
+    apps, missing = [], []
+    for app_id in dict.fromkeys(batch.application_ids):
+        app = await find_application(repos, app_id)
+        if app and can_access(user, app):
+            apps.append(app)
+        else:
+            missing.append(app_id)
+    
+    async def render(app):
+        mfi = index.docs.get(app['mfi_id'])
+        try:
+            return app, await renderer.application_pdf(app, mfi['name'] if mfi else None)
+        except Exception:
+            # Listed in missing.txt rather than cutting the archive short
+            logger.exception("Rendering the report for application %s failed", app['id'])
+            return app, None
+    
+    async def files():
+        tasks = [asyncio.ensure_future(render(app)) for app in apps]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                app, pdf = await finished
+                if pdf is None:
+                    missing.append(app['id'])
+                    continue
+                yield f"application-{app['id'][:8]}.pdf", pdf
+            if missing:
+                yield "missing.txt", "\n".join(missing).encode()
+        finally:
+            # The client went away; don't keep rendering for nobody
+            for task in tasks:
+                task.cancel()
+    
+    filename = f"applications-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.zip"
+    return StreamingResponse(stream_zip(files()), media_type="application/zip", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
+
+@api_router.get("/applications/{app_id}/history")
+async def get_application_history(app_id: str, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    """Status transitions of an application, oldest first."""
+    app = await find_application(repos, app_id)
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+    
+    if not can_access(user, app):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return await repos.application_events.list_for_application(app_id)
+
 @api_router.post("/applications")
-async def create_application(app_data: ApplicationCreate, user: dict = Depends(get_auth_user)):
-    app_id = str(uuid.uuid4())
-    current_time = datetime.now(timezone.utc).isoformat()
+async def create_application(
+    app_data: ApplicationCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    return await run_idempotent(
+        idempotency_key, app_data.model_dump(), response, user, repos,
+        lambda: insert_application(app_data, user, repos)
+    )
+
+async def run_idempotent(idempotency_key, payload, response, user, repos, run):
+    """Await `run()` once per Idempotency-Key; retries get its stored response back."""
+    if not idempotency_key:
+        return await run()
+    
+    if len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    
+    # The first request with a key wins; retries get its stored response back
+    request_hash = request_fingerprint(payload)
+    existing = await repos.idempotency_keys.reserve(user['id'], idempotency_key, request_hash, key_expiry())
+    if existing:
+        if existing['request_hash'] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if existing['response'] is None:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        response.headers['Idempotent-Replayed'] = 'true'
+        return existing['response']
     
+    try:
+        result = await run()
+    except Exception:
+        await repos.idempotency_keys.release(user['id'], idempotency_key)
+        raise
+    await repos.idempotency_keys.complete(user['id'], idempotency_key, result)
+    return result
+
+def new_application(app_data: ApplicationCreate, user: dict, current_time: str):
+    """Build a submitted application with its submission event and borrower notification."""
+    app_id = str(uuid.uuid4())
     app_dict = {
         "id": app_id,
         "user_id": user['id'],
@@ -282,123 +785,446 @@ async def create_application(app_data: ApplicationCreate, user: dict = Depends(g
         "loan_purpose": app_data.loan_purpose,
         "tenure_months": app_data.tenure_months,
         "status": "submitted",
+        "priority": 0,
         "documents": [],
         "created_at": current_time,
         "updated_at": current_time
     }
-    
-    # Insert into database
-    await db.applications.insert_one(app_dict.copy())
-    
-    # Create notification
-    notif_id = str(uuid.uuid4())
+    event = {
+        "id": str(uuid.uuid4()),
+        "officer_id": None,
+        "notes": None,
+        "created_at": current_time
+    }
     notif = {
-        "id": notif_id,
+        "id": str(uuid.uuid4()),
         "user_id": user['id'],
         "title": "Application Submitted",
         "message": f"Your loan application for BDT {app_data.loan_amount} has been submitted successfully.",
         "type": "success",
         "read": False,
         "link": f"/applications/{app_id}",
-        "created_at": current_time
-    }
-    await db.notifications.insert_one(notif)
-    
-    # Return clean dict without _id
-    return {
-        "id": app_id,
-        "user_id": user['id'],
-        "mfi_id": app_data.mfi_id,
-        "business_name": app_data.business_name,
-        "business_type": app_data.business_type,
-        "business_age_years": app_data.business_age_years,
-        "monthly_revenue": app_data.monthly_revenue,
-        "loan_amount": app_data.loan_amount,
-        "loan_purpose": app_data.loan_purpose,
-        "tenure_months": app_data.tenure_months,
-        "status": "submitted",
         "created_at": current_time,
         "updated_at": current_time
     }
+    return app_dict, event, notif
+
+def submitted_summary(app_dict: dict) -> dict:
+    """The fields returned to the client after a submission."""
+    return {key: value for key, value in app_dict.items() if key not in ("priority", "documents")}
+
+async def insert_application(app_data: ApplicationCreate, user: dict, repos: Repositories):
+    current_time = datetime.now(timezone.utc).isoformat()
+    app_dict, event, notif = new_application(app_data, user, current_time)
+    
+    # Insert into database, recording the submission in the event log
+    await repos.applications.create(app_dict, event=event)
+    await repos.notifications.create(notif)
+    return submitted_summary(app_dict)
 
 @api_router.patch("/applications/{app_id}")
-async def update_application(app_id: str, update_data: ApplicationUpdate, user: dict = Depends(get_auth_user)):
-    app = await db.applications.find_one({"id": app_id})
+async def update_application(app_id: str, update_data: ApplicationUpdate, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    app = await repos.applications.get(app_id)
+    current_time = datetime.now(timezone.utc).isoformat()
+    update_dict, event = prepare_update(app, update_data, user, current_time)
+    updated_app = await repos.applications.update(app_id, update_dict, event=event)
+    
+    # Create notification for borrower
+    if update_data.status:
+        await repos.notifications.create(status_notification(app, update_data.status, current_time))
+    
+    return updated_app
+
+def prepare_update(app: Optional[dict], update_data: ApplicationUpdate, user: dict, current_time: str):
+    """Check an officer may update `app`; returns the fields to set and the status event."""
     if not app:
         raise HTTPException(status_code=404, detail="Application not found")
     
-    # Only officers and admins can update
-    if user['role'] not in ['officer', 'admin']:
+    # Only officers of the application's MFI and admins can update
+    officer_mfi(user)
+    if not can_access(user, app):
         raise HTTPException(status_code=403, detail="Access denied")
     
+    # Don't let a second officer review an application someone else has claimed
+    if app.get('claimed_by') not in (None, user['id']) and (app.get('lease_expires_at') or '') > current_time:
+        raise HTTPException(status_code=409, detail="Application is claimed by another officer")
+    
     update_dict = update_data.model_dump(exclude_unset=True)
-    update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
+    update_dict['updated_at'] = current_time
     update_dict['officer_id'] = user['id']
+    if update_data.status:
+        # A status change finishes the review, so the lease is no longer needed
+        update_dict['claimed_by'] = None
+        update_dict['lease_expires_at'] = None
+    if update_data.status == 'disbursed':
+        # Collection sheets schedule repayments from this date
+        update_dict['disbursed_at'] = current_time
+    
+    event = {
+        "id": str(uuid.uuid4()),
+        "officer_id": user['id'],
+        "notes": update_data.officer_notes,
+        "created_at": current_time
+    }
+    return update_dict, event
+
+def status_notification(app: dict, status: str, current_time: str) -> dict:
+    """Notification telling the borrower their application moved to `status`."""
+    status_msg = {
+        "approved": "Your loan application has been approved!",
+        "rejected": "Your loan application has been rejected.",
+        "under_review": "Your loan application is under review.",
+        "disbursed": "Your loan has been disbursed successfully!"
+    }
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": app['user_id'],
+        "title": "Application Status Update",
+        "message": status_msg.get(status, "Your application status has been updated."),
+        "type": "info" if status != "rejected" else "warning",
+        "read": False,
+        "link": f"/applications/{app['id']}",
+        "created_at": current_time,
+        "updated_at": current_time
+    }
+
+# ========== DOCUMENT ROUTES ==========
+
+@api_router.post("/applications/{app_id}/documents", status_code=201)
+async def create_document_upload(
+    app_id: str,
+    upload_data: DocumentUploadCreate,
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    """Start a resumable upload of a document for an application."""
+    app = await repos.applications.get(app_id)
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+    if not can_access(user, app):
+        raise HTTPException(status_code=403, detail="Access denied")
+    if upload_data.content_type not in ALLOWED_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail="Only PDF, JPEG and PNG documents are accepted")
+    if upload_data.length > MAX_DOCUMENT_BYTES:
+        raise HTTPException(status_code=413, detail=f"Documents are limited to {MAX_DOCUMENT_BYTES} bytes")
+    
+    now = datetime.now(timezone.utc)
+    upload = {
+        "id": str(uuid.uuid4()),
+        "application_id": app_id,
+        "user_id": user['id'],
+        "filename": upload_data.filename,
+        "content_type": upload_data.content_type,
+        "length": upload_data.length,
+        "offset": 0,
+        "next_n": 0,
+        "pending": b"",
+        "status": "uploading",
+        "created_at": now.isoformat(),
+        "expires_at": now + timedelta(hours=UPLOAD_SESSION_HOURS)
+    }
+    await repos.documents.create_upload(upload)
+    return {"upload_id": upload['id'], "offset": 0, "length": upload['length'], "chunk_size": repos.documents.chunk_size}
+
+async def get_own_upload(upload_id: str, user: dict, repos: Repositories):
+    upload = await repos.documents.get_upload(upload_id)
+    if not upload or upload['user_id'] != user['id']:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload_status(upload_id: str, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    """Current offset of an upload, for resuming after a dropped connection."""
+    upload = await get_own_upload(upload_id, user, repos)
+    return {
+        "upload_id": upload_id,
+        "offset": upload['offset'],
+        "length": upload['length'],
+        "complete": upload['status'] == 'complete',
+        "file_id": upload.get('file_id')
+    }
+
+@api_router.patch("/uploads/{upload_id}")
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    """Stream the next part of a file body, starting at the Upload-Offset header."""
+    upload = await get_own_upload(upload_id, user, repos)
+    if upload['status'] == 'complete':
+        raise HTTPException(status_code=409, detail="Upload already complete")
+    if upload_offset != upload['offset']:
+        raise HTTPException(status_code=409, detail="Upload-Offset does not match", headers={"Upload-Offset": str(upload['offset'])})
+    if transfer_slots.locked():
+        raise HTTPException(status_code=503, detail="Too many uploads in progress", headers={"Retry-After": "5"})
     
-    await db.applications.update_one({"id": app_id}, {"$set": update_dict})
+    writer = uuid.uuid4().hex
+    async with transfer_slots:
+        try:
+            offset = await receive_upload(repos.documents, upload, request.stream(), writer)
+            if offset < upload['length']:
+                return {"upload_id": upload_id, "offset": offset, "complete": False}
+            file = await finalize_upload(repos.documents, upload_id)
+        except UploadTooLarge:
+            raise HTTPException(status_code=413, detail="Body exceeds the declared upload length")
+        except UploadConflict:
+            raise HTTPException(status_code=409, detail="Upload was modified concurrently")
+        finally:
+            await repos.documents.release_upload(upload_id, writer)
     
-    # Create notification for borrower
-    if update_data.status:
-        notif_id = str(uuid.uuid4())
-        status_msg = {
-            "approved": "Your loan application has been approved!",
-            "rejected": "Your loan application has been rejected.",
-            "under_review": "Your loan application is under review.",
-            "disbursed": "Your loan has been disbursed successfully!"
-        }
-        notif = {
-            "id": notif_id,
-            "user_id": app['user_id'],
-            "title": "Application Status Update",
-            "message": status_msg.get(update_data.status, "Your application status has been updated."),
-            "type": "info" if update_data.status != "rejected" else "warning",
-            "read": False,
-            "link": f"/applications/{app_id}",
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.notifications.insert_one(notif)
-    
-    updated_app = await db.applications.find_one({"id": app_id}, {"_id": 0})
-    return updated_app
+    document = {
+        "file_id": file['_id'],
+        "filename": upload['filename'],
+        "content_type": upload['content_type'],
+        "length": upload['length'],
+        "sha256": file['metadata']['sha256'],
+        "uploaded_by": user['id'],
+        "uploaded_at": datetime.now(timezone.utc).isoformat()
+    }
+    await repos.applications.add_document(upload['application_id'], document, document['uploaded_at'])
+    return {"upload_id": upload_id, "offset": offset, "complete": True, "document": document}
+
+@api_router.get("/applications/{app_id}/documents/{file_id}")
+async def download_document(
+    app_id: str,
+    file_id: str,
+    range: Optional[str] = Header(None),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    """Download an application document; supports single-range requests."""
+    app = await find_application(repos, app_id)
+    if not app:
+        raise HTTPException(status_code=404, detail="Application not found")
+    if not can_access(user, app):
+        raise HTTPException(status_code=403, detail="Access denied")
+    document = next((doc for doc in app.get('documents', []) if doc.get('file_id') == file_id), None)
+    file = await repos.documents.get_file(file_id) if document else None
+    if not file:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    length = file['length']
+    start, end, status_code = 0, length, 200
+    headers = {"Accept-Ranges": "bytes", "Content-Disposition": content_disposition(document['filename'])}
+    if range:
+        byte_range = parse_range(range, length)
+        if not byte_range:
+            raise HTTPException(status_code=416, detail="Invalid range", headers={"Content-Range": f"bytes */{length}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{length}"
+    headers["Content-Length"] = str(end - start)
+    
+    async def body():
+        async with transfer_slots:
+            async for piece in repos.documents.read_range(file_id, start, end):
+                yield piece
+    
+    return StreamingResponse(body(), status_code=status_code, media_type=document['content_type'], headers=headers)
+
+# ========== WORK QUEUE ROUTES ==========
+
+@api_router.post("/queue/claim")
+async def claim_applications(
+    limit: int = 1,
+    mfi_id: Optional[str] = None,
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    """Lease up to `limit` submitted applications for review by the calling officer.
+    
+    Officers claim from their own MFI's queue; admins pass the `mfi_id` whose queue to claim from.
+    """
+    mfi_id = officer_mfi(user) or mfi_id
+    if not mfi_id:
+        raise HTTPException(status_code=400, detail="mfi_id is required")
+    if limit < 1 or limit > MAX_QUEUE_CLAIM:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_QUEUE_CLAIM}")
+    
+    now = datetime.now(timezone.utc)
+    lease_expires_at = (now + timedelta(minutes=QUEUE_LEASE_MINUTES)).isoformat()
+    claimed = []
+    for _ in range(limit):
+        app = await repos.applications.claim_next(user['id'], now.isoformat(), lease_expires_at, mfi_id)
+        if not app:
+            break
+        claimed.append(app)
+    return claimed
+
+@api_router.post("/queue/{app_id}/release")
+async def release_application(app_id: str, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    """Return a claimed application to the queue before its lease expires."""
+    if user['role'] not in ['officer', 'admin']:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    app = await repos.applications.release_claim(app_id, user['id'], datetime.now(timezone.utc).isoformat())
+    if not app:
+        raise HTTPException(status_code=404, detail="No claim on this application")
+    return app
 
 # ========== NOTIFICATION ROUTES ==========
 
 @api_router.get("/notifications")
-async def get_notifications(user: dict = Depends(get_auth_user)):
-    notifications = await db.notifications.find(
-        {"user_id": user['id']},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(50).to_list(50)
-    return notifications
+async def get_notifications(
+    request: Request,
+    fields: Optional[List[str]] = Depends(sparse_fields(Notification, NOTIFICATION_SUMMARY_FIELDS)),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    notifications = await repos.notifications.list_for_user(user['id'], 50, fields)
+    return negotiated_response(request, notifications)
 
 @api_router.patch("/notifications/{notif_id}/read")
-async def mark_notification_read(notif_id: str, user: dict = Depends(get_auth_user)):
-    await db.notifications.update_one(
-        {"id": notif_id, "user_id": user['id']},
-        {"$set": {"read": True}}
-    )
+async def mark_notification_read(notif_id: str, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    await repos.notifications.mark_read(notif_id, user['id'], datetime.now(timezone.utc).isoformat())
     return {"message": "Notification marked as read"}
 
+# ========== SYNC ROUTES ==========
+
+@api_router.get("/sync")
+async def delta_sync(since: Optional[str] = None, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    """Applications and notifications changed or deleted after the `since` watermark.
+    
+    Pass the returned watermark as `since` on the next call; while `has_more`
+    is true, call again straight away.
+    """
+    after = parse_watermark(since or "")
+    if since and watermark_expired(after):
+        raise HTTPException(status_code=410, detail="Watermark too old; reload applications and notifications")
+    
+    # Same visibility as get_applications: borrowers only see their own, officers their MFI's
+    app_owner = user['id'] if user['role'] == 'borrower' else None
+    app_mfi = officer_mfi(user) if user['role'] != 'borrower' else None
+    applications = await repos.applications.list_updated_since(after, app_owner, SYNC_PAGE_SIZE, app_mfi)
+    notifications = await repos.notifications.list_updated_since(user['id'], after, SYNC_PAGE_SIZE)
+    deleted_applications = await repos.tombstones.list_since("applications", after, app_owner, SYNC_PAGE_SIZE, app_mfi)
+    deleted_notifications = await repos.tombstones.list_since("notifications", after, user['id'], SYNC_PAGE_SIZE)
+    
+    watermark, has_more = next_watermark(after, [
+        ("updated_at", applications, len(applications) == SYNC_PAGE_SIZE),
+        ("updated_at", notifications, len(notifications) == SYNC_PAGE_SIZE),
+        ("deleted_at", deleted_applications, len(deleted_applications) == SYNC_PAGE_SIZE),
+        ("deleted_at", deleted_notifications, len(deleted_notifications) == SYNC_PAGE_SIZE)
+    ])
+    return {
+        "applications": applications,
+        "notifications": notifications,
+        "deleted": {
+            "applications": [entry['id'] for entry in deleted_applications],
+            "notifications": [entry['id'] for entry in deleted_notifications]
+        },
+        "watermark": format_watermark(watermark),
+        "has_more": has_more
+    }
+
+@api_router.post("/sync/ops")
+async def replay_operations(
+    batch: SyncBatch,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_repos)
+):
+    """Apply operations a client queued while offline, in order, with one result per op.
+    
+    A failed op doesn't stop the batch. Status updates only apply if the
+    application's updated_at still equals the op's base_updated_at, so an
+    offline edit never overwrites a newer change; otherwise the op gets a 409
+    with the current application. Send an Idempotency-Key so a batch retried
+    after a dropped connection isn't applied twice.
+    """
+    return await run_idempotent(
+        idempotency_key, batch.model_dump(), response, user, repos,
+        lambda: apply_operations(batch.ops, user, repos)
+    )
+
+async def apply_operations(ops: List[SyncOperation], user: dict, repos: Repositories):
+    current_time = datetime.now(timezone.utc).isoformat()
+    results = []
+    # Creates and notification reads don't depend on earlier ops in the batch,
+    # so they are collected and written in bulk once all ops are checked
+    new_apps, new_events, new_notifs, read_ids = [], [], [], []
+    # application id -> (base_updated_at the client sent, updated_at after our write),
+    # so a client's second offline edit of the same application chains onto its first
+    rebased = {}
+    
+    for op in ops:
+        result = {"op_id": op.op_id}
+        try:
+            if op.type == "create_application":
+                app_dict, event, notif = new_application(ApplicationCreate.model_validate(op.data), user, current_time)
+                new_apps.append(app_dict)
+                new_events.append(event)
+                new_notifs.append(notif)
+                result.update(status_code=201, application=submitted_summary(app_dict))
+            
+            elif op.type == "update_application":
+                if not op.target_id or not op.base_updated_at:
+                    raise HTTPException(status_code=422, detail="target_id and base_updated_at are required")
+                update_data = ApplicationUpdate.model_validate(op.data)
+                expected = op.base_updated_at
+                if op.target_id in rebased and rebased[op.target_id][0] == expected:
+                    expected = rebased[op.target_id][1]
+                
+                app = await repos.applications.get(op.target_id)
+                update_dict, event = prepare_update(app, update_data, user, current_time)
+                updated_app = None
+                if app['updated_at'] == expected:
+                    updated_app = await repos.applications.update(
+                        op.target_id, update_dict, event=event, expected_updated_at=expected
+                    )
+                if not updated_app:
+                    result.update(
+                        status_code=409,
+                        detail="Application changed since base_updated_at",
+                        current=await repos.applications.get(op.target_id)
+                    )
+                else:
+                    rebased[op.target_id] = (op.base_updated_at, updated_app['updated_at'])
+                    if update_data.status:
+                        new_notifs.append(status_notification(app, update_data.status, current_time))
+                    result.update(status_code=200, application=updated_app)
+            
+            else:
+                if not op.target_id:
+                    raise HTTPException(status_code=422, detail="target_id is required")
+                read_ids.append(op.target_id)
+                result.update(status_code=200)
+        except ValidationError as e:
+            result.update(status_code=422, detail=jsonable_encoder(e.errors(include_url=False)))
+        except HTTPException as e:
+            result.update(status_code=e.status_code, detail=e.detail)
+        results.append(result)
+    
+    await repos.applications.create_many(new_apps, new_events)
+    await repos.notifications.create_many(new_notifs)
+    await repos.notifications.mark_read_many(read_ids, user['id'], current_time)
+    return {"results": results}
+
 # ========== ANALYTICS ROUTES ==========
 
+def analytics_scope(user: dict):
+    """Coalescing key part: officers' analytics only cover their own MFI."""
+    return user['role'], user.get('mfi_id') if user['role'] == 'officer' else None
+
 @api_router.get("/analytics/stats")
-async def get_analytics_stats(user: dict = Depends(get_auth_user)):
-    if user['role'] not in ['officer', 'admin']:
-        raise HTTPException(status_code=403, detail="Access denied")
+@coalesce(key=lambda user, **_: analytics_scope(user), stale_seconds=ANALYTICS_STALE_SECONDS)
+async def get_analytics_stats(user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_analytics_repos)):
+    mfi_id = officer_mfi(user)
     
-    # Get various statistics
-    total_applications = await db.applications.count_documents({})
-    approved = await db.applications.count_documents({"status": "approved"})
-    rejected = await db.applications.count_documents({"status": "rejected"})
-    pending = await db.applications.count_documents({"status": {"$in": ["submitted", "under_review"]}})
+    # Get various statistics, including closed applications moved to the archive
+    archived = (await repos.application_archive.totals(mfi_id))["statuses"]
+    archived_count = lambda statuses: sum(archived.get(status, {}).get("count", 0) for status in statuses)
+    total_applications = await repos.applications.count(mfi_id=mfi_id) + archived_count(archived)
+    approved = await repos.applications.count(["approved"], mfi_id) + archived_count(["approved"])
+    rejected = await repos.applications.count(["rejected"], mfi_id) + archived_count(["rejected"])
+    pending = await repos.applications.count(["submitted", "under_review"], mfi_id)
     
     # Get total loan amount
-    pipeline = [
-        {"$match": {"status": "approved"}},
-        {"$group": {"_id": None, "total": {"$sum": "$loan_amount"}}}
-    ]
-    total_amount_result = await db.applications.aggregate(pipeline).to_list(1)
-    total_loan_amount = total_amount_result[0]['total'] if total_amount_result else 0
+    total_loan_amount = await repos.applications.total_loan_amount("approved", mfi_id)
     
     return {
         "total_applications": total_applications,
@@ -409,33 +1235,257 @@ async def get_analytics_stats(user: dict = Depends(get_auth_user)):
     }
 
 @api_router.get("/analytics/trends")
-async def get_trends(user: dict = Depends(get_auth_user)):
+@coalesce(key=lambda user, **_: analytics_scope(user), stale_seconds=ANALYTICS_STALE_SECONDS)
+async def get_trends(user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_analytics_repos)):
     """Get application trends over time."""
+    mfi_id = officer_mfi(user)
+    
+    # Aggregate by month, adding in archived applications
+    months = {}
+    for row in await repos.applications.monthly_trends(12, mfi_id):
+        months[(row['_id']['year'], row['_id']['month'])] = {"count": row['count'], "total_amount": row['total_amount']}
+    for month, totals in (await repos.application_archive.totals(mfi_id))["months"].items():
+        bucket = months.setdefault(month, {"count": 0, "total_amount": 0})
+        bucket['count'] += totals['count']
+        bucket['total_amount'] += totals['total_amount']
+    return [
+        {"_id": {"year": year, "month": month}, **totals}
+        for (year, month), totals in sorted(months.items())[:12]
+    ]
+
+@api_router.get("/analytics/report")
+async def get_portfolio_report(user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_analytics_repos)):
+    """Portfolio statistics and monthly trends as a PDF."""
+    officer_mfi(user)
+    
+    stats = await get_analytics_stats(user=user, repos=repos)
+    trends = await get_trends(user=user, repos=repos)
+    generated_at = datetime.now(timezone.utc).isoformat()
+    pdf = await renderer.render("render_portfolio_pdf", stats, trends, generated_at)
+    return Response(pdf, media_type="application/pdf", headers={
+        "Content-Disposition": f'inline; filename="portfolio-{generated_at[:10]}.pdf"'
+    })
+
+@api_router.get("/analytics/events")
+async def get_application_events(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_analytics_repos)
+):
+    """Application status transitions in a time range, oldest first."""
+    mfi_id = officer_mfi(user)
+    
+    since, until = event_window(since, until)
+    return await repos.application_events.list_range(since, until, min(limit, 1000), mfi_id)
+
+@api_router.get("/analytics/time-to-decision")
+@coalesce(key=lambda user, since, until, **_: (analytics_scope(user), since, until), stale_seconds=ANALYTICS_STALE_SECONDS)
+async def get_time_to_decision(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    user: dict = Depends(get_auth_user),
+    repos: Repositories = Depends(get_analytics_repos)
+):
+    """Hours from submission to approval/rejection per MFI, for decisions made in the window."""
+    mfi_id = officer_mfi(user)
+    
+    since, until = event_window(since, until)
+    events = repos.application_events.stream(since, until, DECISION_STATUSES, mfi_id)
+    return await time_to_decision_by_mfi(events)
+
+# ========== GROUP LENDING ROUTES ==========
+
+@api_router.post("/centers", status_code=201)
+async def create_center(center_data: CenterCreate, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    if officer_mfi(user) not in (None, center_data.mfi_id):
+        raise HTTPException(status_code=403, detail="Officers can only create centers for their own MFI")
+    if not await repos.mfis.get(center_data.mfi_id):
+        raise HTTPException(status_code=404, detail="MFI not found")
+    
+    center = center_data.model_dump()
+    center['id'] = str(uuid.uuid4())
+    center['officer_id'] = center_data.officer_id or user['id']
+    center['created_at'] = datetime.now(timezone.utc).isoformat()
+    await repos.centers.create_center(center)
+    return center
+
+@api_router.get("/centers")
+async def get_centers(mfi_id: Optional[str] = None, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    return await repos.centers.list_centers(officer_mfi(user) or mfi_id, 500)
+
+@api_router.get("/centers/{center_id}/groups")
+async def get_center_groups(center_id: str, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    mfi_id = officer_mfi(user)
+    center = await repos.centers.get_center(center_id)
+    if not center or mfi_id not in (None, center['mfi_id']):
+        raise HTTPException(status_code=404, detail="Center not found")
+    return await repos.centers.list_groups(center_id)
+
+@api_router.post("/centers/{center_id}/groups", status_code=201)
+async def create_group(center_id: str, group_data: GroupCreate, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    """Form a borrower group; each borrower can be in one group per MFI."""
+    mfi_id = officer_mfi(user)
+    center = await repos.centers.get_center(center_id)
+    if not center or mfi_id not in (None, center['mfi_id']):
+        raise HTTPException(status_code=404, detail="Center not found")
+    
+    members = []
+    for member_id in dict.fromkeys(group_data.member_ids):
+        member = await repos.users.get(member_id)
+        if not member or member['role'] != 'borrower':
+            raise HTTPException(status_code=404, detail=f"Borrower {member_id} not found")
+        if await repos.centers.find_group_for_member(member_id, center['mfi_id']):
+            raise HTTPException(status_code=409, detail=f"Borrower {member_id} is already in a group at this MFI")
+        # Names are copied so collection sheets don't need a user lookup per loan
+        members.append({"user_id": member_id, "name": member['name']})
+    
+    group = {
+        "id": str(uuid.uuid4()),
+        "center_id": center_id,
+        "mfi_id": center['mfi_id'],
+        "name": group_data.name,
+        "members": members,
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await repos.centers.create_group(group)
+    return group
+
+# ========== JOB ROUTES ==========
+
+@api_router.get("/jobs")
+async def get_jobs(request: Request, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    """Scheduled, running and recent background jobs."""
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    scheduler = request.app.state.scheduler
+    return {
+        "worker_id": scheduler.worker_id,
+        "running_here": list(scheduler.running),
+        "jobs": await repos.jobs.list(100)
+    }
+
+@api_router.post("/jobs/exports", status_code=202)
+async def create_export(
+    request: Request,
+    export: ApplicationExportCreate,
+    user: dict = Depends(get_auth_user)
+):
+    """Export applications to a gzipped NDJSON file in the background."""
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return await request.app.state.scheduler.enqueue("export_applications", export.model_dump(), created_by=user['id'])
+
+@api_router.post("/jobs/collection-sheets", status_code=202)
+async def create_collection_sheets(
+    request: Request,
+    sheets: CollectionSheetsCreate,
+    user: dict = Depends(get_auth_user)
+):
+    """Generate a week's collection sheets (a zip of one CSV per center) in the background."""
+    payload = sheets.model_dump(mode="json")
+    # Officers only get their own MFI's centers
+    payload['mfi_id'] = officer_mfi(user) or payload['mfi_id']
+    return await request.app.state.scheduler.enqueue("collection_sheets", payload, created_by=user['id'])
+
+def can_access_job(user: dict, job: dict) -> bool:
+    """Officers only see the jobs whose files they may download, and only for their own MFI."""
+    if user['role'] == 'admin':
+        return True
+    roles = DOWNLOADABLE_JOBS.get(job['name'], ("", []))[1]
+    return user['role'] in roles and (job.get('payload') or {}).get('mfi_id') == officer_mfi(user)
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
     if user['role'] not in ['officer', 'admin']:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Aggregate by month
-    pipeline = [
-        {
-            "$group": {
-                "_id": {
-                    "year": {"$year": {"$toDate": "$created_at"}},
-                    "month": {"$month": {"$toDate": "$created_at"}}
-                },
-                "count": {"$sum": 1},
-                "total_amount": {"$sum": "$loan_amount"}
-            }
-        },
-        {"$sort": {"_id.year": 1, "_id.month": 1}},
-        {"$limit": 12}
-    ]
+    job = await repos.jobs.get(job_id)
+    if not job or not can_access_job(user, job):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@api_router.get("/jobs/{job_id}/download")
+async def download_export(job_id: str, user: dict = Depends(get_auth_user), repos: Repositories = Depends(get_repos)):
+    if user['role'] not in ['officer', 'admin']:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    job = await repos.jobs.get(job_id)
+    if not job or job['name'] not in DOWNLOADABLE_JOBS:
+        raise HTTPException(status_code=404, detail="Export not found")
+    media_type, _ = DOWNLOADABLE_JOBS[job['name']]
+    if not can_access_job(user, job):
+        raise HTTPException(status_code=403, detail="Access denied")
+    if job['status'] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Export is {job['status']}")
+    path = EXPORT_DIR / job['result']['file']
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Export has expired; run it again")
+    return FileResponse(path, media_type=media_type, filename=job['result']['file'])
+
+# ========== METRICS ROUTES ==========
+
+@api_router.get("/metrics/coalescing")
+async def get_coalescing_metrics(user: dict = Depends(get_auth_user)):
+    """Executed, coalesced and cached calls per coalesced handler in this worker."""
+    if user['role'] not in ['officer', 'admin']:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return coalescing_stats()
+
+@api_router.get("/metrics/admission")
+async def get_admission_metrics(user: dict = Depends(get_auth_user)):
+    """Rate limiting and load shedding counts and load signals for this worker."""
+    if user['role'] not in ['officer', 'admin']:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return admission.metrics()
+
+@api_router.get("/metrics/loop-stalls")
+async def get_loop_stalls(user: dict = Depends(get_auth_user)):
+    """Times the event loop was blocked past LOOP_STALL_MS in this worker, with the blocking stack."""
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Access denied")
+    return watchdog.metrics()
+
+@api_router.post("/metrics/profile")
+async def profile_worker(seconds: float = 10, interval_ms: float = PROFILE_INTERVAL_MS, user: dict = Depends(get_auth_user)):
+    """Sample this worker's threads for `seconds` and return collapsed stacks for a flame graph."""
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    trends = await db.applications.aggregate(pipeline).to_list(12)
-    return trends
+    seconds = min(max(seconds, 1), MAX_PROFILE_SECONDS)
+    interval_ms = max(interval_ms, MIN_PROFILE_INTERVAL_MS)
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    try:
+        stacks = await asyncio.to_thread(profiler.profile, seconds, interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(stacks)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+async def rate_limit_key(scope) -> str:
+    """Requests with a valid bearer token are limited by user id, everyone else by IP address.
+
+    Runs before any limiting, so it mustn't touch the database: a JWT is
+    checked by its signature, but a session cookie could only be checked by
+    looking it up, so cookie-only requests count against their IP address.
+    """
+    request = Request(scope)
+    authorization = request.headers.get('authorization', '')
+    if authorization.startswith('Bearer '):
+        payload = decode_token(authorization.split(' ')[1])
+        if payload and payload.get('user_id'):
+            return f"user:{payload['user_id']}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+# Added before CORS so rejections still carry CORS headers
+app.add_middleware(AdmissionMiddleware, controller=admission, client_key=rate_limit_key)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -450,7 +1500,3 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
@@ -0,0 +1,143 @@
+"""
+Shard the API's collections by tenant on a sharded cluster.
+
+`applications` is sharded on (mfi_id, id): each MFI's applications form one
+contiguous key range, so officer lists, the review queue and analytics,
+which always filter on mfi_id, are routed to the shards owning that range.
+`notifications` is sharded on a hash of user_id, since it's only ever read
+per user. With --pin-mfis, every MFI's range is also assigned to a zone on
+one shard (round robin), so each tenant's queries go to exactly one shard
+even after the balancer runs.
+
+--verify explains one query of each kind per sampled MFI (and user) and
+reports how many shards it would touch; anything but 1 fails the run.
+
+Run it against mongos (MONGO_URL, DB_NAME), e.g. on a local cluster from
+mtools:
+
+    mlaunch init --sharded 2 --replicaset --nodes 1 --port 27100
+    MONGO_URL=mongodb://localhost:27100 python init_sample_data.py
+    MONGO_URL=mongodb://localhost:27100 python shard_collections.py --pin-mfis --verify
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from bson.max_key import MaxKey
+from bson.min_key import MinKey
+from dotenv import load_dotenv
+
+from repositories.mongo import MongoRepositories, SHARD_KEYS
+from utils.database import create_client
+
+
+async def shard_collections(client, db):
+    admin = client.admin
+    await admin.command("enableSharding", db.name)
+    for collection, key in SHARD_KEYS.items():
+        existing = await client.config.collections.find_one({"_id": f"{db.name}.{collection}"})
+        if existing and existing.get("key"):
+            print(f"{collection} is already sharded on {existing['key']}")
+            continue
+        # shardCollection needs an index on the key unless the collection is empty
+        await db[collection].create_index(list(key.items()))
+        await admin.command("shardCollection", f"{db.name}.{collection}", key=key)
+        print(f"Sharded {collection} on {key}")
+
+
+async def pin_mfis(client, db):
+    """Assign each MFI's application range to a zone on one shard, round robin."""
+    admin = client.admin
+    shards = [shard['_id'] for shard in (await admin.command("listShards"))['shards']]
+    mfi_ids = sorted(await db.applications.distinct("mfi_id") + await db.mfis.distinct("id"))
+    for shard in shards:
+        await admin.command("addShardToZone", shard, zone=f"zone-{shard}")
+    for i, mfi_id in enumerate(dict.fromkeys(mfi_ids)):
+        shard = shards[i % len(shards)]
+        await admin.command(
+            "updateZoneKeyRange", f"{db.name}.applications",
+            min={"mfi_id": mfi_id, "id": MinKey()}, max={"mfi_id": mfi_id, "id": MaxKey()}, zone=f"zone-{shard}"
+        )
+    print(f"Pinned {len(set(mfi_ids))} MFIs to {len(shards)} shards; the balancer moves their chunks")
+
+
+def shards_touched(explain):
+    """Names of the shards an explained command was sent to."""
+    planner = explain.get("queryPlanner", {})
+    if "winningPlan" in planner:
+        return [shard['shardName'] for shard in planner['winningPlan'].get('shards', [])]
+    return list(explain.get("shards", {}))
+
+
+async def verify(db, samples):
+    """Explain each kind of tenant query and check it is routed to one shard."""
+    mfi_ids = (await db.applications.distinct("mfi_id"))[:samples]
+    user_ids = (await db.notifications.distinct("user_id"))[:samples]
+    if not mfi_ids:
+        sys.exit("No applications to verify against; load some data first")
+
+    checks = []
+    for mfi_id in mfi_ids:
+        checks += [
+            ("officer list", mfi_id, {"find": "applications", "filter": {"mfi_id": mfi_id}, "sort": {"created_at": -1}, "limit": 100}),
+            ("review queue claim", mfi_id, {
+                "findAndModify": "applications",
+                "query": {"mfi_id": mfi_id, "status": "submitted", "lease_expires_at": {"$not": {"$gt": ""}}},
+                "sort": {"priority": -1, "created_at": 1},
+                "update": {"$set": {"claimed_by": "verify"}}
+            }),
+            ("status counts", mfi_id, {"aggregate": "applications", "pipeline": [
+                {"$match": {"mfi_id": mfi_id}}, {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+            ], "cursor": {}}),
+            ("delta sync", mfi_id, {"find": "applications", "filter": {"mfi_id": mfi_id, "updated_at": {"$gt": ""}}, "sort": {"updated_at": 1}}),
+        ]
+        app = await db.applications.find_one({"mfi_id": mfi_id}, {"id": 1})
+        checks.append(("update by id", mfi_id, {
+            "update": "applications",
+            "updates": [{"q": {"mfi_id": mfi_id, "id": app['id']}, "u": {"$set": {"verify": True}}}]
+        }))
+    for user_id in user_ids:
+        checks.append(("notifications", user_id, {"find": "notifications", "filter": {"user_id": user_id}, "sort": {"created_at": -1}, "limit": 50}))
+
+    failed = 0
+    print(f"{'query':<20} {'tenant':<38} shards")
+    for label, tenant, command in checks:
+        # Explaining a write doesn't perform it
+        shards = shards_touched(await db.command("explain", command, verbosity="queryPlanner"))
+        failed += len(shards) != 1
+        print(f"{label:<20} {tenant:<38} {', '.join(shards)}{'' if len(shards) == 1 else '  <- not targeted'}")
+    if failed:
+        sys.exit(f"{failed} of {len(checks)} queries were not routed to a single shard")
+    print(f"All {len(checks)} queries were routed to a single shard")
+
+
+async def run(args):
+    client = create_client()
+    db = client[os.environ['DB_NAME']]
+    try:
+        hello = await db.command("hello")
+        if hello.get("msg") != "isdbgrid":
+            sys.exit("MONGO_URL must point at mongos")
+        # Create the other indexes first, including the mfi_id-led ones
+        await MongoRepositories(client, db).ensure_indexes()
+        await shard_collections(client, db)
+        if args.pin_mfis:
+            await pin_mfis(client, db)
+        if args.verify:
+            await verify(db, args.samples)
+    finally:
+        client.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shard applications and notifications by tenant.")
+    parser.add_argument("--pin-mfis", action="store_true", help="keep each MFI's applications on one shard with zones")
+    parser.add_argument("--verify", action="store_true", help="check tenant queries are routed to one shard")
+    parser.add_argument("--samples", type=int, default=5, help="MFIs and users to verify")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
+    asyncio.run(run(parse_args()))
@@ -0,0 +1,188 @@
+"""
+Admission control: per-client rate limiting and load shedding.
+
+Each client (a user id from a bearer token, otherwise the IP address) has a
+token bucket refilled at RATE_LIMIT_PER_MINUTE; a request takes as many
+tokens as its route costs, so expensive routes (bcrypt logins, analytics
+aggregations) run out sooner than cheap reads. A client out of tokens gets
+429 with Retry-After.
+
+Requests beyond MAX_IN_FLIGHT running at once are shed immediately with
+503 rather than queued. A monitor measures event-loop lag and database ping
+latency; while either is over its threshold, the cap drops to a quarter so
+the work already running can drain. Limits are per worker process.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+
+RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', 120))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 60))
+MAX_IN_FLIGHT = int(os.environ.get('MAX_IN_FLIGHT', 256))
+LOOP_LAG_SHED_MS = float(os.environ.get('LOOP_LAG_SHED_MS', 200))
+DB_LATENCY_SHED_MS = float(os.environ.get('DB_LATENCY_SHED_MS', 500))
+MONITOR_INTERVAL_SECONDS = 0.5
+MAX_TRACKED_CLIENTS = 10000
+
+# (method, path prefix, tokens); the first match wins, anything else costs 1
+ROUTE_COSTS = [
+    ("POST", "/api/auth/login", 10),
+    ("POST", "/api/auth/register", 10),
+    ("POST", "/api/auth/session", 5),
+    ("GET", "/api/analytics/", 5),
+    ("POST", "/api/sync/ops", 5),
+    ("POST", "/api/jobs/exports", 10),
+    ("POST", "/api/reports/", 10),
+]
+# Never limited, so load balancers and CORS preflights keep working under load
+EXEMPT_PATHS = {"/api/health", "/api/ready"}
+
+logger = logging.getLogger(__name__)
+
+def route_cost(method, path):
+    for route_method, prefix, cost in ROUTE_COSTS:
+        if method == route_method and path.startswith(prefix):
+            return cost
+    return 1
+
+class TokenBucketLimiter:
+    def __init__(self, per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST, max_clients=MAX_TRACKED_CLIENTS):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = {}  # client -> (tokens, monotonic time of last update)
+
+    def take(self, client, cost=1) -> float:
+        """Take `cost` tokens from the client's bucket; returns 0, or seconds to wait if it's short."""
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            self.buckets[client] = (tokens, now)
+            return (cost - tokens) / self.rate
+        if client not in self.buckets and len(self.buckets) >= self.max_clients:
+            self._prune(now)
+        self.buckets[client] = (tokens - cost, now)
+        return 0
+
+    def _prune(self, now):
+        # A bucket that has refilled is the same as no bucket
+        self.buckets = {
+            client: (tokens, updated) for client, (tokens, updated) in self.buckets.items()
+            if tokens + (now - updated) * self.rate < self.burst
+        }
+        while len(self.buckets) >= self.max_clients:
+            self.buckets.pop(next(iter(self.buckets)))
+
+
+class AdmissionController:
+    def __init__(self, limiter=None, max_in_flight=MAX_IN_FLIGHT):
+        self.limiter = limiter or TokenBucketLimiter()
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.loop_lag_ms = 0.0
+        self.db_latency_ms = 0.0
+        self.stats = {"admitted": 0, "throttled": 0, "shed_concurrency": 0, "shed_overload": 0}
+        self.task = None
+
+    @property
+    def overloaded(self) -> bool:
+        return self.loop_lag_ms > LOOP_LAG_SHED_MS or self.db_latency_ms > DB_LATENCY_SHED_MS
+
+    def admit(self, client, cost):
+        """None if the request may run, else (status code, detail, retry after seconds)."""
+        # Shed before rate limiting, so a request we turn away doesn't cost the client tokens
+        overloaded = self.overloaded
+        if self.in_flight >= (self.max_in_flight // 4 if overloaded else self.max_in_flight):
+            self.stats["shed_overload" if overloaded else "shed_concurrency"] += 1
+            return 503, "Server busy, try again shortly", 1
+        retry_after = self.limiter.take(client, cost)
+        if retry_after:
+            self.stats["throttled"] += 1
+            return 429, "Too many requests", retry_after
+        self.stats["admitted"] += 1
+        return None
+
+    def metrics(self):
+        return {
+            **self.stats,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "overloaded": self.overloaded,
+            "loop_lag_ms": round(self.loop_lag_ms, 1),
+            "db_latency_ms": round(self.db_latency_ms, 1),
+            "tracked_clients": len(self.limiter.buckets)
+        }
+
+    async def start(self, ping):
+        """Start monitoring loop lag and `await ping()` latency."""
+        self.task = asyncio.create_task(self._monitor(ping))
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def _monitor(self, ping):
+        loop = asyncio.get_running_loop()
+        timeout = 2 * DB_LATENCY_SHED_MS / 1000
+        while True:
+            started = loop.time()
+            await asyncio.sleep(MONITOR_INTERVAL_SECONDS)
+            self.loop_lag_ms = max(0.0, (loop.time() - started - MONITOR_INTERVAL_SECONDS) * 1000)
+
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(ping(), timeout)
+                latency_ms = (time.perf_counter() - started) * 1000
+            except asyncio.TimeoutError:
+                latency_ms = timeout * 1000
+            except Exception:
+                logger.exception("Database ping failed")
+                latency_ms = timeout * 1000
+            # Smoothed, so one slow ping doesn't start shedding
+            self.db_latency_ms = 0.7 * self.db_latency_ms + 0.3 * latency_ms
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to HTTP requests.
+
+    `client_key(scope)` is awaited for the key a request is limited under.
+    """
+
+    def __init__(self, app, controller, client_key):
+        self.app = app
+        self.controller = controller
+        self.client_key = client_key
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = self.controller.admit(await self.client_key(scope), route_cost(scope["method"], scope["path"]))
+        if rejection:
+            status_code, detail, retry_after = rejection
+            await send({
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(math.ceil(retry_after)).encode())
+                ]
+            })
+            await send({"type": "http.response.body", "body": json.dumps({"detail": detail}).encode()})
+            return
+
+        self.controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.in_flight -= 1
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone, timedelta
+
+DECISION_STATUSES = ["approved", "rejected"]
+DEFAULT_EVENT_WINDOW_DAYS = 90
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def event_window(since: datetime = None, until: datetime = None):
+    """ISO string bounds for event log queries, matching how timestamps are stored.
+
+    Defaults to the last DEFAULT_EVENT_WINDOW_DAYS days.
+    """
+    until = _as_utc(until) if until else datetime.now(timezone.utc)
+    since = _as_utc(since) if since else until - timedelta(days=DEFAULT_EVENT_WINDOW_DAYS)
+    return since.isoformat(), until.isoformat()
+
+def _percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def time_to_decision_by_mfi(events):
+    """Summarize hours from submission to first decision per MFI.
+
+    `events` is an async iterator of decision events from the application
+    event log; each carries the application's submission time, so no lookup
+    into `applications` is needed.
+    """
+    seen = set()
+    hours_by_mfi = {}
+    counts_by_mfi = {}
+    async for event in events:
+        if event['application_id'] in seen:
+            continue
+        seen.add(event['application_id'])
+        decided = datetime.fromisoformat(event['created_at'])
+        submitted = datetime.fromisoformat(event['application_created_at'])
+        hours_by_mfi.setdefault(event['mfi_id'], []).append((decided - submitted).total_seconds() / 3600)
+        counts = counts_by_mfi.setdefault(event['mfi_id'], {status: 0 for status in DECISION_STATUSES})
+        counts[event['to_status']] += 1
+
+    summary = []
+    for mfi_id, hours in hours_by_mfi.items():
+        hours.sort()
+        summary.append({
+            "mfi_id": mfi_id,
+            "decisions": len(hours),
+            **counts_by_mfi[mfi_id],
+            "avg_hours": round(sum(hours) / len(hours), 2),
+            "p50_hours": round(_percentile(hours, 0.5), 2),
+            "p90_hours": round(_percentile(hours, 0.9), 2)
+        })
+    summary.sort(key=lambda row: row['decisions'], reverse=True)
+    return summary
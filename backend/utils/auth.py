@@ -2,7 +2,7 @@ from datetime import datetime, timezone, timedelta
 from passlib.hash import bcrypt
 from jose import jwt
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+import uuid
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 ALGORITHM = "HS256"
@@ -17,13 +17,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
-    """Create JWT access token."""
+    """Create JWT access token, with a random `jti` so it can be revoked."""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -35,25 +35,30 @@ def decode_token(token: str):
     except:
         return None
 
-async def get_current_user(db, token: str = None, session_token: str = None):
+async def revoke_token(repos, token: str):
+    """Revoke a JWT until it expires; invalid tokens are ignored."""
+    payload = decode_token(token)
+    if payload and payload.get('jti'):
+        await repos.revoked_tokens.add(payload['jti'], datetime.fromtimestamp(payload['exp'], timezone.utc))
+
+async def get_current_user(repos, token: str = None, session_token: str = None):
     """Get current user from JWT token or Emergent session token."""
     # Try Emergent session first
     if session_token:
-        session = await db.user_sessions.find_one({"session_token": session_token})
+        session = await repos.sessions.get_by_token(session_token)
         if session and session.get('expires_at') > datetime.now(timezone.utc):
-            user = await db.users.find_one({"id": session['user_id']})
+            user = await repos.users.get(session['user_id'])
             if user:
-                user['_id'] = str(user['_id'])
                 return user
     
     # Try JWT token
     if token:
         payload = decode_token(token)
-        if payload:
+        # Tokens issued before revocation existed have no jti; they expire on their own
+        if payload and not (payload.get('jti') and await repos.revoked_tokens.is_revoked(payload['jti'])):
             user_id = payload.get('user_id')
-            user = await db.users.find_one({"id": user_id})
+            user = await repos.users.get(user_id)
             if user:
-                user['_id'] = str(user['_id'])
                 return user
     
     return None
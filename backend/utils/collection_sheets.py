@@ -0,0 +1,112 @@
+"""
+Weekly collection sheets for group-lending centers.
+
+Each center's groups meet once a week, and the loan officer collects every
+member's instalment at the meeting. A sheet lists, per member loan, the
+instalment expected that week and the balance outstanding before it, with
+blank columns for what was actually collected.
+
+Loans are repaid in equal weekly instalments with flat interest, as is usual
+for Grameen-style lending: the total due is the principal plus the MFI's
+annual rate on the full principal for the loan's tenure, and the first
+instalment falls at the first meeting at least a week after disbursement.
+
+Active loans are streamed from the repositories center by center, so
+memory stays bounded by the largest center rather than the whole portfolio;
+each center's sheet is a CSV file in one zip per run.
+"""
+import asyncio
+import csv
+import io
+import zipfile
+from datetime import date, datetime, timedelta
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+WEEKS_PER_MONTH = 52 / 12
+
+SHEET_COLUMNS = [
+    "group", "borrower", "application_id", "loan_amount", "disbursed_on",
+    "instalment", "of", "expected_instalment", "outstanding_before", "collected", "signature"
+]
+
+def weekly_schedule(loan_amount, tenure_months, annual_rate):
+    """(number of weekly instalments, total repayable, regular instalment)."""
+    weeks = max(1, round(tenure_months * WEEKS_PER_MONTH))
+    total = round(loan_amount * (1 + annual_rate / 100 * tenure_months / 12), 2)
+    return weeks, total, round(total / weeks, 2)
+
+def instalment_due(loan, annual_rate, meeting_date):
+    """The sheet row values for a loan at a meeting, or None if nothing is due that week."""
+    disbursed_on = datetime.fromisoformat(loan['disbursed_at']).date()
+    number = (meeting_date - disbursed_on).days // 7
+    weeks, total, instalment = weekly_schedule(loan['loan_amount'], loan['tenure_months'], annual_rate)
+    if number < 1 or number > weeks:
+        return None
+    outstanding = round(total - instalment * (number - 1), 2)
+    # The last instalment takes whatever rounding left over
+    return {
+        "disbursed_on": disbursed_on.isoformat(),
+        "instalment": number,
+        "of": weeks,
+        "expected_instalment": instalment if number < weeks else outstanding,
+        "outstanding_before": outstanding
+    }
+
+def meeting_date(center, week_of):
+    monday = week_of - timedelta(days=week_of.weekday())
+    return monday + timedelta(days=WEEKDAYS.index(center['meeting_day']))
+
+def render_sheet(center, meeting_on, rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["center", center['name'], "village", center.get('village') or "", "meeting", meeting_on.isoformat(), center.get('meeting_time') or ""])
+    writer.writerow(SHEET_COLUMNS)
+    for row in rows:
+        writer.writerow([row.get(column, "") for column in SHEET_COLUMNS])
+    writer.writerow(["total", "", "", "", "", "", "", round(sum(row['expected_instalment'] for row in rows), 2)])
+    return out.getvalue()
+
+def _write_sheet(archive, name, content):
+    archive.writestr(name, content)
+
+async def generate_collection_sheets(repos, path, week_of=None, mfi_id=None):
+    """Write every center's sheet for the week containing `week_of` to a zip at `path`."""
+    week_of = week_of or date.today()
+    rates = {mfi['id']: mfi.get('interest_rate', 0) for mfi in await repos.mfis.list(None)}
+    centers = {center['id']: center for center in await repos.centers.list_centers(mfi_id, None)}
+    summary = {"week_of": (week_of - timedelta(days=week_of.weekday())).isoformat(), "centers": 0, "loans": 0, "expected_total": 0.0}
+
+    written = set()
+    archive = await asyncio.to_thread(zipfile.ZipFile, path, "w", zipfile.ZIP_DEFLATED)
+    try:
+        async def flush(center_id, rows):
+            center = centers.get(center_id)
+            written.add(center_id)
+            if not center:
+                return
+            content = render_sheet(center, meeting_date(center, week_of), rows)
+            await asyncio.to_thread(_write_sheet, archive, f"{center['name'].replace('/', '-')}-{center_id[:8]}.csv", content)
+            summary["centers"] += 1
+            summary["loans"] += len(rows)
+            summary["expected_total"] += sum(row['expected_instalment'] for row in rows)
+
+        current, rows = None, []
+        async for loan in repos.centers.stream_active_loans(mfi_id):
+            if loan['center_id'] != current:
+                if current is not None:
+                    await flush(current, rows)
+                current, rows = loan['center_id'], []
+            center = centers.get(loan['center_id'])
+            due = center and instalment_due(loan, rates.get(loan['mfi_id'], 0), meeting_date(center, week_of))
+            if due:
+                rows.append({"group": loan['group_name'], "borrower": loan['borrower_name'], "application_id": loan['application_id'], "loan_amount": loan['loan_amount'], **due})
+        if current is not None:
+            await flush(current, rows)
+
+        # Centers without active loans still meet, so they get an empty sheet
+        for center_id in centers.keys() - written:
+            await flush(center_id, [])
+    finally:
+        await asyncio.to_thread(archive.close)
+    summary["expected_total"] = round(summary["expected_total"], 2)
+    return summary
@@ -0,0 +1,92 @@
+"""
+MongoDB client configuration shared by the API and the data scripts.
+
+Pool sizes, timeouts and wire compression come from the environment:
+
+- MONGO_MAX_POOL_SIZE / MONGO_MIN_POOL_SIZE: connections per server, per process.
+- MONGO_MAX_IDLE_TIME_MS: close pooled connections idle this long.
+- MONGO_WARMUP_CONNECTIONS: connections opened during warm-up, before readiness.
+- MONGO_WAIT_QUEUE_TIMEOUT_MS: how long a request waits for a pooled connection.
+- MONGO_CONNECT_TIMEOUT_MS / MONGO_SERVER_SELECTION_TIMEOUT_MS / MONGO_SOCKET_TIMEOUT_MS.
+- MONGO_COMPRESSORS: preference order; codecs whose Python package isn't
+  installed are skipped (zstd needs `zstandard`, snappy needs `python-snappy`).
+- MONGO_ANALYTICS_READ_PREFERENCE / MONGO_ANALYTICS_MAX_STALENESS_SECONDS: where
+  analytics queries read from. Everything else reads and writes on the primary.
+
+Options already given in MONGO_URL take precedence over these defaults.
+"""
+import importlib.util
+import os
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+MONGO_MAX_POOL_SIZE = _env_int('MONGO_MAX_POOL_SIZE', 100)
+MONGO_MIN_POOL_SIZE = _env_int('MONGO_MIN_POOL_SIZE', 0)
+MONGO_MAX_IDLE_TIME_MS = _env_int('MONGO_MAX_IDLE_TIME_MS', 5 * 60 * 1000)
+MONGO_WARMUP_CONNECTIONS = _env_int('MONGO_WARMUP_CONNECTIONS', 10)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = _env_int('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000)
+MONGO_CONNECT_TIMEOUT_MS = _env_int('MONGO_CONNECT_TIMEOUT_MS', 10000)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = _env_int('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000)
+MONGO_SOCKET_TIMEOUT_MS = _env_int('MONGO_SOCKET_TIMEOUT_MS', None)
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zstd,snappy,zlib')
+
+ANALYTICS_READ_PREFERENCE = os.environ.get('MONGO_ANALYTICS_READ_PREFERENCE', 'secondaryPreferred')
+# Secondaries lagging further behind than this aren't used (90 is the server minimum)
+ANALYTICS_MAX_STALENESS_SECONDS = _env_int('MONGO_ANALYTICS_MAX_STALENESS_SECONDS', 120)
+
+# Python package each wire compressor needs
+COMPRESSOR_PACKAGES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest
+}
+
+def available_compressors(names: str):
+    """The compressors in `names` (comma-separated) that can be used in this environment."""
+    usable = []
+    for name in (part.strip() for part in names.split(',')):
+        if name not in COMPRESSOR_PACKAGES:
+            continue
+        package = COMPRESSOR_PACKAGES[name]
+        if package is None or importlib.util.find_spec(package):
+            usable.append(name)
+    return usable
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS
+    }
+    compressors = available_compressors(MONGO_COMPRESSORS)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+    return options
+
+def create_client(mongo_url: str = None, **overrides) -> AsyncIOMotorClient:
+    """A Motor client for MONGO_URL configured from the environment; `overrides` win."""
+    options = {**client_options(), **overrides}
+    # Keep options spelled out in the connection string
+    url = mongo_url or os.environ['MONGO_URL']
+    query = url.partition('?')[2].lower()
+    options = {key: value for key, value in options.items() if f"{key.lower()}=" not in query}
+    return AsyncIOMotorClient(url, **options)
+
+def analytics_read_preference():
+    mode = READ_PREFERENCES[ANALYTICS_READ_PREFERENCE]
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=ANALYTICS_MAX_STALENESS_SECONDS)
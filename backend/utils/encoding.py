@@ -0,0 +1,88 @@
+"""
+Content negotiation for list endpoints.
+
+Clients on slow links can ask for a more compact body through the Accept
+header:
+
+- application/msgpack: MessagePack encoding of the usual JSON structure.
+- application/vnd.grameengo.columnar+json: lists of documents as
+  {"columns": [...], "rows": [[...], ...]} so keys aren't repeated per row.
+
+Bodies above COMPRESSION_MIN_BYTES are gzip-compressed when the client
+accepts it.
+"""
+import gzip
+import json
+import os
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; clients fall back to JSON
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.grameengo.columnar+json"
+
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+COMPRESSION_LEVEL = 6
+
+def supported_types():
+    return [JSON, COLUMNAR_JSON] + ([MSGPACK] if msgpack else [])
+
+def choose_media_type(accept: str) -> str:
+    """Pick the supported media type the client prefers most; JSON by default."""
+    best, best_q = JSON, 0.0
+    for part in (accept or "").split(','):
+        media, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media = media.strip().lower()
+        if media in supported_types() and q > best_q:
+            best, best_q = media, q
+    return best
+
+def to_columnar(rows):
+    """Convert a list of dicts into column names plus value rows."""
+    columns = []
+    seen = set()
+    for row in rows:
+        for key in row:
+            if key not in seen:
+                seen.add(key)
+                columns.append(key)
+    return {"columns": columns, "rows": [[row.get(column) for column in columns] for row in rows]}
+
+def encode(data, media_type: str) -> bytes:
+    data = jsonable_encoder(data)
+    if media_type == MSGPACK:
+        return msgpack.packb(data)
+    if media_type == COLUMNAR_JSON and isinstance(data, list):
+        data = to_columnar(data)
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for part in (accept_encoding or "").split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip().lower() == 'gzip':
+            return params.replace(' ', '') != 'q=0'
+    return False
+
+def negotiated_response(request: Request, data) -> Response:
+    """Encode `data` in the representation the request asked for, compressing large bodies."""
+    media_type = choose_media_type(request.headers.get('accept'))
+    body = encode(data, media_type)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= COMPRESSION_MIN_BYTES and accepts_gzip(request.headers.get('accept-encoding')):
+        body = gzip.compress(body, compresslevel=COMPRESSION_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
@@ -0,0 +1,32 @@
+"""
+Sparse fieldsets for list endpoints.
+
+`?fields=a,b,c` asks a list endpoint for only those fields of each document,
+and `?fields=summary` for the model's predefined summary projection. The
+fields are pushed down to the repository, so Mongo projects them server-side
+and unused fields (documents, notes, long descriptions) are never read off
+the wire, decoded or re-encoded.
+"""
+from typing import List, Optional
+
+SUMMARY = "summary"
+# Returned whatever is asked for, so clients can always key rows
+ALWAYS_INCLUDED = ["id"]
+
+def parse_fields(fields: Optional[str], model, summary: List[str]) -> Optional[List[str]]:
+    """The fields to return for a `fields` query parameter, or None for all of them.
+
+    Raises ValueError naming any field `model` doesn't have.
+    """
+    if fields is None or not fields.strip():
+        return None
+    requested = [name.strip() for name in fields.split(',') if name.strip()]
+    names = []
+    for name in requested:
+        if name == SUMMARY:
+            names.extend(summary)
+        elif name in model.model_fields:
+            names.append(name)
+        else:
+            raise ValueError(f"Unknown field '{name}'")
+    return list(dict.fromkeys(ALWAYS_INCLUDED + names))
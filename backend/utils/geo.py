@@ -0,0 +1,28 @@
+"""
+Geographic helpers for the branch locator.
+
+Locations are stored as GeoJSON points ([longitude, latitude]) so MongoDB's
+2dsphere index can serve $geoNear queries; the memory backend uses the same
+great-circle distance.
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+
+def point(longitude, latitude):
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+def distance_km(longitude1, latitude1, longitude2, latitude2):
+    """Great-circle (haversine) distance between two points."""
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(longitude, latitude, radius_km):
+    """(min longitude, min latitude, max longitude, max latitude) containing the circle."""
+    d_lat = radius_km / KM_PER_DEGREE_LATITUDE
+    d_lng = radius_km / (KM_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01))
+    return longitude - d_lng, max(latitude - d_lat, -90.0), longitude + d_lng, min(latitude + d_lat, 90.0)
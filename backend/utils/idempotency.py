@@ -0,0 +1,16 @@
+from datetime import datetime, timezone, timedelta
+import hashlib
+import json
+import os
+
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, used to detect a key reused for a different request."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+def key_expiry() -> datetime:
+    """When a newly reserved idempotency key should expire."""
+    return datetime.now(timezone.utc) + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
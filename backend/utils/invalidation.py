@@ -0,0 +1,170 @@
+"""
+Cross-worker cache invalidation.
+
+Each uvicorn worker keeps its own in-process caches (users, sessions, the MFI
+and loan product search indexes). Writes publish an invalidation on a topic,
+and every worker's bus hands it to the local caches subscribed to that topic.
+Each topic has a version counter that goes up with every invalidation, so a
+cache can tell whether one arrived while it was loading a value and not store
+what may already be stale.
+
+InvalidationBus only reaches the current process, which is all the memory
+backend needs. MongoInvalidationBus shares invalidations between processes
+through the `cache_invalidations` collection, using a change stream on
+replica sets and polling on standalone servers.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+CACHE_POLL_SECONDS = float(os.environ.get('CACHE_POLL_SECONDS', 1.0))
+CHANGE_STREAMS_UNSUPPORTED = 40573  # $changeStream on a standalone server
+
+logger = logging.getLogger(__name__)
+
+class InvalidationBus:
+    """Delivers invalidations to subscribers in this process."""
+
+    def __init__(self):
+        self.versions = defaultdict(int)
+        self.subscribers = defaultdict(list)
+
+    def subscribe(self, topic, callback):
+        """Call `callback(key)` on every invalidation of `topic`; key None means everything."""
+        self.subscribers[topic].append(callback)
+
+    def version(self, topic) -> int:
+        return self.versions[topic]
+
+    def _deliver(self, topic, key, version):
+        if version <= self.versions[topic]:
+            return  # already applied, e.g. our own publish coming back
+        self.versions[topic] = version
+        for callback in self.subscribers[topic]:
+            callback(key)
+
+    async def publish(self, topic, key=None):
+        self._deliver(topic, key, self.versions[topic] + 1)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class MongoInvalidationBus(InvalidationBus):
+    """Shares invalidations between workers through one counter document per topic."""
+
+    def __init__(self, db):
+        super().__init__()
+        self.collection = db.cache_invalidations
+        self.task = None
+
+    async def publish(self, topic, key=None):
+        doc = await self.collection.find_one_and_update(
+            {"_id": topic},
+            {"$inc": {"version": 1}, "$set": {"key": key}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._deliver(topic, key, doc['version'])
+
+    async def start(self):
+        # Start from the current versions so a new worker doesn't replay old invalidations
+        async for doc in self.collection.find({}):
+            self.versions[doc['_id']] = doc['version']
+        self.task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def _catch_up(self):
+        """Apply anything published while not listening."""
+        async for doc in self.collection.find({}):
+            topic, version = doc['_id'], doc['version']
+            if version > self.versions[topic]:
+                # Only the latest key is kept, so after a gap drop the whole topic
+                key = doc.get('key') if version == self.versions[topic] + 1 else None
+                self._deliver(topic, key, version)
+
+    def _on_change(self, change):
+        topic = change['documentKey']['_id']
+        if change['operationType'] == 'insert':
+            fields = change['fullDocument']
+        elif change['operationType'] == 'update':
+            fields = change['updateDescription']['updatedFields']
+        else:
+            return
+        # A key equal to the previous one isn't in the update description
+        self._deliver(topic, fields.get('key'), fields['version'])
+
+    async def _listen(self):
+        use_change_stream = True
+        while True:
+            try:
+                await self._catch_up()
+                if use_change_stream:
+                    async with self.collection.watch() as stream:
+                        async for change in stream:
+                            self._on_change(change)
+                else:
+                    await asyncio.sleep(CACHE_POLL_SECONDS)
+            except OperationFailure as e:
+                if use_change_stream and e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning("MongoDB is standalone; polling for cache invalidations every %ss", CACHE_POLL_SECONDS)
+                    use_change_stream = False
+                else:
+                    logger.exception("Cache invalidation listener failed; retrying")
+                    await asyncio.sleep(CACHE_POLL_SECONDS)
+            except PyMongoError:
+                logger.exception("Cache invalidation listener failed; retrying")
+                await asyncio.sleep(CACHE_POLL_SECONDS)
+
+
+class VersionedCache:
+    """Per-worker cache of one topic's documents, emptied by invalidations on the bus.
+
+    Entries also expire after `ttl_seconds`, which bounds staleness for changes
+    made outside the API (e.g. directly in the database).
+    """
+
+    def __init__(self, bus, topic, ttl_seconds, max_entries=10000):
+        self.bus = bus
+        self.topic = topic
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = {}  # key -> (expires at, value)
+        bus.subscribe(topic, self.invalidate)
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    async def get(self, key, load):
+        """The cached value for `key`, or `await load()` cached if nothing was invalidated meanwhile."""
+        now = time.monotonic()
+        entry = self.entries.get(key)
+        if entry and entry[0] > now:
+            return dict(entry[1])
+
+        version = self.bus.version(self.topic)
+        value = await load()
+        if value is not None and self.bus.version(self.topic) == version:
+            if len(self.entries) >= self.max_entries:
+                # Drop the oldest entry
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = (now + self.ttl_seconds, dict(value))
+        return value
@@ -0,0 +1,174 @@
+"""
+Background job scheduler running inside the API process.
+
+Every worker runs a scheduler, and jobs are stored in the job repository, so
+a job is only run by the worker that leases it. Leases are renewed while a
+job runs; if its worker dies, the lease expires and another worker picks the
+job up again.
+
+Periodic jobs are rescheduled `interval_seconds` after each run. One-shot jobs
+are enqueued with a payload and end as `succeeded` or `failed`. A failed run
+is retried with exponential backoff until it has failed `max_attempts` times.
+Every lease counts as an attempt, so a job that keeps taking its worker down
+fails once its attempts run out instead of being picked up forever.
+"""
+import asyncio
+import logging
+import os
+import socket
+import traceback
+import uuid
+from datetime import datetime, timezone, timedelta
+
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 2))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 5))
+JOB_LEASE_SECONDS = 60
+JOB_RETRY_BASE_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+class JobAbandoned(Exception):
+    """The job's attempts ran out on runs that never finished (their worker died)."""
+
+class JobScheduler:
+    def __init__(self, jobs, context, max_concurrent=MAX_CONCURRENT_JOBS, poll_seconds=JOB_POLL_SECONDS):
+        """
+        jobs: JobRepository the schedule is stored in.
+        context: passed to every handler as its first argument.
+        """
+        self.jobs = jobs
+        self.context = context
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers = {}  # name -> (handler, interval_seconds or None, max_attempts)
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.running = {}  # job id -> task
+        self.task = None
+
+    def periodic(self, name, interval_seconds, max_attempts=3):
+        """Decorator registering `async handler(context)` to run every `interval_seconds`."""
+        def decorator(handler):
+            self.handlers[name] = (lambda context, payload: handler(context), interval_seconds, max_attempts)
+            return handler
+        return decorator
+
+    def one_shot(self, name, max_attempts=3):
+        """Decorator registering `async handler(context, payload)` for jobs enqueued under `name`."""
+        def decorator(handler):
+            self.handlers[name] = (handler, None, max_attempts)
+            return handler
+        return decorator
+
+    async def enqueue(self, name, payload=None, created_by=None):
+        if name not in self.handlers or self.handlers[name][1] is not None:
+            raise ValueError(f"Unknown one-shot job: {name}")
+        now = datetime.now(timezone.utc).isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "name": name,
+            "payload": payload or {},
+            "status": "scheduled",
+            "run_at": now,
+            "attempts": 0,
+            "max_attempts": self.handlers[name][2],
+            "created_by": created_by,
+            "created_at": now,
+            "updated_at": now
+        }
+        await self.jobs.enqueue(job)
+        return job
+
+    async def start(self):
+        now = datetime.now(timezone.utc).isoformat()
+        for name, (_, interval_seconds, max_attempts) in self.handlers.items():
+            if interval_seconds is not None:
+                # Periodic jobs use their name as id, so every worker shares one schedule
+                await self.jobs.ensure({
+                    "id": name,
+                    "name": name,
+                    "payload": {},
+                    "status": "scheduled",
+                    "run_at": now,
+                    "interval_seconds": interval_seconds,
+                    "attempts": 0,
+                    "max_attempts": max_attempts,
+                    "created_at": now,
+                    "updated_at": now
+                })
+        self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        tasks = [task for task in [self.task, *self.running.values()] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            await self.slots.acquire()
+            try:
+                now = datetime.now(timezone.utc)
+                job = await self.jobs.claim_due(
+                    list(self.handlers), self.worker_id,
+                    now.isoformat(), (now + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+                )
+            except Exception:
+                logger.exception("Claiming a job failed")
+                job = None
+            if not job:
+                self.slots.release()
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            self.running[job['id']] = asyncio.create_task(self._run(job))
+
+    async def _keep_lease(self, job):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            lease_expires_at = (datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+            if not await self.jobs.extend_lease(job['id'], self.worker_id, lease_expires_at):
+                logger.warning("Lost the lease on job %s", job['id'])
+                return
+
+    async def _run(self, job):
+        handler, interval_seconds, max_attempts = self.handlers[job['name']]
+        heartbeat = asyncio.create_task(self._keep_lease(job))
+        try:
+            if job['attempts'] > max_attempts:
+                raise JobAbandoned(f"Gave up after {max_attempts} attempts; the last one never finished")
+            result = await handler(self.context, job.get('payload') or {})
+        except asyncio.CancelledError:
+            # Shutting down; the lease expires and another worker retries the job
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job['name'], job['id'])
+            await self._finish(job, None, e, interval_seconds, max_attempts)
+        else:
+            await self._finish(job, result, None, interval_seconds, max_attempts)
+        finally:
+            heartbeat.cancel()
+            self.running.pop(job['id'], None)
+            self.slots.release()
+
+    async def _finish(self, job, result, error, interval_seconds, max_attempts):
+        now = datetime.now(timezone.utc)
+        fields = {"finished_at": now.isoformat(), "updated_at": now.isoformat()}
+        # Counted when the job was claimed, including this run
+        attempts = job['attempts']
+        if error is None:
+            fields.update(last_status="succeeded", result=result, error=None)
+        else:
+            fields.update(
+                last_status="failed",
+                error="".join(traceback.format_exception_only(type(error), error)).strip()
+            )
+
+        if error is not None and attempts < max_attempts:
+            backoff = JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            fields.update(status="scheduled", run_at=(now + timedelta(seconds=backoff)).isoformat())
+        elif interval_seconds is not None:
+            fields.update(status="scheduled", run_at=(now + timedelta(seconds=interval_seconds)).isoformat(), attempts=0)
+        else:
+            fields.update(status=fields['last_status'])
+
+        if not await self.jobs.finish(job['id'], self.worker_id, fields):
+            logger.warning("Job %s finished after its lease was taken over", job['id'])
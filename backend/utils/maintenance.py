@@ -0,0 +1,151 @@
+"""
+Maintenance and batch jobs run by the background scheduler.
+
+Handlers take the request-time Repositories bundle as their context.
+"""
+import asyncio
+import gzip
+import json
+import os
+import uuid
+from datetime import date, datetime, timezone, timedelta
+from pathlib import Path
+
+from utils.collection_sheets import generate_collection_sheets
+from utils.sync import SYNC_PAGE_SIZE
+
+SESSION_CLEANUP_INTERVAL_SECONDS = 60 * 60
+NOTIFICATION_RETENTION_INTERVAL_SECONDS = 6 * 60 * 60
+NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 180))
+RETENTION_BATCH_SIZE = 1000
+EXPORT_DIR = Path(os.environ.get('EXPORT_DIR', Path(__file__).parent.parent / 'exports'))
+# Exports and collection sheets are deleted this long after they're written
+EXPORT_RETENTION_DAYS = int(os.environ.get('EXPORT_RETENTION_DAYS', 7))
+EXPORT_CLEANUP_INTERVAL_SECONDS = 6 * 60 * 60
+
+COLLECTION_SHEETS_INTERVAL_SECONDS = 7 * 24 * 60 * 60
+
+# Closed applications untouched this long move to the archive collection
+APPLICATION_ARCHIVE_INTERVAL_SECONDS = 24 * 60 * 60
+APPLICATION_ARCHIVE_MONTHS = int(os.environ.get('APPLICATION_ARCHIVE_MONTHS', 12))
+ARCHIVED_STATUSES = ["rejected", "disbursed"]
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_RECONCILE_INTERVAL_SECONDS = 7 * 24 * 60 * 60
+# Expired notifications are kept as gzipped NDJSON, one file per run
+ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR', Path(__file__).parent.parent / 'archive'))
+
+async def cleanup_expired_sessions(repos):
+    deleted = await repos.sessions.delete_expired(datetime.now(timezone.utc))
+    return {"deleted": deleted}
+
+async def expire_read_notifications(repos):
+    """Move read notifications past NOTIFICATION_RETENTION_DAYS to a file in ARCHIVE_DIR.
+
+    Tombstones are left so synced clients drop them too.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=NOTIFICATION_RETENTION_DAYS)).isoformat()
+    path = ARCHIVE_DIR / "notifications" / f"{now:%Y-%m-%d}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    archived = 0
+    while True:
+        batch = await repos.notifications.list_read_before(cutoff, RETENTION_BATCH_SIZE)
+        if batch:
+            # Written before deleting, so a crash can only duplicate, never lose
+            await asyncio.to_thread(_append_lines, path, [json.dumps(notif, default=str) + "\n" for notif in batch])
+            await repos.notifications.delete_many([notif['id'] for notif in batch])
+        await repos.tombstones.add_many("notifications", [
+            {"id": notif['id'], "user_id": notif['user_id'], "deleted_at": now.isoformat()} for notif in batch
+        ])
+        archived += len(batch)
+        if len(batch) < RETENTION_BATCH_SIZE:
+            return {"archived": archived, "file": path.name if archived else None}
+
+async def archive_closed_applications(repos):
+    """Move applications closed more than APPLICATION_ARCHIVE_MONTHS ago to the archive.
+
+    They stay readable by id and keep counting in analytics through the
+    archive's totals. Tombstones are left so synced clients drop them too,
+    as they're gone from application lists. Disbursed loans still being
+    repaid keep appearing on collection sheets.
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=30 * APPLICATION_ARCHIVE_MONTHS)).isoformat()
+    archived = 0
+    while True:
+        batch = await repos.applications.list_closed_before(ARCHIVED_STATUSES, cutoff, ARCHIVE_BATCH_SIZE)
+        # Copy, delete, then count: a crash before the delete leaves a copy
+        # the next run replaces, so analytics never count an application in
+        # both collections; a crash before counting undercounts until
+        # reconcile_archive_totals runs
+        await repos.application_archive.archive(batch)
+        await repos.tombstones.add_many("applications", [
+            {"id": app['id'], "user_id": app['user_id'], "mfi_id": app['mfi_id'], "deleted_at": now.isoformat()}
+            for app in batch
+        ])
+        await repos.applications.delete_many([app['id'] for app in batch])
+        await repos.application_archive.add_to_totals(batch)
+        archived += len(batch)
+        if len(batch) < ARCHIVE_BATCH_SIZE:
+            return {"archived": archived}
+
+async def reconcile_archive_totals(repos):
+    """Recompute the archive's running totals from the archived applications.
+
+    Catches up batches a crash left uncounted. Running alongside an archive
+    run can count its last batch twice, until the next reconciliation.
+    """
+    return {"applications": await repos.application_archive.rebuild_totals()}
+
+def _delete_older_than(directory, cutoff):
+    deleted = 0
+    for path in directory.glob("*"):
+        if path.is_file() and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            deleted += 1
+    return deleted
+
+async def expire_exports(repos):
+    """Delete files in EXPORT_DIR written more than EXPORT_RETENTION_DAYS ago."""
+    if not EXPORT_DIR.exists():
+        return {"deleted": 0}
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=EXPORT_RETENTION_DAYS)).timestamp()
+    return {"deleted": await asyncio.to_thread(_delete_older_than, EXPORT_DIR, cutoff)}
+
+def _append_lines(path, lines):
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        f.writelines(lines)
+
+async def export_applications(repos, payload):
+    """Write applications (optionally only one status) to a gzipped NDJSON file in EXPORT_DIR."""
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    path = EXPORT_DIR / f"applications-{uuid.uuid4()}.ndjson.gz"
+    status = payload.get('status')
+    after, count = ("", ""), 0
+    # Page through by (updated_at, id), like delta sync, so memory stays bounded
+    while True:
+        page = await repos.applications.list_updated_since(after, None, SYNC_PAGE_SIZE)
+        lines = [json.dumps(app, default=str) + "\n" for app in page if not status or app.get('status') == status]
+        await asyncio.to_thread(_append_lines, path, lines)
+        count += len(lines)
+        if len(page) < SYNC_PAGE_SIZE:
+            return {"file": path.name, "count": count}
+        after = (page[-1]['updated_at'], page[-1]['id'])
+
+async def collection_sheets(repos, payload):
+    """Write the week's collection sheets for every center (or one MFI's) to a zip in EXPORT_DIR."""
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    week_of = date.fromisoformat(payload['week_of']) if payload.get('week_of') else None
+    path = EXPORT_DIR / f"collection-sheets-{uuid.uuid4()}.zip"
+    summary = await generate_collection_sheets(repos, path, week_of, payload.get('mfi_id'))
+    return {"file": path.name, **summary}
+
+def register_jobs(scheduler):
+    scheduler.periodic("cleanup_expired_sessions", SESSION_CLEANUP_INTERVAL_SECONDS)(cleanup_expired_sessions)
+    scheduler.periodic("expire_read_notifications", NOTIFICATION_RETENTION_INTERVAL_SECONDS)(expire_read_notifications)
+    scheduler.periodic("archive_closed_applications", APPLICATION_ARCHIVE_INTERVAL_SECONDS)(archive_closed_applications)
+    scheduler.periodic("reconcile_archive_totals", ARCHIVE_RECONCILE_INTERVAL_SECONDS)(reconcile_archive_totals)
+    scheduler.periodic("expire_exports", EXPORT_CLEANUP_INTERVAL_SECONDS)(expire_exports)
+    scheduler.one_shot("export_applications")(export_applications)
+    scheduler.periodic("weekly_collection_sheets", COLLECTION_SHEETS_INTERVAL_SECONDS)(lambda repos: collection_sheets(repos, {}))
+    scheduler.one_shot("collection_sheets")(collection_sheets)
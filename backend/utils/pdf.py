@@ -0,0 +1,114 @@
+"""
+PDF rendering with reportlab, for application summaries and portfolio reports.
+
+Only imported in ReportRenderer's pool processes (see utils/reports.py), so
+API workers don't pay reportlab's import time. Functions take plain JSON-like
+data and return PDF bytes. Paragraph parses its text as markup, so free
+text is escaped before it goes into one; table cells are drawn as is.
+"""
+import io
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+BRAND_GREEN = colors.Color(30 / 255, 154 / 255, 86 / 255)
+
+def _styles():
+    styles = getSampleStyleSheet()
+    return {
+        "brand": ParagraphStyle("brand", parent=styles["Title"], textColor=BRAND_GREEN, fontSize=20),
+        "title": ParagraphStyle("title", parent=styles["Heading2"], alignment=1, textColor=colors.HexColor("#3c3c3c")),
+        "heading": styles["Heading3"],
+        "body": styles["BodyText"]
+    }
+
+def _grid(rows, header=True):
+    table = Table(rows, hAlign="LEFT")
+    style = [("GRID", (0, 0), (-1, -1), 0.5, colors.grey), ("FONTSIZE", (0, 0), (-1, -1), 10)]
+    if header:
+        style += [("BACKGROUND", (0, 0), (-1, 0), BRAND_GREEN), ("TEXTCOLOR", (0, 0), (-1, 0), colors.white)]
+    table.setStyle(TableStyle(style))
+    return table
+
+def _page_number(canvas, doc):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 9)
+    canvas.setFillColor(colors.grey)
+    canvas.drawCentredString(A4[0] / 2, 10 * mm, f"Page {doc.page}")
+    canvas.restoreState()
+
+def _build(story, title):
+    out = io.BytesIO()
+    doc = SimpleDocTemplate(out, pagesize=A4, title=title, author="GrameenGo")
+    doc.build(story, onFirstPage=_page_number, onLaterPages=_page_number)
+    return out.getvalue()
+
+def _money(amount):
+    return f"BDT {amount or 0:,.0f}"
+
+def render_application_pdf(app, mfi_name=None):
+    """PDF summary of one application."""
+    styles = _styles()
+    details = [
+        ["Application ID", app['id'][:8]],
+        ["MFI", mfi_name or "N/A"],
+        ["Business Name", app.get('business_name', "")],
+        ["Business Type", app.get('business_type', "")],
+        ["Monthly Revenue", _money(app.get('monthly_revenue'))],
+        ["Loan Amount", _money(app.get('loan_amount'))],
+        ["Loan Purpose", app.get('loan_purpose', "")],
+        ["Tenure", f"{app.get('tenure_months', '')} months"],
+        ["Status", app.get('status', "")],
+        ["Applied On", str(app.get('created_at', ""))[:10]],
+        ["Last Updated", str(app.get('updated_at', ""))[:10]],
+    ]
+    if app.get('rejection_reason'):
+        details.append(["Rejection Reason", app['rejection_reason']])
+    story = [
+        Paragraph("GrameenGo", styles["brand"]),
+        Paragraph("Loan Application Report", styles["title"]),
+        Spacer(1, 6 * mm),
+        _grid(details, header=False)
+    ]
+    if app.get('documents'):
+        story += [
+            Spacer(1, 6 * mm),
+            Paragraph("Documents", styles["heading"]),
+            _grid([["Document", "Type", "Size"]] + [
+                [doc.get('filename', ""), doc.get('content_type', ""), f"{doc.get('length', 0) / 1024:,.0f} KB"]
+                for doc in app['documents']
+            ])
+        ]
+    if app.get('officer_notes'):
+        story += [Spacer(1, 6 * mm), Paragraph("Officer Notes", styles["heading"]), Paragraph(escape(app['officer_notes']), styles["body"])]
+    return _build(story, f"Application {app['id'][:8]}")
+
+def render_portfolio_pdf(stats, trends, generated_at):
+    """PDF of the portfolio statistics and monthly trends shown on the analytics dashboard."""
+    styles = _styles()
+    story = [
+        Paragraph("GrameenGo Analytics Report", styles["brand"]),
+        Paragraph(f"Generated {generated_at[:16].replace('T', ' ')} UTC", styles["title"]),
+        Spacer(1, 6 * mm),
+        Paragraph("Summary Statistics", styles["heading"]),
+        _grid([
+            ["Total Applications", stats['total_applications']],
+            ["Approved", stats['approved']],
+            ["Rejected", stats['rejected']],
+            ["Pending", stats['pending']],
+            ["Total Loan Amount", _money(stats['total_loan_amount'])],
+        ], header=False)
+    ]
+    if trends:
+        story += [
+            Spacer(1, 6 * mm),
+            Paragraph("Monthly Trends", styles["heading"]),
+            _grid([["Month", "Applications", "Total Amount"]] + [
+                [f"{t['_id']['month']}/{t['_id']['year']}", t['count'], _money(t['total_amount'])] for t in trends
+            ])
+        ]
+    return _build(story, "Portfolio report")
@@ -0,0 +1,168 @@
+"""
+On-demand sampling profiles and an event-loop stall watchdog.
+
+A profile samples the stacks of every thread in this worker at a fixed
+interval from a background thread, for a bounded number of seconds, and
+returns them as collapsed stacks: one `frame;frame;frame count` line per
+distinct stack, root first, which flamegraph.pl, speedscope and inferno
+read directly. Taking a sample is a walk over frames the interpreter
+already has, so profiling costs little more than holding the GIL briefly
+PROFILE_INTERVAL_MS apart.
+
+The watchdog keeps a heartbeat task on the event loop and a thread that
+checks it. When the heartbeat is more than LOOP_STALL_MS late, something is
+running on the loop without awaiting (bcrypt, a large validation, a sync
+call), and the thread logs the loop thread's stack at that moment.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime, timezone
+
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 10))
+MIN_PROFILE_INTERVAL_MS = 1
+MAX_PROFILE_SECONDS = 60
+LOOP_STALL_MS = float(os.environ.get('LOOP_STALL_MS', 250))
+# Stalls kept for the metrics endpoint
+RECENT_STALLS = 20
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger(__name__)
+
+def _frame_label(frame):
+    """`function (file)`, with the file relative to the backend or site-packages."""
+    filename = frame.f_code.co_filename
+    if filename.startswith(BACKEND_DIR + os.sep):
+        filename = filename[len(BACKEND_DIR) + 1:]
+    elif "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    # ';' separates frames and the last space precedes the count
+    return f"{frame.f_code.co_qualname} ({filename})".replace(";", ":")
+
+
+def collapse_stack(frame):
+    """A frame's stack as a collapsed-stack line without the count, root first."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Samples every thread's stack; one profile at a time per worker."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.lock.locked()
+
+    def profile(self, seconds, interval_ms=PROFILE_INTERVAL_MS) -> str:
+        """Sample for `seconds` and return collapsed stacks, most frequent first.
+
+        Blocks the calling thread, so run it with asyncio.to_thread. Raises
+        RuntimeError if a profile is already running.
+        """
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            return self._sample(seconds, interval_ms / 1000)
+        finally:
+            self.lock.release()
+
+    def _sample(self, seconds, interval):
+        me = threading.get_ident()
+        stacks = Counter()
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[f"{names.get(ident, ident)};{collapse_stack(frame)}"] += 1
+            # Fixed rate; if sampling fell behind, skip rather than catch up
+            next_sample = max(next_sample + interval, time.monotonic())
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class LoopWatchdog:
+    """Logs the event loop thread's stack when the loop is blocked for too long."""
+
+    def __init__(self, threshold_ms=LOOP_STALL_MS):
+        self.threshold = threshold_ms / 1000
+        self.beat = 0.0
+        self.stalls = 0
+        self.recent = deque(maxlen=RECENT_STALLS)
+        self.task = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.beat = time.monotonic()
+        self.task = asyncio.create_task(self._heartbeat())
+        self.stopping.clear()
+        self.thread = threading.Thread(
+            target=self._watch, args=(loop, threading.get_ident()), name="loop-watchdog", daemon=True
+        )
+        self.thread.start()
+
+    async def stop(self):
+        self.stopping.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.thread:
+            await asyncio.to_thread(self.thread.join)
+
+    def metrics(self):
+        return {"threshold_ms": self.threshold * 1000, "stalls": self.stalls, "recent": list(self.recent)}
+
+    async def _heartbeat(self):
+        while True:
+            self.beat = time.monotonic()
+            await asyncio.sleep(self.threshold / 4)
+
+    def _watch(self, loop, loop_thread):
+        reported = None  # heartbeat of the stall already logged
+        while not self.stopping.wait(self.threshold / 4):
+            beat = self.beat
+            blocked = time.monotonic() - beat
+            if reported is not None and beat != reported:
+                # The loop came back; the gap between heartbeats, less the sleep, is the stall
+                self.recent[-1]["blocked_ms"] = round((beat - reported - self.threshold / 4) * 1000, 1)
+                reported = None
+            if blocked <= self.threshold or beat == reported:
+                continue
+            frame = sys._current_frames().get(loop_thread)
+            if frame is None:
+                continue
+            # Read from another thread, so only a best-effort name
+            task = asyncio.tasks._current_tasks.get(loop)
+            stack = "".join(traceback.format_stack(frame))
+            reported = beat
+            self.stalls += 1
+            self.recent.append({
+                "at": datetime.now(timezone.utc).isoformat(),
+                "task": task.get_name() if task else None,
+                "blocked_ms": None,  # filled in when the loop resumes
+                "stack": collapse_stack(frame)
+            })
+            logger.warning(
+                "Event loop blocked for over %.0f ms in task %s:\n%s",
+                blocked * 1000, task.get_name() if task else None, stack
+            )
@@ -0,0 +1,116 @@
+"""
+Server-side PDF reports.
+
+Rendering is CPU-bound, so it runs in a bounded process pool and never on
+the event loop; reportlab (utils/pdf.py) is only imported in the pool's
+processes. Render arguments are plain JSON-like data, pickled into the pool.
+
+Application reports depend only on the application and its MFI's name, so
+rendered PDFs are cached per worker by application id and updated_at, and
+concurrent requests for the same report share one render.
+"""
+import asyncio
+import importlib
+import multiprocessing
+import os
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.singleflight import SingleFlight
+
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', min(4, os.cpu_count() or 1)))
+# Renders handed to the pool at once; the rest wait on the event loop, so a
+# bulk export can't queue up hundreds of renders ahead of single reports
+MAX_PENDING_RENDERS = REPORT_WORKERS * 2
+REPORT_CACHE_BYTES = int(os.environ.get('REPORT_CACHE_BYTES', 64 * 1024 * 1024))
+
+def _render(name, *args):
+    """Call utils.pdf.<name>(*args); runs in a pool process."""
+    return getattr(importlib.import_module("utils.pdf"), name)(*args)
+
+
+class ReportRenderer:
+    """Runs render functions in a process pool, caching application reports."""
+
+    def __init__(self, workers=REPORT_WORKERS, max_pending=MAX_PENDING_RENDERS, cache_bytes=REPORT_CACHE_BYTES):
+        self.workers = workers
+        self.cache_bytes = cache_bytes
+        self.pool = None  # started on first use, so API workers that never render don't pay for it
+        self.slots = asyncio.Semaphore(max_pending)
+        self.flight = SingleFlight()
+        self.cache = OrderedDict()  # (application id, updated_at, MFI name) -> PDF bytes, least recently used first
+        self.cached_bytes = 0
+
+    async def render(self, name, *args):
+        """PDF bytes from utils.pdf.<name>(*args)."""
+        if self.pool is None:
+            # Spawned rather than forked: the API process has threads (Motor, executors)
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        pool = self.pool
+        async with self.slots:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(pool, _render, name, *args)
+            except BrokenProcessPool:
+                # A worker process died (e.g. killed for memory); start a fresh pool next time
+                if self.pool is pool:
+                    self.pool = None
+                raise
+
+    async def application_pdf(self, app, mfi_name=None):
+        key = (app['id'], app.get('updated_at'), mfi_name)
+        pdf = self.cache.get(key)
+        if pdf is not None:
+            self.cache.move_to_end(key)
+            return pdf
+        pdf = await self.flight.do(key, lambda: self.render("render_application_pdf", app, mfi_name))
+        if key not in self.cache:
+            self.cache[key] = pdf
+            self.cached_bytes += len(pdf)
+            while self.cached_bytes > self.cache_bytes:
+                _, evicted = self.cache.popitem(last=False)
+                self.cached_bytes -= len(evicted)
+        return pdf
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _ZipSink:
+    """Write-only file object collecting what zipfile writes, for streaming."""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+async def stream_zip(files):
+    """Yield a zip archive of `async for (name, data) in files` as entries arrive.
+
+    Entries are stored uncompressed, since PDFs are compressed already. The
+    sink can't seek, so zipfile writes sizes after each entry instead of
+    going back to patch its header.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+        async for name, data in files:
+            archive.writestr(name, data)
+            yield sink.take()
+    yield sink.take()
@@ -0,0 +1,66 @@
+"""
+Revoked JWT ids, checked on every JWT-authenticated request.
+
+Access tokens carry a random `jti`; logging out stores it in the
+`revoked_tokens` collection until the token would have expired anyway. Each
+worker keeps the ids of unexpired revoked tokens in memory, so checking a
+token never needs a database round trip: a Bloom filter answers the common
+case (a token that was never revoked) from a few bits, and the exact set
+settles the filter's rare false positives.
+
+Bloom filters can't drop entries, so the filter is rebuilt from the database
+every REVOCATION_REFRESH_SECONDS, which also forgets expired tokens.
+"""
+import hashlib
+import math
+import os
+
+REVOCATION_REFRESH_SECONDS = float(os.environ.get('REVOCATION_REFRESH_SECONDS', 300))
+# Room for revocations between rebuilds, at FALSE_POSITIVE_RATE
+MIN_BLOOM_CAPACITY = 1024
+FALSE_POSITIVE_RATE = 0.001
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two independent 64-bit hashes
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenDenylist:
+    """Revoked token ids: a Bloom filter in front of the exact set."""
+
+    def __init__(self, jtis=()):
+        self.exact = set(jtis)
+        self.bloom = BloomFilter(max(MIN_BLOOM_CAPACITY, 2 * len(self.exact)))
+        for jti in self.exact:
+            self.bloom.add(jti)
+
+    @property
+    def full(self) -> bool:
+        """Whether more ids went in than the filter was sized for, raising its error rate."""
+        return len(self.exact) > self.bloom.capacity
+
+    def add(self, jti):
+        self.exact.add(jti)
+        self.bloom.add(jti)
+
+    def __contains__(self, jti):
+        return jti in self.bloom and jti in self.exact
+
+    def __len__(self):
+        return len(self.exact)
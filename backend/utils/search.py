@@ -0,0 +1,239 @@
+"""
+In-process search index for the MFI directory and loan product catalog.
+
+An inverted index over weighted text fields supports exact, prefix and
+one-edit fuzzy term matching, and sorted (value, id) lists over numeric
+fields answer range filters with bisection. Documents are added one at a
+time, so the index is kept current as MFIs are created: an invalidation
+carrying a document id re-reads and re-indexes just that document, and only
+an invalidation without one (some were missed) makes the index rebuild.
+"""
+import asyncio
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Score multipliers by how a query term matched an indexed term
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+FUZZY_MATCH = 0.4
+MIN_FUZZY_LENGTH = 4
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+def _deletions(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+class SearchIndex:
+    def __init__(self, text_fields, numeric_fields=(), amount_range=None):
+        """
+        text_fields: field name -> weight; list fields have each item indexed.
+        numeric_fields: fields that can be filtered with min/max bounds.
+        amount_range: (min_field, max_field) pair for "can lend this amount" filters.
+        """
+        self.text_fields = text_fields
+        self.numeric_fields = list(numeric_fields)
+        self.amount_range = amount_range
+        self.generation = 0
+        self._build_lock = asyncio.Lock()
+        self._refreshes = set()  # running refresh tasks, referenced until done
+        self.reset()
+
+    def reset(self, key=None):
+        """Forget all documents so the index is rebuilt on next use; usable as a bus subscriber."""
+        self.docs = {}
+        self.postings = defaultdict(dict)  # term -> {doc_id: weight}
+        self.vocabulary = []  # sorted, for prefix lookups
+        self.deletes = defaultdict(set)  # one-character deletion -> terms, for fuzzy lookups
+        self.sorted_by = {field: [] for field in self.numeric_fields}
+        self.by_min_amount = []
+        self.built = False
+        self.generation += 1
+
+    def invalidation_handler(self, load_doc):
+        """Bus subscriber re-indexing the document whose id was published, read with `await load_doc(id)`.
+
+        A None key means invalidations were missed, so the index is reset and
+        rebuilt on next use instead. Before the first build there is nothing
+        to update, but a reset makes a build already loading start over.
+        """
+        def handle(doc_id):
+            if doc_id is None or not self.built:
+                self.reset()
+                return
+            task = asyncio.get_running_loop().create_task(self.refresh(doc_id, load_doc))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+        return handle
+
+    async def refresh(self, doc_id, load_doc):
+        """Re-index one document from `await load_doc(doc_id)`, dropping it if it's gone."""
+        generation = self.generation
+        doc = await load_doc(doc_id)
+        # After a reset the rebuild reads the document anyway
+        if generation != self.generation:
+            return
+        if doc:
+            self.add(doc)
+        else:
+            self.remove(doc_id)
+
+    async def ensure_built(self, load_docs):
+        """Build the index from `await load_docs()` the first time it is needed."""
+        if self.built:
+            return
+        async with self._build_lock:
+            while not self.built:
+                # A reset while loading means the loaded documents may be stale
+                generation = self.generation
+                docs = await load_docs()
+                if generation == self.generation:
+                    for doc in docs:
+                        self.add(doc)
+                    self.built = True
+
+    def _doc_terms(self, doc):
+        weights = {}
+        for field, weight in self.text_fields.items():
+            value = doc.get(field)
+            if not value:
+                continue
+            values = value if isinstance(value, list) else [value]
+            for item in values:
+                for term in tokenize(str(item)):
+                    weights[term] = max(weights.get(term, 0), weight)
+        return weights
+
+    def add(self, doc):
+        """Index a document, replacing any earlier version with the same id."""
+        doc_id = doc['id']
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        self.docs[doc_id] = dict(doc)
+
+        for term, weight in self._doc_terms(doc).items():
+            if term not in self.postings:
+                insort(self.vocabulary, term)
+                if len(term) >= MIN_FUZZY_LENGTH:
+                    for deleted in _deletions(term):
+                        self.deletes[deleted].add(term)
+            self.postings[term][doc_id] = weight
+
+        for field in self.numeric_fields:
+            if doc.get(field) is not None:
+                insort(self.sorted_by[field], (doc[field], doc_id))
+        if self.amount_range and doc.get(self.amount_range[0]) is not None:
+            insort(self.by_min_amount, (doc[self.amount_range[0]], doc_id))
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if not doc:
+            return
+        # Terms stay in the vocabulary; empty postings are simply skipped.
+        for term in self._doc_terms(doc):
+            self.postings[term].pop(doc_id, None)
+        for field in self.numeric_fields:
+            if doc.get(field) is not None:
+                self.sorted_by[field].remove((doc[field], doc_id))
+        if self.amount_range and doc.get(self.amount_range[0]) is not None:
+            self.by_min_amount.remove((doc[self.amount_range[0]], doc_id))
+
+    def _term_matches(self, query_term):
+        """Indexed terms matching a query term, with their match multipliers."""
+        matches = {}
+        i = bisect_left(self.vocabulary, query_term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(query_term):
+            term = self.vocabulary[i]
+            matches[term] = EXACT_MATCH if term == query_term else PREFIX_MATCH
+            i += 1
+
+        if len(query_term) >= MIN_FUZZY_LENGTH:
+            # Terms within one insertion, deletion or substitution
+            candidates = set(self.deletes.get(query_term, ()))
+            for deleted in _deletions(query_term):
+                if deleted in self.postings:
+                    candidates.add(deleted)
+                candidates.update(self.deletes.get(deleted, ()))
+            for term in candidates:
+                matches.setdefault(term, FUZZY_MATCH)
+        return matches
+
+    def _text_scores(self, query):
+        """Relevance score per document; every query term must match."""
+        scores = None
+        for query_term in set(tokenize(query)):
+            term_scores = {}
+            for term, multiplier in self._term_matches(query_term).items():
+                for doc_id, weight in self.postings.get(term, {}).items():
+                    term_scores[doc_id] = max(term_scores.get(doc_id, 0), weight * multiplier)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def _range_ids(self, field, minimum=None, maximum=None):
+        values = self.sorted_by[field]
+        lo = bisect_left(values, (minimum,)) if minimum is not None else 0
+        hi = bisect_right(values, (maximum, chr(0x10FFFF))) if maximum is not None else len(values)
+        return {doc_id for _, doc_id in values[lo:hi]}
+
+    def _amount_ids(self, amount):
+        # Candidates whose minimum is low enough, then check their maximum
+        hi = bisect_right(self.by_min_amount, (amount, chr(0x10FFFF)))
+        max_field = self.amount_range[1]
+        return {doc_id for _, doc_id in self.by_min_amount[:hi] if self.docs[doc_id].get(max_field, 0) >= amount}
+
+    def search(self, query=None, ranges=None, amount=None, equals=None, sort=None, offset=0, limit=20):
+        """
+        query: free text; results are ranked by relevance unless `sort` is given.
+        ranges: field -> (min, max) with None for an open bound.
+        amount: only documents whose amount range includes this value.
+        equals: field -> required value.
+        sort: numeric field to sort ascending by; prefix with "-" for descending.
+
+        Returns (total, page of documents).
+        """
+        candidates = None
+        scores = {}
+        if query and tokenize(query):
+            scores = self._text_scores(query)
+            candidates = set(scores)
+        for field, (minimum, maximum) in (ranges or {}).items():
+            if minimum is None and maximum is None:
+                continue
+            ids = self._range_ids(field, minimum, maximum)
+            candidates = ids if candidates is None else candidates & ids
+        if amount is not None and self.amount_range:
+            ids = self._amount_ids(amount)
+            candidates = ids if candidates is None else candidates & ids
+        if candidates is None:
+            candidates = set(self.docs)
+        for field, value in (equals or {}).items():
+            if value is not None:
+                candidates = {doc_id for doc_id in candidates if self.docs[doc_id].get(field) == value}
+
+        if sort:
+            field = sort.lstrip('-')
+            present = [doc_id for doc_id in candidates if self.docs[doc_id].get(field) is not None]
+            missing = sorted(candidates.difference(present))
+            ordered = sorted(
+                present,
+                key=lambda doc_id: (self.docs[doc_id][field], doc_id),
+                reverse=sort.startswith('-')
+            ) + missing
+        else:
+            ordered = sorted(candidates, key=lambda doc_id: (-scores.get(doc_id, 0), self.docs[doc_id].get('name', '')))
+
+        page = []
+        for doc_id in ordered[offset:offset + limit]:
+            doc = dict(self.docs[doc_id])
+            if scores:
+                doc['score'] = round(scores[doc_id], 3)
+            page.append(doc)
+        return len(ordered), page
@@ -0,0 +1,74 @@
+"""
+Request coalescing for expensive reads.
+
+Handlers decorated with @coalesce share one in-flight execution between
+concurrent calls with the same key: the first caller runs the handler and
+the rest await its result. With `stale_seconds`, a finished result is also
+served to calls arriving shortly afterwards. Coalescing is per worker
+process.
+
+The key must capture everything the result depends on, including the
+caller's permissions (e.g. their role), since every caller sharing a key
+gets the same result or the same exception.
+"""
+import asyncio
+import copy
+import functools
+import time
+
+# Expired results are swept once this many keys are cached
+MAX_CACHED_KEYS = 256
+
+class SingleFlight:
+    def __init__(self, stale_seconds=0.0):
+        self.stale_seconds = stale_seconds
+        self.in_flight = {}  # key -> task
+        self.results = {}  # key -> (expires at, result)
+        self.stats = {"executed": 0, "coalesced": 0, "cached": 0}
+
+    async def do(self, key, run):
+        """Result of `await run()`, shared with concurrent calls for the same key."""
+        cached = self.results.get(key)
+        if cached and cached[0] > time.monotonic():
+            self.stats["cached"] += 1
+            return copy.deepcopy(cached[1])
+
+        task = self.in_flight.get(key)
+        if task:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["executed"] += 1
+            # A task of its own, so one caller disconnecting doesn't cancel it for the others
+            task = asyncio.ensure_future(run())
+            self.in_flight[key] = task
+            task.add_done_callback(functools.partial(self._finished, key))
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def _finished(self, key, task):
+        self.in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None or not self.stale_seconds:
+            return
+        now = time.monotonic()
+        if len(self.results) >= MAX_CACHED_KEYS:
+            self.results = {k: entry for k, entry in self.results.items() if entry[0] > now}
+        self.results[key] = (now + self.stale_seconds, task.result())
+
+# Handler name -> its SingleFlight, for metrics
+flights = {}
+
+def coalesce(key, stale_seconds=0.0):
+    """Decorator for async handlers; `key(**kwargs)` returns a hashable key for a call.
+
+    Keyword arguments only, which is how FastAPI calls handlers.
+    """
+    def decorator(handler):
+        flight = flights[handler.__name__] = SingleFlight(stale_seconds)
+
+        @functools.wraps(handler)
+        async def wrapper(**kwargs):
+            return await flight.do(key(**kwargs), lambda: handler(**kwargs))
+        return wrapper
+    return decorator
+
+def coalescing_stats():
+    return {name: dict(flight.stats) for name, flight in flights.items()}
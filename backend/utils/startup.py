@@ -0,0 +1,26 @@
+"""
+Worker start-up timings and readiness.
+
+The lifespan records how long each start-up phase takes. Warm-up (opening
+database connections, building the catalog search indexes) runs after the
+worker starts accepting requests; until it has finished the readiness
+endpoint answers 503, so load balancers keep traffic on warm workers.
+"""
+import time
+from contextlib import contextmanager
+
+class StartupProfile:
+    def __init__(self):
+        self.phases = {}  # phase name -> milliseconds
+        self.ready = False
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def report(self):
+        return {"status": "ready" if self.ready else "warming_up", "phases_ms": dict(self.phases)}
@@ -0,0 +1,143 @@
+"""
+Resumable document uploads.
+
+Clients create an upload session, then PATCH the file body in one or more
+requests, each starting at the session's current offset. Request bodies are
+streamed straight into storage chunk by chunk, so at most one chunk per
+request is held in memory, and progress is committed after every chunk so
+an interrupted request can be resumed from the last committed offset.
+
+A request reserves the upload at its offset before writing anything and
+renews the reservation before every chunk, so a second request at the same
+offset is rejected instead of overwriting chunks. The reservation is a
+lease, so an upload whose request died can be resumed once it expires.
+"""
+import asyncio
+import hashlib
+import os
+import re
+from urllib.parse import quote
+from datetime import datetime, timedelta, timezone
+
+MAX_DOCUMENT_BYTES = int(os.environ.get('MAX_DOCUMENT_BYTES', 20 * 1024 * 1024))
+MAX_CONCURRENT_UPLOADS = int(os.environ.get('MAX_CONCURRENT_UPLOADS', 16))
+UPLOAD_SESSION_HOURS = 24
+# How long a request may go between chunks before another request can take the upload over
+UPLOAD_WRITER_LEASE_SECONDS = 60
+ALLOWED_CONTENT_TYPES = {"application/pdf", "image/jpeg", "image/png"}
+
+# Limits the upload and download requests streaming at once, so a burst of
+# large transfers can't monopolize the event loop and the Mongo pool.
+transfer_slots = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+
+class UploadConflict(Exception):
+    """The upload offset moved underneath this request."""
+
+class UploadTooLarge(Exception):
+    """The request body runs past the declared upload length."""
+
+async def reserve_upload(store, upload_id, writer, offset):
+    """Reserve (or renew) the upload at `offset` for `writer`; raises UploadConflict if it can't."""
+    now = datetime.now(timezone.utc)
+    lease_expires_at = now + timedelta(seconds=UPLOAD_WRITER_LEASE_SECONDS)
+    if not await store.reserve_upload(upload_id, writer, offset, now, lease_expires_at):
+        raise UploadConflict()
+
+async def receive_upload(store, upload, stream, writer):
+    """Append a request body stream to an upload; returns the new committed offset.
+
+    Reserves the upload for `writer`; the caller releases it once done,
+    after finalizing a complete upload.
+    """
+    chunk_size = store.chunk_size
+    committed = upload['offset']
+    n = upload['next_n']
+    buffer = bytearray(upload['pending'])
+    received = committed
+    await reserve_upload(store, upload['id'], writer, committed)
+
+    async for piece in stream:
+        received += len(piece)
+        if received > upload['length']:
+            raise UploadTooLarge()
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            # Renewed before every write, so a writer whose lease lapsed can't overwrite a newer one's chunks
+            await reserve_upload(store, upload['id'], writer, committed)
+            await store.write_chunk(upload['id'], n, bytes(buffer[:chunk_size]))
+            del buffer[:chunk_size]
+            n += 1
+            # Bytes still buffered aren't durable yet, so only whole chunks count
+            offset = n * chunk_size
+            if not await store.commit_progress(upload['id'], writer, committed, offset, n, b""):
+                raise UploadConflict()
+            committed = offset
+
+    offset = n * chunk_size + len(buffer)
+    if offset != committed:
+        if not await store.commit_progress(upload['id'], writer, committed, offset, n, bytes(buffer)):
+            raise UploadConflict()
+    return offset
+
+async def finalize_upload(store, upload_id):
+    """Turn a fully received upload into a stored file; returns the file record.
+
+    Call it while still holding the reservation from receive_upload.
+
+    The content hash is computed by streaming the stored chunks back, and an
+    upload identical to an existing file is replaced by a reference to it.
+    """
+    upload = await store.get_upload(upload_id)
+    if upload['pending']:
+        await store.write_chunk(upload_id, upload['next_n'], upload['pending'])
+
+    digest = hashlib.sha256()
+    async for chunk in store.iter_chunks(upload_id):
+        digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    existing = await store.find_by_hash(sha256)
+    if existing:
+        await store.discard_chunks(upload_id)
+        await store.finalize(upload_id, None)
+        return existing
+
+    file = {
+        "_id": upload_id,
+        "length": upload['length'],
+        "chunkSize": store.chunk_size,
+        "uploadDate": datetime.now(timezone.utc),
+        "filename": upload['filename'],
+        "metadata": {
+            "content_type": upload['content_type'],
+            "sha256": sha256,
+            "uploaded_by": upload['user_id']
+        }
+    }
+    await store.finalize(upload_id, file)
+    return file
+
+def parse_range(header, length):
+    """Parse a single `bytes=start-end` Range header into a half-open (start, end), or None."""
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(length - int(last), 0), length
+    else:
+        start = int(first)
+        end = min(int(last) + 1, length) if last else length
+    if start >= end:
+        return None
+    return start, end
+
+def content_disposition(filename):
+    """An attachment Content-Disposition header for a user-supplied filename.
+
+    `filename` gets an ASCII fallback with quotes, backslashes and control
+    characters replaced; `filename*` carries the exact name (RFC 5987).
+    """
+    fallback = "".join(c if 32 <= ord(c) < 127 and c not in '"\\' else "_" for c in filename)
+    return f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{quote(filename, safe="")}'
@@ -68,9 +68,13 @@ const Analytics = () => {
           <p className="text-gray-600">Platform performance and insights</p>
         </div>
         <Button
-          onClick={() => {
-            exportAnalyticsToPDF(stats, trends);
-            toast.success('Analytics report downloaded');
+          onClick={async () => {
+            try {
+              await exportAnalyticsToPDF();
+              toast.success('Analytics report downloaded');
+            } catch (error) {
+              toast.error('Failed to download report');
+            }
           }}
           data-testid="download-analytics-btn"
           className="bg-green-600 hover:bg-green-700 text-white"
@@ -161,9 +161,13 @@ const ApplicationDetail = () => {
           </div>
           <Button
             variant="outline"
-            onClick={() => {
-              exportApplicationToPDF(application, mfi);
-              toast.success('PDF downloaded successfully');
+            onClick={async () => {
+              try {
+                await exportApplicationToPDF(application);
+                toast.success('PDF downloaded successfully');
+              } catch (error) {
+                toast.error('Failed to download PDF');
+              }
             }}
             data-testid="download-pdf-btn"
             className="border-green-600 text-green-600 hover:bg-green-50"
@@ -9,7 +9,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '.
 import { FileText, Search, Download } from 'lucide-react';
 import { applicationAPI, mfiAPI } from '../utils/api';
 import { toast } from 'sonner';
-import { exportApplicationToPDF } from '../utils/pdfExport';
+import { exportApplicationToPDF, exportApplicationsToZIP } from '../utils/pdfExport';
 
 const Applications = () => {
   const { user } = useAuth();
@@ -32,8 +32,8 @@ const Applications = () => {
   const fetchData = async () => {
     try {
       const [appsRes, mfisRes] = await Promise.all([
-        applicationAPI.getAll(),
-        mfiAPI.getAll()
+        applicationAPI.getAll({ fields: 'summary' }),
+        mfiAPI.getAll({ fields: 'id,name' })
       ]);
       setApplications(appsRes.data);
       setFilteredApps(appsRes.data);
@@ -104,6 +104,24 @@ const Applications = () => {
             New Application
           </Button>
         )}
+        {(user?.role === 'officer' || user?.role === 'admin') && filteredApps.length > 0 && (
+          <Button
+            variant="outline"
+            onClick={async () => {
+              try {
+                await exportApplicationsToZIP(filteredApps.slice(0, 500));
+                toast.success('Reports downloaded successfully');
+              } catch (error) {
+                toast.error('Failed to download reports');
+              }
+            }}
+            data-testid="download-all-pdf-btn"
+            className="border-green-600 text-green-600 hover:bg-green-50"
+          >
+            <Download className="w-4 h-4 mr-2" />
+            Download All (ZIP)
+          </Button>
+        )}
       </div>
 
       {/* Filters */}
@@ -194,10 +212,14 @@ const Applications = () => {
                       <Button
                         variant="outline"
                         size="sm"
-                        onClick={(e) => {
+                        onClick={async (e) => {
                           e.stopPropagation();
-                          exportApplicationToPDF(app, mfi);
-                          toast.success('PDF downloaded successfully');
+                          try {
+                            await exportApplicationToPDF(app);
+                            toast.success('PDF downloaded successfully');
+                          } catch (error) {
+                            toast.error('Failed to download PDF');
+                          }
                         }}
                         data-testid={`download-pdf-btn-${app.id}`}
                         className="border-green-600 text-green-600 hover:bg-green-50"
@@ -28,8 +28,8 @@ const Dashboard = () => {
   const fetchData = async () => {
     try {
       const [appsRes, mfisRes] = await Promise.all([
-        applicationAPI.getAll(),
-        mfiAPI.getAll()
+        applicationAPI.getAll({ fields: 'summary' }),
+        mfiAPI.getAll({ fields: 'summary' })
       ]);
       setApplications(appsRes.data.slice(0, 5));
       setMfis(mfisRes.data.slice(0, 6));
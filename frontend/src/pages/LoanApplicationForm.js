@@ -19,6 +19,8 @@ const LoanApplicationForm = () => {
   const [mfi, setMfi] = useState(null);
   const [currentStep, setCurrentStep] = useState(1);
   const [loading, setLoading] = useState(false);
+  // One key per form so retried submissions don't create duplicate applications
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
   const [formData, setFormData] = useState({
     business_name: '',
     business_type: '',
@@ -97,7 +99,7 @@ const LoanApplicationForm = () => {
         loan_amount: parseFloat(formData.loan_amount),
         loan_purpose: formData.loan_purpose,
         tenure_months: parseInt(formData.tenure_months)
-      });
+      }, idempotencyKey);
       toast.success('Application submitted successfully!');
       navigate('/applications');
     } catch (error) {
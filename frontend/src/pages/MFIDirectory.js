@@ -20,15 +20,24 @@ const MFIDirectory = () => {
   }, []);
 
   useEffect(() => {
-    if (searchTerm) {
-      const filtered = mfis.filter(mfi =>
-        mfi.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        mfi.description?.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-      setFilteredMfis(filtered);
-    } else {
+    if (!searchTerm.trim()) {
       setFilteredMfis(mfis);
+      return;
     }
+    // Debounce so we query the server once the user pauses typing
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await mfiAPI.search({ q: searchTerm, page_size: 100 });
+        if (!cancelled) setFilteredMfis(response.data.results);
+      } catch (error) {
+        if (!cancelled) toast.error('Search failed');
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
   }, [searchTerm, mfis]);
 
   const fetchMFIs = async () => {
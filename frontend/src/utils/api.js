@@ -37,15 +37,18 @@ export default api;
 
 // API methods
 export const mfiAPI = {
-  getAll: () => api.get('/mfis'),
+  getAll: (params) => api.get('/mfis', { params }),
   getById: (id) => api.get(`/mfis/${id}`),
+  search: (params) => api.get('/mfis/search', { params }),
   create: (data) => api.post('/mfis', data),
 };
 
 export const applicationAPI = {
-  getAll: () => api.get('/applications'),
+  getAll: (params) => api.get('/applications', { params }),
   getById: (id) => api.get(`/applications/${id}`),
-  create: (data) => api.post('/applications', data),
+  create: (data, idempotencyKey) => api.post('/applications', data, {
+    headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {},
+  }),
   update: (id, data) => api.patch(`/applications/${id}`, data),
 };
 
@@ -54,7 +57,13 @@ export const analyticsAPI = {
   getTrends: () => api.get('/analytics/trends'),
 };
 
+export const reportAPI = {
+  application: (id) => api.get(`/applications/${id}/report`, { responseType: 'blob' }),
+  applications: (ids) => api.post('/reports/applications', { application_ids: ids }, { responseType: 'blob' }),
+  portfolio: () => api.get('/analytics/report', { responseType: 'blob' }),
+};
+
 export const notificationAPI = {
-  getAll: () => api.get('/notifications'),
+  getAll: (params) => api.get('/notifications', { params }),
   markRead: (id) => api.patch(`/notifications/${id}/read`),
 };
@@ -0,0 +1,49 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# The backend is a flat package of modules imported by name, as when it's run
+# from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Set before server is imported, since it reads its settings at import time
+os.environ["REPOSITORY_BACKEND"] = "memory"
+os.environ["BACKGROUND_JOBS"] = "0"
+os.environ["RATE_LIMIT_BURST"] = "100000"
+
+from fastapi.testclient import TestClient
+
+from repositories.memory import MemoryRepositories
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def repos():
+    return MemoryRepositories()
+
+
+@pytest.fixture
+def client():
+    import server
+    # Entering the client runs the lifespan, which opens fresh in-memory repositories
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def register(client):
+    """Register a user with `role`; returns (user id, auth headers)."""
+    def register(email, role="borrower"):
+        response = client.post(
+            "/api/auth/register", json={"email": email, "password": "secret", "name": email, "role": role}
+        )
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return body["id"], {"Authorization": f"Bearer {body['token']}"}
+    return register
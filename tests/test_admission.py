@@ -0,0 +1,40 @@
+"""Rate limiting and load shedding."""
+import pytest
+
+import server
+from utils.admission import AdmissionController, TokenBucketLimiter
+from utils.auth import create_access_token
+
+
+def test_shed_requests_dont_use_up_the_rate_limit():
+    controller = AdmissionController(TokenBucketLimiter(per_minute=60, burst=2), max_in_flight=1)
+    controller.in_flight = 1
+    for _ in range(5):
+        assert controller.admit("user:1", 1)[0] == 503
+
+    controller.in_flight = 0
+    assert controller.admit("user:1", 1) is None
+    assert controller.admit("user:1", 1) is None
+    assert controller.admit("user:1", 1)[0] == 429
+    assert controller.stats == {"admitted": 2, "throttled": 1, "shed_concurrency": 5, "shed_overload": 0}
+
+
+def test_overload_lowers_the_concurrency_cap():
+    controller = AdmissionController(TokenBucketLimiter(per_minute=60, burst=100), max_in_flight=8)
+    controller.in_flight = 2
+    assert controller.admit("user:1", 1) is None
+    controller.loop_lag_ms = 10000
+    assert controller.admit("user:1", 1)[0] == 503
+    assert controller.stats["shed_overload"] == 1
+
+
+@pytest.mark.anyio
+async def test_rate_limit_key_doesnt_look_up_session_cookies():
+    # No app in the scope, so any repository lookup would fail
+    def scope(headers):
+        return {"type": "http", "headers": headers, "client": ("10.0.0.1", 1234)}
+
+    assert await server.rate_limit_key(scope([(b"cookie", b"session_token=made-up")])) == "ip:10.0.0.1"
+    token = create_access_token({"user_id": "u1"}).encode()
+    assert await server.rate_limit_key(scope([(b"authorization", b"Bearer " + token)])) == "user:u1"
+    assert await server.rate_limit_key(scope([(b"authorization", b"Bearer forged")])) == "ip:10.0.0.1"
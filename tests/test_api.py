@@ -0,0 +1,119 @@
+"""The API running on the in-memory repositories."""
+
+MFI = {"name": "Test MFI", "min_loan_amount": 5000, "max_loan_amount": 500000, "interest_rate": 20, "processing_time_days": 7}
+APPLICATION = {
+    "business_name": "Shop",
+    "business_type": "Retail",
+    "business_age_years": 2,
+    "monthly_revenue": 5000,
+    "loan_amount": 20000,
+    "loan_purpose": "Stock",
+    "tenure_months": 12
+}
+
+
+def test_register_login_and_me(client, register):
+    user_id, headers = register("borrower@example.com")
+
+    me = client.get("/api/auth/me", headers=headers)
+    assert me.status_code == 200
+    assert me.json()["id"] == user_id
+
+    login = client.post("/api/auth/login", json={"email": "borrower@example.com", "password": "secret"})
+    assert login.status_code == 200
+    assert login.json()["id"] == user_id
+    assert client.post("/api/auth/login", json={"email": "borrower@example.com", "password": "wrong"}).status_code == 401
+    assert client.post(
+        "/api/auth/register", json={"email": "borrower@example.com", "password": "x", "name": "B"}
+    ).status_code == 400
+
+
+def test_logout_revokes_token(client, register):
+    _, headers = register("borrower@example.com")
+    _, other = register("other@example.com")
+
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+    assert client.get("/api/auth/me", headers=other).status_code == 200
+
+
+def test_application_lifecycle(client, register):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    officer_id, officer = register("officer@example.com", "officer")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    assert client.patch(
+        f"/api/users/{officer_id}/role", json={"role": "officer", "mfi_id": mfi_id}, headers=admin
+    ).status_code == 200
+
+    created = client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=borrower)
+    assert created.status_code == 200
+    app_id = created.json()["id"]
+    assert created.json()["status"] == "submitted"
+
+    assert [app["id"] for app in client.get("/api/applications", headers=borrower).json()] == [app_id]
+    assert [app["id"] for app in client.get("/api/applications", headers=officer).json()] == [app_id]
+    assert client.get(f"/api/applications/{app_id}", headers=borrower).json()["loan_amount"] == 20000
+
+    # Borrowers can't decide their own applications
+    assert client.patch(f"/api/applications/{app_id}", json={"status": "approved"}, headers=borrower).status_code == 403
+    approved = client.patch(f"/api/applications/{app_id}", json={"status": "approved"}, headers=officer)
+    assert approved.status_code == 200
+    assert client.get(f"/api/applications/{app_id}", headers=borrower).json()["status"] == "approved"
+
+    history = client.get(f"/api/applications/{app_id}/history", headers=borrower).json()
+    assert [event["to_status"] for event in history] == ["submitted", "approved"]
+
+
+def test_officers_only_see_their_mfi(client, register):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    officer_id, officer = register("officer@example.com", "officer")
+    mine = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    theirs = client.post("/api/mfis", json={**MFI, "name": "Other MFI"}, headers=admin).json()["id"]
+
+    # Unassigned officers can't see any applications
+    assert client.get("/api/applications", headers=officer).status_code == 403
+    client.patch(f"/api/users/{officer_id}/role", json={"role": "officer", "mfi_id": mine}, headers=admin)
+
+    client.post("/api/applications", json={**APPLICATION, "mfi_id": mine}, headers=borrower)
+    other = client.post("/api/applications", json={**APPLICATION, "mfi_id": theirs}, headers=borrower).json()["id"]
+
+    assert [app["mfi_id"] for app in client.get("/api/applications", headers=officer).json()] == [mine]
+    assert client.get(f"/api/applications/{other}", headers=officer).status_code == 403
+    assert len(client.get("/api/applications", headers=admin).json()) == 2
+
+
+def test_officers_only_sync_deletions_from_their_mfi(client, register, monkeypatch):
+    from utils import maintenance
+
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    officer_id, officer = register("officer@example.com", "officer")
+    mine = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    theirs = client.post("/api/mfis", json={**MFI, "name": "Other MFI"}, headers=admin).json()["id"]
+    client.patch(f"/api/users/{officer_id}/role", json={"role": "officer", "mfi_id": mine}, headers=admin)
+    app_ids = [
+        client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=borrower).json()["id"]
+        for mfi_id in (mine, theirs)
+    ]
+    for app_id in app_ids:
+        client.patch(f"/api/applications/{app_id}", json={"status": "rejected"}, headers=admin)
+
+    # Archiving deletes the applications, leaving tombstones
+    monkeypatch.setattr(maintenance, "APPLICATION_ARCHIVE_MONTHS", 0)
+    client.portal.call(maintenance.archive_closed_applications, client.app.state.repositories)
+
+    assert client.get("/api/sync", headers=officer).json()["deleted"]["applications"] == [app_ids[0]]
+    assert sorted(client.get("/api/sync", headers=admin).json()["deleted"]["applications"]) == sorted(app_ids)
+
+
+def test_admins_claim_from_one_mfi_queue(client, register):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    app_id = client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=borrower).json()["id"]
+
+    assert client.post("/api/queue/claim", headers=admin).status_code == 400
+    claimed = client.post("/api/queue/claim", params={"mfi_id": mfi_id}, headers=admin).json()
+    assert [app["id"] for app in claimed] == [app_id]
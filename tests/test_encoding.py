@@ -0,0 +1,60 @@
+"""Accept header negotiation and the compact list encodings."""
+import json
+
+import pytest
+
+from utils.encoding import COLUMNAR_JSON, JSON, MSGPACK, accepts_gzip, choose_media_type, encode, to_columnar
+
+from tests.test_api import MFI
+
+# Optional in the server too, which then only offers the JSON encodings
+msgpack = pytest.importorskip("msgpack")
+
+ROWS = [{"id": "a", "name": "Ä", "rate": 1.5}, {"id": "b", "name": None, "extra": [1, 2]}]
+
+
+def test_choose_media_type_follows_quality_values():
+    assert choose_media_type(None) == JSON
+    assert choose_media_type("*/*") == JSON
+    assert choose_media_type("application/msgpack") == MSGPACK
+    assert choose_media_type("application/json;q=0.5, application/msgpack;q=0.9") == MSGPACK
+    assert choose_media_type(f"{MSGPACK};q=0.2, {COLUMNAR_JSON}") == COLUMNAR_JSON
+    assert choose_media_type("application/msgpack;q=0, text/html") == JSON
+    assert choose_media_type("application/msgpack;q=oops") == JSON
+
+
+def test_accepts_gzip():
+    assert accepts_gzip("gzip, deflate")
+    assert accepts_gzip("br;q=1.0, GZIP;q=0.5")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("deflate")
+    assert not accepts_gzip(None)
+
+
+def test_encodings_round_trip():
+    assert json.loads(encode(ROWS, JSON)) == ROWS
+    assert msgpack.unpackb(encode(ROWS, MSGPACK)) == ROWS
+    columnar = json.loads(encode(ROWS, COLUMNAR_JSON))
+    assert columnar == to_columnar(ROWS)
+    assert columnar["columns"] == ["id", "name", "rate", "extra"]
+    # Rebuilt rows have every column, with None where a row had no value
+    rebuilt = [dict(zip(columnar["columns"], row)) for row in columnar["rows"]]
+    assert rebuilt == [{"extra": None, **ROWS[0]}, {"rate": None, **ROWS[1]}]
+    # Anything but a list is left as is
+    assert json.loads(encode({"total": 1}, COLUMNAR_JSON)) == {"total": 1}
+
+
+def test_list_endpoint_negotiates_and_compresses(client, register):
+    _, admin = register("admin@example.com", "admin")
+    for i in range(20):
+        client.post("/api/mfis", json={**MFI, "name": f"MFI {i}"}, headers=admin)
+    plain = client.get("/api/mfis", headers={"Accept-Encoding": "identity"})
+    assert plain.headers["content-type"] == JSON
+    assert "content-encoding" not in plain.headers
+
+    packed = client.get("/api/mfis", headers={"Accept": MSGPACK, "Accept-Encoding": "gzip"})
+    assert packed.headers["content-type"] == MSGPACK
+    assert packed.headers["content-encoding"] == "gzip"
+    assert "Accept" in packed.headers["vary"]
+    # The test client has already gunzipped the body
+    assert msgpack.unpackb(packed.content) == plain.json()
@@ -0,0 +1,52 @@
+"""Sparse fieldsets (?fields=) on list endpoints."""
+import pytest
+
+from models.application import APPLICATION_SUMMARY_FIELDS, LoanApplication
+from models.mfi import MFI_SUMMARY_FIELDS
+from repositories.mongo import _projection
+from utils.fields import parse_fields
+
+from tests.test_api import APPLICATION, MFI
+
+
+def test_parse_fields():
+    assert parse_fields(None, LoanApplication, APPLICATION_SUMMARY_FIELDS) is None
+    assert parse_fields(" ", LoanApplication, APPLICATION_SUMMARY_FIELDS) is None
+    # id always comes first, and duplicates are dropped
+    assert parse_fields("status, loan_amount,status", LoanApplication, APPLICATION_SUMMARY_FIELDS) == ["id", "status", "loan_amount"]
+    assert parse_fields("summary,officer_notes", LoanApplication, APPLICATION_SUMMARY_FIELDS) == APPLICATION_SUMMARY_FIELDS + ["officer_notes"]
+    with pytest.raises(ValueError, match="Unknown field 'password_hash'"):
+        parse_fields("status,password_hash", LoanApplication, APPLICATION_SUMMARY_FIELDS)
+
+
+def test_mongo_projection():
+    assert _projection(None) == {"_id": 0}
+    assert _projection(["id", "status"]) == {"_id": 0, "id": 1, "status": 1}
+
+
+def test_list_endpoints_return_only_requested_fields(client, register):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    officer_id, officer = register("officer@example.com", "officer")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    client.patch(f"/api/users/{officer_id}/role", json={"role": "officer", "mfi_id": mfi_id}, headers=admin)
+    client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=borrower)
+
+    mfis = client.get("/api/mfis", params={"fields": "name"}).json()
+    assert [set(mfi) for mfi in mfis] == [{"id", "name"}]
+    summary = client.get("/api/mfis", params={"fields": "summary"}).json()
+    assert set(summary[0]) <= set(MFI_SUMMARY_FIELDS)
+    assert "description" not in summary[0]
+
+    # Officers' lists are filtered by MFI, which mustn't leak into the fields returned
+    for headers in (borrower, officer):
+        apps = client.get("/api/applications", params={"fields": "status,loan_amount"}, headers=headers).json()
+        assert apps == [{"id": apps[0]["id"], "status": "submitted", "loan_amount": 20000}]
+
+
+def test_unknown_fields_are_rejected(client, register):
+    _, borrower = register("borrower@example.com")
+    response = client.get("/api/applications", params={"fields": "status,nope"}, headers=borrower)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown field 'nope'"
+    assert client.get("/api/mfis", params={"fields": "password_hash"}).status_code == 400
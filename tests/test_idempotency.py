@@ -0,0 +1,53 @@
+"""Idempotency-Key handling on application creation."""
+from fastapi import HTTPException
+
+import server
+from tests.test_api import APPLICATION, MFI
+
+
+def test_retry_with_the_same_key_replays_the_first_response(client, register):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    body = {**APPLICATION, "mfi_id": mfi_id}
+    headers = {**borrower, "Idempotency-Key": "k1"}
+
+    first = client.post("/api/applications", json=body, headers=headers)
+    retry = client.post("/api/applications", json=body, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert len(client.get("/api/applications", headers=borrower).json()) == 1
+
+    # Keys are per user
+    _, other = register("other@example.com")
+    assert client.post("/api/applications", json=body, headers={**other, "Idempotency-Key": "k1"}).json()["id"] != first.json()["id"]
+
+
+def test_reusing_a_key_for_a_different_body_is_rejected(client, register):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    headers = {**borrower, "Idempotency-Key": "k1"}
+
+    assert client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=headers).status_code == 200
+    changed = client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id, "loan_amount": 30000}, headers=headers)
+    assert changed.status_code == 422
+    assert len(client.get("/api/applications", headers=borrower).json()) == 1
+
+
+def test_a_failed_request_releases_its_key(client, register, monkeypatch):
+    _, borrower = register("borrower@example.com")
+    headers = {**borrower, "Idempotency-Key": "k1"}
+    body = {**APPLICATION, "mfi_id": "m1"}
+
+    async def unavailable(*args):
+        raise HTTPException(status_code=503, detail="Try again")
+    with monkeypatch.context() as patch:
+        patch.setattr(server, "insert_application", unavailable)
+        assert client.post("/api/applications", json=body, headers=headers).status_code == 503
+
+    retry = client.post("/api/applications", json=body, headers=headers)
+    assert retry.status_code == 200
+    assert "Idempotent-Replayed" not in retry.headers
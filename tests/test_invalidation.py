@@ -0,0 +1,113 @@
+"""Cross-worker invalidation: two buses, as in two workers, sharing one cache_invalidations store."""
+import asyncio
+import copy
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import OperationFailure
+
+import utils.invalidation
+from repositories.cached import CachedUserRepository, MFIS, PublishingMFIRepository
+from repositories.memory import MemoryMFIRepository, MemoryUserRepository
+from utils.invalidation import CHANGE_STREAMS_UNSUPPORTED, MongoInvalidationBus, VersionedCache
+from utils.search import SearchIndex
+
+pytestmark = pytest.mark.anyio
+
+
+class SharedInvalidations:
+    """The parts of a cache_invalidations collection the bus uses, on a standalone server."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "version": 0})
+        doc["version"] += update["$inc"]["version"]
+        doc.update(update["$set"])
+        return copy.deepcopy(doc)
+
+    async def find(self, query):
+        for doc in list(self.docs.values()):
+            yield copy.deepcopy(doc)
+
+    def watch(self):
+        raise OperationFailure("$changeStream is only supported on replica sets", code=CHANGE_STREAMS_UNSUPPORTED)
+
+
+@pytest.fixture
+async def workers(monkeypatch):
+    monkeypatch.setattr(utils.invalidation, "CACHE_POLL_SECONDS", 0.01)
+    store = SimpleNamespace(cache_invalidations=SharedInvalidations())
+    buses = [MongoInvalidationBus(store), MongoInvalidationBus(store)]
+    for bus in buses:
+        await bus.start()
+    yield buses
+    for bus in buses:
+        await bus.stop()
+
+
+async def until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+async def test_publish_on_one_worker_evicts_the_others_cached_copy(workers):
+    first, second = workers
+    cache = VersionedCache(first, "users", ttl_seconds=60)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"id": "u1", "role": "borrower"}
+
+    await cache.get("u1", load)
+    await cache.get("u1", load)
+    assert len(loads) == 1
+
+    await second.publish("users", "u1")
+    await until(lambda: "u1" not in cache.entries)
+    await cache.get("u1", load)
+    assert len(loads) == 2
+
+
+async def test_role_change_reaches_the_other_workers_user_cache(workers):
+    users = MemoryUserRepository()  # the shared database
+    await users.create({"id": "u1", "email": "o@example.com", "role": "borrower"})
+    first, second = CachedUserRepository(users, workers[0]), CachedUserRepository(users, workers[1])
+
+    assert (await first.get("u1"))["role"] == "borrower"
+    await second.update("u1", {"role": "officer"})
+    await until(lambda: "u1" not in first.cache.entries)
+    assert (await first.get("u1"))["role"] == "officer"
+
+
+async def test_missed_invalidations_drop_the_whole_cache(workers):
+    first, second = workers
+    first_cache = VersionedCache(first, "users", ttl_seconds=60)
+    await first_cache.get("u1", lambda: asyncio.sleep(0, {"id": "u1"}))
+    # Two invalidations between the first worker's polls; only the last key is kept
+    await second.publish("users", "u2")
+    await second.publish("users", "u3")
+    await until(lambda: not first_cache.entries)
+
+
+async def test_new_mfi_is_added_to_the_other_workers_index_without_a_rebuild(workers):
+    mfis = MemoryMFIRepository()
+    await mfis.create({"id": "m1", "name": "Grameen", "min_loan_amount": 1000, "max_loan_amount": 5000})
+    index = SearchIndex(text_fields={"name": 1.0}, amount_range=("min_loan_amount", "max_loan_amount"))
+    workers[0].subscribe(MFIS, index.invalidation_handler(mfis.get))
+    await index.ensure_built(lambda: mfis.list(None))
+    generation = index.generation
+
+    await PublishingMFIRepository(mfis, workers[1]).create({"id": "m2", "name": "BRAC", "min_loan_amount": 1000, "max_loan_amount": 5000})
+    await until(lambda: "m2" in index.docs)
+    assert index.generation == generation
+    assert [doc["id"] for doc in index.search(query="brac")[1]] == ["m2"]
+
+    # Without a key the index can't know what changed, so it rebuilds
+    await workers[1].publish(MFIS)
+    await until(lambda: not index.built)
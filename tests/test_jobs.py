@@ -0,0 +1,74 @@
+"""Background job leases and attempts on the in-memory job repository."""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.jobs import JobScheduler
+
+pytestmark = pytest.mark.anyio
+
+EXPIRED_LEASE = "2000-01-01T00:00:00+00:00"
+
+
+async def wait_for_status(jobs, job_id, status):
+    for _ in range(200):
+        job = await jobs.get(job_id)
+        if job['status'] == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job is {job['status']}, not {status}")
+
+
+async def test_every_claim_counts_as_an_attempt(repos):
+    scheduler = JobScheduler(repos.jobs, None)
+
+    @scheduler.one_shot("crashes_its_worker", max_attempts=3)
+    async def handler(context, payload):
+        pass
+
+    await scheduler.enqueue("crashes_its_worker")
+    now = datetime.now(timezone.utc).isoformat()
+    # A worker that dies leaves the job running under a lease that expires
+    claimed = [await repos.jobs.claim_due(["crashes_its_worker"], "dead", now, EXPIRED_LEASE) for _ in range(3)]
+    assert [job['attempts'] for job in claimed] == [1, 2, 3]
+
+
+async def test_job_whose_worker_keeps_dying_fails_when_attempts_run_out(repos):
+    scheduler = JobScheduler(repos.jobs, None, poll_seconds=0.01)
+    runs = []
+
+    @scheduler.one_shot("crashes_its_worker", max_attempts=3)
+    async def handler(context, payload):
+        runs.append(payload)
+
+    job = await scheduler.enqueue("crashes_its_worker")
+    now = datetime.now(timezone.utc).isoformat()
+    for _ in range(3):
+        await repos.jobs.claim_due(["crashes_its_worker"], "dead", now, EXPIRED_LEASE)
+
+    await scheduler.start()
+    try:
+        failed = await wait_for_status(repos.jobs, job['id'], "failed")
+    finally:
+        await scheduler.stop()
+    assert runs == []
+    assert failed['attempts'] == 4
+    assert "Gave up after 3 attempts" in failed['error']
+
+
+async def test_successful_job_runs_once(repos):
+    scheduler = JobScheduler(repos.jobs, None, poll_seconds=0.01)
+
+    @scheduler.one_shot("works")
+    async def handler(context, payload):
+        return {"echo": payload['value']}
+
+    job = await scheduler.enqueue("works", {"value": 1})
+    await scheduler.start()
+    try:
+        done = await wait_for_status(repos.jobs, job['id'], "succeeded")
+    finally:
+        await scheduler.stop()
+    assert done['result'] == {"echo": 1}
+    assert done['attempts'] == 1
@@ -0,0 +1,52 @@
+"""Maintenance jobs on the in-memory repositories."""
+import os
+import time
+
+import pytest
+
+from utils import maintenance
+from utils.jobs import JobScheduler
+
+from tests.test_repositories import make_application
+
+pytestmark = pytest.mark.anyio
+
+
+def test_maintenance_jobs_are_registered(repos):
+    scheduler = JobScheduler(repos.jobs, repos)
+    maintenance.register_jobs(scheduler)
+    assert {"reconcile_archive_totals", "expire_exports"} <= scheduler.handlers.keys()
+
+
+async def test_reconciliation_counts_batches_a_crash_left_out(repos, monkeypatch):
+    await repos.applications.create(make_application("a1", status="rejected", created_at="2026-01-05T00:00:00+00:00"))
+    await repos.applications.create(make_application("a2", status="disbursed", loan_amount=5000.0))
+    monkeypatch.setattr(maintenance, "APPLICATION_ARCHIVE_MONTHS", 0)
+
+    async def crash(applications):
+        raise RuntimeError("worker died")
+    with monkeypatch.context() as patch:
+        patch.setattr(repos.application_archive, "add_to_totals", crash)
+        with pytest.raises(RuntimeError):
+            await maintenance.archive_closed_applications(repos)
+    assert (await repos.application_archive.totals("m1"))["statuses"] == {}
+
+    assert await maintenance.reconcile_archive_totals(repos) == {"applications": 2}
+    totals = await repos.application_archive.totals("m1")
+    assert totals["statuses"] == {
+        "rejected": {"count": 1, "loan_amount": 20000.0},
+        "disbursed": {"count": 1, "loan_amount": 5000.0}
+    }
+    assert totals["months"] == {(2026, 1): {"count": 2, "total_amount": 25000.0}}
+
+
+async def test_expire_exports_deletes_old_files(repos, monkeypatch, tmp_path):
+    monkeypatch.setattr(maintenance, "EXPORT_DIR", tmp_path)
+    old, new = tmp_path / "old.ndjson.gz", tmp_path / "new.zip"
+    old.write_bytes(b"x")
+    new.write_bytes(b"x")
+    expired = time.time() - (maintenance.EXPORT_RETENTION_DAYS + 1) * 24 * 60 * 60
+    os.utime(old, (expired, expired))
+
+    assert await maintenance.expire_exports(repos) == {"deleted": 1}
+    assert [path.name for path in tmp_path.iterdir()] == ["new.zip"]
@@ -0,0 +1,96 @@
+"""Sampling profiles and the event-loop stall watchdog."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.profiling import LoopWatchdog, SamplingProfiler, collapse_stack
+
+
+def spin_until(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_collapse_stack_is_root_first():
+    def inner():
+        import sys
+        return collapse_stack(sys._getframe())
+
+    def outer():
+        return inner()
+
+    frames = outer().split(";")
+    assert frames[-2:] == [
+        "test_collapse_stack_is_root_first.<locals>.outer (test_profiling.py)",
+        "test_collapse_stack_is_root_first.<locals>.inner (test_profiling.py)"
+    ]
+    assert frames.index("test_collapse_stack_is_root_first (test_profiling.py)") < len(frames) - 2
+
+
+def test_profile_samples_other_threads_as_collapsed_stacks():
+    stop = threading.Event()
+    busy = threading.Thread(target=spin_until, args=(stop,), name="busy")
+    busy.start()
+    try:
+        output = SamplingProfiler().profile(0.2, interval_ms=5)
+    finally:
+        stop.set()
+        busy.join()
+
+    lines = output.splitlines()
+    busy_lines = [line for line in lines if line.startswith("busy;")]
+    assert busy_lines and all("spin_until (test_profiling.py)" in line for line in busy_lines)
+    # `stack count`, most frequent first, and about one sample per interval
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert counts == sorted(counts, reverse=True)
+    assert 10 <= sum(int(line.rsplit(" ", 1)[1]) for line in busy_lines) <= 45
+    # The sampling thread leaves itself out
+    assert "_sample" not in output
+
+
+def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    with profiler.lock:
+        assert profiler.running
+        with pytest.raises(RuntimeError, match="already running"):
+            profiler.profile(0.01)
+    assert not profiler.running
+
+
+@pytest.mark.anyio
+async def test_watchdog_reports_a_blocked_loop():
+    def block_the_loop():
+        time.sleep(0.3)
+
+    watchdog = LoopWatchdog(threshold_ms=50)
+    await watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        assert watchdog.stalls == 0
+        block_the_loop()
+        # Let the heartbeat resume, so the stall's length is filled in
+        await asyncio.sleep(0.1)
+    finally:
+        await watchdog.stop()
+
+    metrics = watchdog.metrics()
+    assert metrics["stalls"] == 1
+    stall = metrics["recent"][0]
+    assert "block_the_loop (test_profiling.py)" in stall["stack"]
+    assert 200 <= stall["blocked_ms"] <= 500
+
+
+def test_profiling_routes_are_admin_only(client, register):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    assert client.post("/api/metrics/profile", params={"seconds": 1}, headers=borrower).status_code == 403
+    assert client.get("/api/metrics/loop-stalls", headers=borrower).status_code == 403
+
+    # Clamped to at least a second
+    response = client.post("/api/metrics/profile", params={"seconds": 0.1, "interval_ms": 20}, headers=admin)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
+    assert set(client.get("/api/metrics/loop-stalls", headers=admin).json()) == {"threshold_ms", "stalls", "recent"}
@@ -0,0 +1,34 @@
+"""Application PDF reports."""
+import io
+import zipfile
+
+import server
+from utils.pdf import render_application_pdf
+
+from tests.test_api import APPLICATION, MFI
+
+
+def test_officer_notes_are_not_parsed_as_markup():
+    app = {"id": "a1", **APPLICATION, "status": "approved", "officer_notes": "see <b>bold & <unclosed"}
+    assert render_application_pdf(app, "Test MFI").startswith(b"%PDF")
+
+
+def test_failed_renders_are_listed_as_missing(client, register, monkeypatch):
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    ok, broken = [
+        client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=borrower).json()["id"]
+        for _ in range(2)
+    ]
+
+    async def application_pdf(app, mfi_name=None):
+        if app['id'] == broken:
+            raise ValueError("render failed")
+        return render_application_pdf(app, mfi_name)
+    monkeypatch.setattr(server.renderer, "application_pdf", application_pdf)
+
+    response = client.post("/api/reports/applications", json={"application_ids": [ok, broken, "nope"]}, headers=admin)
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == [f"application-{ok[:8]}.pdf", "missing.txt"]
+    assert archive.read("missing.txt").decode().split("\n") == ["nope", broken]
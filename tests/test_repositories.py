@@ -0,0 +1,179 @@
+"""Repository contract, exercised against the in-memory backend."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+def make_application(app_id, user_id="u1", mfi_id="m1", created_at="2026-01-01T00:00:00+00:00", **fields):
+    return {
+        "id": app_id,
+        "user_id": user_id,
+        "mfi_id": mfi_id,
+        "business_name": "Shop",
+        "business_type": "Retail",
+        "business_age_years": 2,
+        "monthly_revenue": 5000.0,
+        "loan_amount": 20000.0,
+        "loan_purpose": "Stock",
+        "tenure_months": 12,
+        "status": "submitted",
+        "priority": 0,
+        "documents": [],
+        "created_at": created_at,
+        "updated_at": created_at,
+        **fields
+    }
+
+
+async def test_users_create_get_update(repos):
+    user = {"id": "u1", "email": "a@example.com", "name": "A", "role": "borrower"}
+    await repos.users.create(user)
+    user["name"] = "changed after create"
+
+    assert (await repos.users.get("u1"))["name"] == "A"
+    assert (await repos.users.get_by_email("a@example.com"))["id"] == "u1"
+    assert await repos.users.get("missing") is None
+
+    updated = await repos.users.update("u1", {"role": "officer", "mfi_id": "m1"})
+    assert updated["role"] == "officer"
+    assert (await repos.users.get_by_email("a@example.com"))["mfi_id"] == "m1"
+    assert await repos.users.update("missing", {"role": "admin"}) is None
+
+
+async def test_sessions_create_get_delete(repos):
+    now = datetime.now(timezone.utc)
+    await repos.sessions.create({"user_id": "u1", "session_token": "live", "expires_at": now + timedelta(days=7)})
+    await repos.sessions.create({"user_id": "u1", "session_token": "old", "expires_at": now - timedelta(days=1)})
+    await repos.sessions.create({"user_id": "u2", "session_token": "gone", "expires_at": now + timedelta(days=7)})
+
+    assert (await repos.sessions.get_by_token("live"))["user_id"] == "u1"
+    await repos.sessions.delete_by_token("gone")
+    assert await repos.sessions.get_by_token("gone") is None
+
+    assert await repos.sessions.delete_expired(now) == 1
+    assert await repos.sessions.get_by_token("old") is None
+    assert await repos.sessions.get_by_token("live") is not None
+
+
+async def test_applications_create_get_list(repos):
+    await repos.applications.create(make_application("a1", created_at="2026-01-01T00:00:00+00:00"))
+    await repos.applications.create(make_application("a2", user_id="u2", created_at="2026-01-02T00:00:00+00:00"))
+    await repos.applications.create(make_application("a3", mfi_id="m2", created_at="2026-01-03T00:00:00+00:00"))
+
+    assert (await repos.applications.get("a2"))["user_id"] == "u2"
+    assert await repos.applications.get("missing") is None
+
+    # Newest first, optionally per borrower or per MFI
+    assert [app["id"] for app in await repos.applications.list()] == ["a3", "a2", "a1"]
+    assert [app["id"] for app in await repos.applications.list(limit=2)] == ["a3", "a2"]
+    assert [app["id"] for app in await repos.applications.list(user_id="u1")] == ["a3", "a1"]
+    assert [app["id"] for app in await repos.applications.list(mfi_id="m1")] == ["a2", "a1"]
+    assert [app["id"] for app in await repos.applications.list(user_id="u1", mfi_id="m1")] == ["a1"]
+
+    assert await repos.applications.list(fields=["id", "status"]) == [
+        {"id": "a3", "status": "submitted"}, {"id": "a2", "status": "submitted"}, {"id": "a1", "status": "submitted"}
+    ]
+
+
+async def test_applications_update(repos):
+    await repos.applications.create(make_application("a1"), {"id": "e1", "created_at": "2026-01-01T00:00:00+00:00"})
+    later = "2026-01-05T00:00:00+00:00"
+
+    updated = await repos.applications.update(
+        "a1", {"status": "approved", "updated_at": later}, {"id": "e2", "created_at": later}
+    )
+    assert updated["status"] == "approved"
+    assert (await repos.applications.get("a1"))["updated_at"] == later
+    assert await repos.applications.count(["approved"]) == 1
+    assert await repos.applications.count(["submitted"]) == 0
+    assert await repos.applications.total_loan_amount("approved", mfi_id="m1") == 20000.0
+
+    # A stale expected_updated_at loses the write
+    stale = await repos.applications.update(
+        "a1", {"status": "rejected"}, expected_updated_at="2026-01-01T00:00:00+00:00"
+    )
+    assert stale is None
+    assert (await repos.applications.get("a1"))["status"] == "approved"
+    assert await repos.applications.update("missing", {"status": "approved"}) is None
+
+    history = await repos.application_events.list_for_application("a1")
+    assert [event["to_status"] for event in history] == ["submitted", "approved"]
+
+
+async def test_claim_next_leases_in_priority_order(repos):
+    await repos.applications.create(make_application("low", created_at="2026-01-01T00:00:00+00:00"))
+    await repos.applications.create(make_application("high", priority=5, created_at="2026-01-02T00:00:00+00:00"))
+    now, lease = "2026-01-03T00:00:00+00:00", "2026-01-03T00:15:00+00:00"
+
+    await repos.applications.create(make_application("other", mfi_id="m2", priority=9))
+
+    assert (await repos.applications.claim_next("o1", now, lease, "m1"))["id"] == "high"
+    assert (await repos.applications.claim_next("o2", now, lease, "m1"))["id"] == "low"
+    assert await repos.applications.claim_next("o3", now, lease, "m1") is None
+    # Once the lease expires the application can be claimed again
+    assert (await repos.applications.claim_next("o3", lease, "2026-01-03T00:30:00+00:00", "m1"))["id"] == "high"
+
+
+async def test_archived_disbursed_loans_stay_on_collection_sheets(repos, monkeypatch):
+    from utils import maintenance
+
+    # Disbursed 13 months ago on a 24 month tenure, so archiving finds it mid-repayment
+    disbursed_at = (datetime.now(timezone.utc) - timedelta(days=30 * 13)).isoformat()
+    await repos.applications.create(make_application(
+        "a1", status="disbursed", tenure_months=24, created_at=disbursed_at, disbursed_at=disbursed_at
+    ))
+    await repos.applications.create(make_application("a2", status="disbursed", tenure_months=24))
+    await repos.centers.create_group({
+        "id": "g1", "center_id": "c1", "mfi_id": "m1", "name": "Group",
+        "members": [{"user_id": "u1", "name": "A"}]
+    })
+    monkeypatch.setattr(maintenance, "APPLICATION_ARCHIVE_MONTHS", 12)
+
+    assert (await maintenance.archive_closed_applications(repos))["archived"] == 1
+    assert await repos.applications.get("a1") is None
+
+    loans = [loan async for loan in repos.centers.stream_active_loans("m1")]
+    assert sorted(loan["application_id"] for loan in loans) == ["a1", "a2"]
+    assert all(loan["group_id"] == "g1" for loan in loans)
+
+
+async def test_interrupted_archiving_never_counts_an_application_twice(repos, monkeypatch):
+    from utils import maintenance
+
+    await repos.applications.create(make_application("a1", status="rejected"))
+    monkeypatch.setattr(maintenance, "APPLICATION_ARCHIVE_MONTHS", 0)
+
+    async def crash(app_ids):
+        raise RuntimeError("worker died")
+    with monkeypatch.context() as patch:
+        patch.setattr(repos.applications, "delete_many", crash)
+        with pytest.raises(RuntimeError):
+            await maintenance.archive_closed_applications(repos)
+
+    async def counted():
+        archived = (await repos.application_archive.totals("m1"))["statuses"]
+        return await repos.applications.count(mfi_id="m1") + sum(total["count"] for total in archived.values())
+
+    # The copy is archived but the application is still live
+    assert await repos.application_archive.get("a1") is not None
+    assert await counted() == 1
+    assert (await maintenance.archive_closed_applications(repos))["archived"] == 1
+    assert await counted() == 1
+
+
+async def test_expired_notifications_leave_tombstones(repos, monkeypatch, tmp_path):
+    from utils import maintenance
+
+    monkeypatch.setattr(maintenance, "ARCHIVE_DIR", tmp_path)
+    old = "2020-01-01T00:00:00+00:00"
+    await repos.notifications.create_many([
+        {"id": f"n{i}", "user_id": "u1", "message": "hi", "read": True, "created_at": old, "updated_at": old}
+        for i in range(3)
+    ])
+
+    assert (await maintenance.expire_read_notifications(repos))["archived"] == 3
+    assert await repos.notifications.list_for_user("u1") == []
+    deleted = await repos.tombstones.list_since("notifications", ("", ""), "u1")
+    assert sorted(tombstone["id"] for tombstone in deleted) == ["n0", "n1", "n2"]
@@ -0,0 +1,89 @@
+"""Catalog search ranking, filtering and paging."""
+from utils.search import SearchIndex
+
+
+def mfi(doc_id, name, requirements="", description="", interest_rate=20, min_loan_amount=5000, max_loan_amount=100000):
+    return {
+        "id": doc_id, "name": name, "requirements": requirements, "description": description,
+        "interest_rate": interest_rate, "processing_time_days": 7,
+        "min_loan_amount": min_loan_amount, "max_loan_amount": max_loan_amount
+    }
+
+
+def make_index(docs):
+    index = SearchIndex(
+        text_fields={"name": 3.0, "requirements": 2.0, "description": 1.0},
+        numeric_fields=["interest_rate", "processing_time_days"],
+        amount_range=("min_loan_amount", "max_loan_amount")
+    )
+    for doc in docs:
+        index.add(doc)
+    return index
+
+
+def ids(page):
+    return [doc["id"] for doc in page]
+
+
+def test_ranking_prefers_heavier_fields_and_closer_matches():
+    index = make_index([
+        mfi("desc", "Alpha Finance", description="loans for poultry farmers"),
+        mfi("name", "Poultry Credit"),
+        mfi("req", "Beta Finance", requirements="poultry business"),
+        mfi("prefix", "Gamma Finance", requirements="poultryfarm license"),
+        mfi("typo", "Delta Finance", requirements="pultry"),
+        mfi("none", "Unrelated Bank"),
+    ])
+    total, page = index.search("poultry")
+    # Exact name (3), requirements (2), requirements prefix (2 x 0.7), requirements typo (2 x 0.4), description (1)
+    assert total == 5
+    assert ids(page) == ["name", "req", "prefix", "desc", "typo"]
+    assert [doc["score"] for doc in page] == [3.0, 2.0, 1.4, 1.0, 0.8]
+
+
+def test_every_query_term_must_match():
+    index = make_index([mfi("a", "Rural Poultry Credit"), mfi("b", "Rural Savings"), mfi("c", "Poultry Loans")])
+    total, page = index.search("rural poultry")
+    assert (total, ids(page)) == (1, ["a"])
+    assert index.search("rural nothing") == (0, [])
+
+
+def test_filters_and_sorting():
+    index = make_index([
+        mfi("cheap", "Cheap", interest_rate=12, max_loan_amount=20000),
+        mfi("mid", "Mid", interest_rate=18),
+        mfi("dear", "Dear", interest_rate=25, min_loan_amount=50000, max_loan_amount=500000),
+    ])
+    assert ids(index.search(ranges={"interest_rate": (None, 20)}, sort="interest_rate")[1]) == ["cheap", "mid"]
+    assert ids(index.search(amount=30000, sort="interest_rate")[1]) == ["mid"]
+    assert ids(index.search(sort="-interest_rate")[1]) == ["dear", "mid", "cheap"]
+
+
+def test_pages_partition_the_results():
+    index = make_index([mfi(f"m{i:02d}", f"Finance {i:02d}", interest_rate=i) for i in range(25)])
+    pages = [index.search("finance", sort="interest_rate", offset=offset, limit=10) for offset in (0, 10, 20, 30)]
+    assert [total for total, _ in pages] == [25] * 4
+    assert [len(page) for _, page in pages] == [10, 10, 5, 0]
+    assert sum((ids(page) for _, page in pages), []) == [f"m{i:02d}" for i in range(25)]
+
+
+def test_reindexing_replaces_the_old_version():
+    index = make_index([mfi("a", "Poultry Credit")])
+    index.add(mfi("a", "Dairy Credit"))
+    assert index.search("poultry") == (0, [])
+    assert ids(index.search("dairy")[1]) == ["a"]
+    index.remove("a")
+    assert index.search("credit") == (0, [])
+
+
+def test_search_endpoint_pages_and_validates_sort(client, register):
+    from tests.test_api import MFI
+
+    _, admin = register("admin@example.com", "admin")
+    for i in range(5):
+        client.post("/api/mfis", json={**MFI, "name": f"Village Bank {i}", "interest_rate": 10 + i}, headers=admin)
+
+    page = client.get("/api/mfis/search", params={"q": "village", "sort": "interest_rate", "page": 2, "page_size": 2}).json()
+    assert (page["total"], page["page"]) == (5, 2)
+    assert [result["name"] for result in page["results"]] == ["Village Bank 2", "Village Bank 3"]
+    assert client.get("/api/mfis/search", params={"sort": "name"}).status_code == 400
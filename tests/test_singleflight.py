@@ -0,0 +1,102 @@
+"""Coalescing concurrent calls with SingleFlight."""
+import asyncio
+
+import pytest
+
+from utils.singleflight import SingleFlight, coalesce, flights
+
+pytestmark = pytest.mark.anyio
+
+
+class Counted:
+    """An expensive call that waits for `release` and counts how often it ran."""
+
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+async def test_concurrent_calls_share_one_execution():
+    flight, run, other_run = SingleFlight(), Counted({"rows": [1, 2]}), Counted({"rows": []})
+    waiters = [asyncio.ensure_future(flight.do("k", run)) for _ in range(5)]
+    other = asyncio.ensure_future(flight.do("other", other_run))
+    await asyncio.sleep(0)
+    run.release.set()
+
+    results = await asyncio.gather(*waiters)
+    assert run.calls == 1
+    assert results == [{"rows": [1, 2]}] * 5
+    # Each caller gets its own copy
+    results[0]["rows"].append(3)
+    assert results[1] == {"rows": [1, 2]}
+    assert flight.stats == {"executed": 2, "coalesced": 4, "cached": 0}
+    # Another key runs separately
+    assert not other.done()
+    other_run.release.set()
+    assert await other == {"rows": []}
+
+
+async def test_errors_reach_every_waiter_and_arent_cached():
+    flight, failing = SingleFlight(stale_seconds=60), Counted(error=ValueError("aggregation failed"))
+    waiters = [asyncio.ensure_future(flight.do("k", failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    failing.release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert failing.calls == 1
+    assert all(isinstance(result, ValueError) and str(result) == "aggregation failed" for result in results)
+    # The next call runs again rather than getting the failure
+    run = Counted("ok")
+    run.release.set()
+    assert await flight.do("k", run) == "ok"
+    assert run.calls == 1
+
+
+async def test_stale_results_are_reused_until_they_expire():
+    flight, run = SingleFlight(stale_seconds=0.05), Counted("first")
+    run.release.set()
+    assert await flight.do("k", run) == "first"
+    assert await flight.do("k", run) == "first"
+    assert flight.stats["cached"] == 1
+    await asyncio.sleep(0.06)
+    await flight.do("k", run)
+    assert run.calls == 2
+
+
+async def test_a_cancelled_caller_doesnt_cancel_the_others():
+    flight, run = SingleFlight(), Counted("done")
+    first = asyncio.ensure_future(flight.do("k", run))
+    second = asyncio.ensure_future(flight.do("k", run))
+    await asyncio.sleep(0)
+    first.cancel()
+    run.release.set()
+    assert await second == "done"
+    assert first.cancelled()
+
+
+async def test_coalesce_decorator_keys_by_arguments():
+    runs = []
+
+    @coalesce(key=lambda scope, **_: scope)
+    async def stats_for_coalescing_test(scope, user):
+        runs.append((scope, user))
+        await asyncio.sleep(0.01)
+        return scope
+
+    results = await asyncio.gather(
+        stats_for_coalescing_test(scope="m1", user="a"),
+        stats_for_coalescing_test(scope="m1", user="b"),
+        stats_for_coalescing_test(scope="m2", user="c"),
+    )
+    assert results == ["m1", "m1", "m2"]
+    assert len(runs) == 2
+    assert flights["stats_for_coalescing_test"].stats["coalesced"] == 1
@@ -0,0 +1,69 @@
+"""Delta sync paging."""
+import server
+from utils.sync import format_watermark, next_watermark, parse_watermark
+
+from tests.test_api import APPLICATION, MFI
+
+
+def test_watermark_round_trip():
+    assert parse_watermark("2026-01-01T00:00:00+00:00/abc") == ("2026-01-01T00:00:00+00:00", "abc")
+    assert parse_watermark("2026-01-01T00:00:00+00:00") == ("2026-01-01T00:00:00+00:00", "")
+    assert format_watermark(("2026-01-01T00:00:00+00:00", "abc")) == "2026-01-01T00:00:00+00:00/abc"
+    assert format_watermark(("", "")) == ""
+
+
+def test_next_watermark_stops_at_earliest_truncated_page():
+    apps = [{"id": "b", "updated_at": "t2"}, {"id": "c", "updated_at": "t2"}]
+    deleted = [{"id": "a", "deleted_at": "t3"}]
+    assert next_watermark(("t1", ""), [("updated_at", apps, True), ("deleted_at", deleted, False)]) == (("t2", "c"), True)
+    assert next_watermark(("t1", ""), [("updated_at", apps, False), ("deleted_at", deleted, False)]) == (("t3", "a"), False)
+    assert next_watermark(("t1", "x"), [("updated_at", [], False)]) == (("t1", "x"), False)
+
+
+def test_paging_doesnt_lose_documents_sharing_a_timestamp(client, register, monkeypatch):
+    monkeypatch.setattr(server, "SYNC_PAGE_SIZE", 50)
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    for _ in range(40):
+        client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=borrower)
+    # One batch is written with a single updated_at, spanning page boundaries
+    ops = [
+        {"op_id": str(i), "type": "create_application", "data": {**APPLICATION, "mfi_id": mfi_id}}
+        for i in range(100)
+    ]
+    assert client.post("/api/sync/ops", json={"ops": ops}, headers=borrower).status_code == 200
+
+    seen, since, pages = set(), "", 0
+    while True:
+        page = client.get("/api/sync", params={"since": since}, headers=borrower).json()
+        seen.update(app["id"] for app in page["applications"])
+        since, pages = page["watermark"], pages + 1
+        if not page["has_more"]:
+            break
+    assert len(seen) == 140
+    # Notifications page alongside, so how their timestamps fall can add a page
+    assert pages >= 3
+
+    # Caught up: nothing more until something changes
+    assert client.get("/api/sync", params={"since": since}, headers=borrower).json()["applications"] == []
+
+
+def test_archived_applications_are_synced_as_deletions(client, register, monkeypatch):
+    from utils import maintenance
+
+    _, admin = register("admin@example.com", "admin")
+    _, borrower = register("borrower@example.com")
+    mfi_id = client.post("/api/mfis", json=MFI, headers=admin).json()["id"]
+    app_id = client.post("/api/applications", json={**APPLICATION, "mfi_id": mfi_id}, headers=borrower).json()["id"]
+    assert client.patch(f"/api/applications/{app_id}", json={"status": "rejected"}, headers=admin).status_code == 200
+    since = client.get("/api/sync", headers=borrower).json()["watermark"]
+
+    # Everything closed before now is old enough
+    monkeypatch.setattr(maintenance, "APPLICATION_ARCHIVE_MONTHS", 0)
+    repos = client.app.state.repositories
+    assert client.portal.call(maintenance.archive_closed_applications, repos)["archived"] == 1
+
+    page = client.get("/api/sync", params={"since": since}, headers=borrower).json()
+    assert page["deleted"]["applications"] == [app_id]
+    assert client.get(f"/api/applications/{app_id}", headers=borrower).json()["archived"] is True
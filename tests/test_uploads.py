@@ -0,0 +1,61 @@
+"""Resumable uploads on the in-memory document store."""
+import asyncio
+
+import pytest
+
+from utils.uploads import UploadConflict, content_disposition, finalize_upload, receive_upload
+
+pytestmark = pytest.mark.anyio
+
+
+async def new_upload(store, length):
+    upload = {"id": "up1", "user_id": "u1", "filename": "id.pdf", "content_type": "application/pdf",
+              "length": length, "offset": 0, "next_n": 0, "pending": b"", "status": "uploading"}
+    await store.create_upload(upload)
+    return await store.get_upload("up1")
+
+
+async def test_concurrent_appends_at_one_offset_dont_overwrite_chunks(repos):
+    store = repos.documents
+    size = store.chunk_size
+    upload = await new_upload(store, 2 * size)
+    first_chunk_written = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def slow_body():
+        yield b"a" * size
+        first_chunk_written.set()
+        await resume.wait()
+        yield b"a" * size
+
+    async def competing_body():
+        yield b"b" * size
+
+    first = asyncio.create_task(receive_upload(store, upload, slow_body(), "writer-a"))
+    await first_chunk_written.wait()
+    # Still at the offset the first request started from, but reserved by it
+    with pytest.raises(UploadConflict):
+        await receive_upload(store, upload, competing_body(), "writer-b")
+    resume.set()
+    assert await first == 2 * size
+
+    file = await finalize_upload(store, "up1")
+    data = b"".join([piece async for piece in store.read_range(file["_id"], 0, 2 * size)])
+    assert data == b"a" * 2 * size
+
+
+async def test_released_upload_can_be_resumed_by_another_request(repos):
+    store = repos.documents
+    upload = await new_upload(store, 10)
+
+    async def body(data):
+        yield data
+
+    assert await receive_upload(store, upload, body(b"12345"), "writer-a") == 5
+    await store.release_upload("up1", "writer-a")
+    assert await receive_upload(store, await store.get_upload("up1"), body(b"67890"), "writer-b") == 10
+
+
+def test_content_disposition_escapes_filename():
+    header = content_disposition('na"me\\ü\r\n.pdf')
+    assert header == 'attachment; filename="na_me____.pdf"; filename*=UTF-8\'\'na%22me%5C%C3%BC%0D%0A.pdf'